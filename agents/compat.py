@@ -0,0 +1,51 @@
+# Agent classes built on pydantic_ai, re-exported lazily by the agents package
+
+# Import and re-export the required classes from pydantic_ai
+from pydantic_ai import Agent as PydanticAgent, RunContext as Runner
+from pydantic_ai.models.openai import ModelSettings
+from pydantic_ai.tools import Tool
+
+# Define a custom Agent class that accepts the 'instructions' parameter
+class Agent(PydanticAgent):
+    def __init__(self, name=None, instructions=None, model=None, model_settings=None, tools=None, **kwargs):
+        # Convert instructions to system_prompt if provided
+        system_prompt = instructions if instructions else kwargs.get('system_prompt')
+
+        # Remove instructions from kwargs to avoid conflicts
+        if 'instructions' in kwargs:
+            del kwargs['instructions']
+
+        # Initialize the parent class
+        super().__init__(
+            name=name,
+            model=model,
+            model_settings=model_settings,
+            system_prompt=system_prompt,
+            tools=tools or [],
+            **kwargs
+        )
+
+    async def run(self, user_prompt, **kwargs):
+        # Handle the 'context' parameter by converting it to 'deps'
+        if 'context' in kwargs:
+            kwargs['deps'] = kwargs.pop('context')
+
+        # Call the parent class's run method
+        result = await super().run(user_prompt, **kwargs)
+
+        # Add a final_output attribute for compatibility
+        try:
+            # Try to use output first (newer API)
+            result.final_output = getattr(result, 'output', None)
+            if result.final_output is None:
+                # Fall back to data (older API)
+                result.final_output = getattr(result, 'data', '')
+        except Exception:
+            # If all else fails, use an empty string
+            result.final_output = ''
+
+        # Add a data attribute if it doesn't exist
+        if not hasattr(result, 'data'):
+            result.data = {}
+
+        return result
@@ -0,0 +1,176 @@
+"""
+Non-blocking console input for interactive agent sessions.
+
+Calling input() inside the event loop freezes it until the user presses Enter, which also
+stalls the MCP session readers. Lines are read on a background thread instead and handed
+to the loop, so server I/O keeps flowing while the prompt is waiting.
+"""
+import sys
+import signal
+import asyncio
+import threading
+from collections import deque
+from typing import Any, Awaitable, Callable, Iterable, Optional, TextIO
+
+
+class AsyncConsole:
+    """
+    Reads lines from stdin without blocking the event loop.
+    """
+    def __init__(self, stream: Optional[TextIO] = None):
+        """
+        Initialize the console.
+
+        Args:
+            stream: Stream to read from (defaults to sys.stdin)
+        """
+        self.stream = stream or sys.stdin
+        self._lines: Optional[asyncio.Queue] = None
+        self._eof = False
+
+    def _start(self) -> None:
+        loop = asyncio.get_running_loop()
+        self._lines = asyncio.Queue()
+
+        def pump() -> None:
+            while True:
+                try:
+                    line = self.stream.readline()
+                except (OSError, ValueError):
+                    line = ""
+                try:
+                    loop.call_soon_threadsafe(self._lines.put_nowait, line)
+                except RuntimeError:
+                    # The event loop has been closed
+                    return
+                if not line:
+                    return
+
+        # A daemon thread, so a pending readline never keeps the process alive at exit
+        threading.Thread(target=pump, name="console-reader", daemon=True).start()
+
+    async def readline(self, prompt: str = "") -> Optional[str]:
+        """
+        Read one line.
+
+        Args:
+            prompt: Text printed before waiting
+
+        Returns:
+            The line without its trailing newline, or None at end of input
+        """
+        if self._lines is None:
+            self._start()
+        if prompt:
+            print(prompt, end="", flush=True)
+        if self._eof:
+            return None
+        line = await self._lines.get()
+        if not line:
+            self._eof = True
+            return None
+        return line.rstrip("\r\n")
+
+
+async def run_repl(
+    run_turn: Callable[[str], Awaitable[Any]],
+    prompt: str = "\n[You] ",
+    exit_commands: Iterable[str] = ("exit", "quit", "bye", "goodbye"),
+    cancel_command: str = "/cancel",
+    console: Optional[AsyncConsole] = None,
+) -> None:
+    """
+    Run a read-eval-print loop that keeps the event loop responsive.
+
+    Prompts typed while a turn is running are queued and run in order. The running turn
+    is cancelled by the cancel command or Ctrl-C; Ctrl-C at an idle prompt ends the loop.
+
+    Args:
+        run_turn: Coroutine function that handles one prompt
+        prompt: Text shown when waiting for input
+        exit_commands: Inputs that end the loop
+        cancel_command: Input that cancels the running turn
+        console: Console to read from (defaults to stdin)
+    """
+    console = console or AsyncConsole()
+    exit_commands = {command.lower() for command in exit_commands}
+    pending = deque()
+    turn: Optional[asyncio.Task] = None
+    read: Optional[asyncio.Task] = None
+    at_eof = False
+
+    def on_interrupt() -> None:
+        if turn is not None and not turn.done():
+            turn.cancel()
+        elif read is not None:
+            read.cancel()
+
+    loop = asyncio.get_running_loop()
+    try:
+        loop.add_signal_handler(signal.SIGINT, on_interrupt)
+        handles_interrupt = True
+    except (NotImplementedError, RuntimeError, ValueError):
+        # Not supported on this platform or outside the main thread
+        handles_interrupt = False
+
+    print(prompt, end="", flush=True)
+    try:
+        while True:
+            if turn is None and pending:
+                turn = asyncio.create_task(run_turn(pending.popleft()))
+            if turn is None and at_eof:
+                break
+            if read is None and not at_eof:
+                read = asyncio.create_task(console.readline())
+
+            waiting = {task for task in (turn, read) if task is not None}
+            done, _ = await asyncio.wait(waiting, return_when=asyncio.FIRST_COMPLETED)
+
+            if turn in done:
+                try:
+                    turn.result()
+                except asyncio.CancelledError:
+                    print("\n[Cancelled]")
+                except Exception as e:
+                    print(f"Error: {e}")
+                turn = None
+                if not pending and not at_eof:
+                    print(prompt, end="", flush=True)
+
+            if read in done:
+                if read.cancelled():
+                    # Ctrl-C at an idle prompt
+                    print()
+                    break
+                line = read.result()
+                read = None
+                if line is None:
+                    at_eof = True
+                    continue
+
+                text = line.strip()
+                if text.lower() in exit_commands:
+                    print("Goodbye!")
+                    break
+                if text == cancel_command:
+                    if turn is not None:
+                        turn.cancel()
+                    else:
+                        print(prompt, end="", flush=True)
+                    continue
+                if not text:
+                    if turn is None:
+                        print(prompt, end="", flush=True)
+                    continue
+
+                pending.append(text)
+                if turn is not None:
+                    print(f"[Queued] {text}", flush=True)
+    finally:
+        if handles_interrupt:
+            loop.remove_signal_handler(signal.SIGINT)
+        for task in (turn, read):
+            if task is not None and not task.done():
+                task.cancel()
+        await asyncio.gather(*(task for task in (turn, read) if task is not None),
+                             return_exceptions=True)
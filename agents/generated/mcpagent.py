@@ -1,6 +1,7 @@
 from dotenv import load_dotenv
 import asyncio
 import json
+import logging
 import os
 import pathlib
 
@@ -8,6 +9,8 @@ from pydantic_ai import Agent
 from pydantic_ai.models.openai import OpenAIModel
 
 from agents.mcp_client import MCPClient
+from agents.console import run_repl
+from agents.history import ConversationHistory
 
 # Load environment variables
 load_dotenv()
@@ -53,20 +56,25 @@ async def run_agent():
     
     # Process user messages in a loop
     try:
-        print("Tool Developer Agent is ready. Enter 'quit' to exit.")
-        while True:
-            user_input = input("\nYou: ")
-            if user_input.lower() in ["exit", "quit", "bye"]:
-                break
-                
+        print("Tool Developer Agent is ready. Enter 'quit' to exit, '/cancel' to stop an answer.")
+
+        # Earlier turns are sent with each prompt, compacted to stay within the token budget
+        history = ConversationHistory()
+
+        async def answer(user_input):
             # Run the agent
-            result = await agent.run(user_input)
+            result = await agent.run(user_input, message_history=history.messages)
+            await history.add(result.new_messages())
             print(f"\nAgent: {result.output}")
+
+        # Read input without blocking the event loop so the MCP servers stay responsive
+        await run_repl(answer, prompt="\nYou: ", exit_commands=["exit", "quit", "bye"])
     finally:
         # Clean up resources
         await client.cleanup()
 
 if __name__ == "__main__":
+    logging.basicConfig(level=logging.ERROR, format="%(asctime)s - %(levelname)s - %(message)s")
     # First list available tools, then run the interactive agent
     asyncio.run(list_tools())
     asyncio.run(run_agent())
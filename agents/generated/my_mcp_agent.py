@@ -4,6 +4,7 @@ import os
 import sys
 import pathlib
 import json
+import logging
 
 # Add project root to python path to find modules
 project_root = pathlib.Path(__file__).resolve().parents[2]
@@ -16,6 +17,8 @@ from pydantic_ai.models.openai import OpenAIModel
 
 # Import the MCP client using the absolute path
 from agents.mcp_client import MCPClient
+from agents.console import run_repl
+from agents.history import ConversationHistory
 
 # Load environment variables
 load_dotenv()
@@ -105,15 +108,16 @@ async def main():
             agent = Agent(model=model, tools=tools, system_prompt=system_prompt)
 
             # Process user messages in a loop
-            print("\nMulti-Server Agent is ready. Enter 'quit' to exit.")
-            while True:
-                user_input = input("\nYou: ")
-                if user_input.lower() in ["exit", "quit", "bye"]:
-                    break
+            print("\nMulti-Server Agent is ready. Enter 'quit' to exit, '/cancel' to stop an answer.")
 
+            # Earlier turns are sent with each prompt, compacted to stay within the token budget
+            history = ConversationHistory()
+
+            async def answer(user_input):
                 # Run the agent
                 print("Running agent...")
-                result = await agent.run(user_input)
+                result = await agent.run(user_input, message_history=history.messages)
+                await history.add(result.new_messages())
                 # Print debug information about the result object
                 print(f"\nResult type: {type(result)}")
                 print(f"Result dir: {dir(result)}")
@@ -140,6 +144,9 @@ async def main():
                         print(f"\nResult __dict__: {result.__dict__}")
                 except Exception as e:
                     print(f"Error accessing __dict__: {e}")
+
+            # Read input without blocking the event loop so the MCP servers stay responsive
+            await run_repl(answer, prompt="\nYou: ", exit_commands=["exit", "quit", "bye"])
         finally:
             # Clean up resources
             print("Cleaning up resources...")
@@ -151,6 +158,7 @@ async def main():
         traceback.print_exc()
 
 if __name__ == "__main__":
+    logging.basicConfig(level=logging.ERROR, format="%(asctime)s - %(levelname)s - %(message)s")
     try:
         asyncio.run(main())
     except KeyboardInterrupt:
@@ -0,0 +1,289 @@
+"""
+Token-budgeted conversation history for multi-turn agent sessions.
+
+Passing every earlier message back as message_history makes each request larger than the
+last. ConversationHistory keeps the messages of past turns together with their token
+counts, which are computed once when a turn is added, and compacts the oldest turns when
+the total goes over budget:
+
+1. the results of tool calls in older turns are replaced by a short placeholder (the calls
+   themselves stay, so every tool call still has its result)
+2. if that is not enough, the oldest turns are folded into a running summary
+
+Compaction goes down to a low-water mark below the budget, so it runs once every few turns
+rather than on every turn. The most recent turns are always kept verbatim.
+"""
+import os
+import json
+import dataclasses
+from typing import Any, Awaitable, Callable, Iterable, List, Optional
+
+from pydantic_ai import Agent
+from pydantic_ai.messages import (
+    ModelMessage,
+    ModelRequest,
+    ModelResponse,
+    SystemPromptPart,
+    TextPart,
+    ToolCallPart,
+    ToolReturnPart,
+    UserPromptPart,
+)
+
+from .mcp.schema import text_tokens
+
+ELIDED_RESULT = "[Result removed from the conversation history to save space]"
+SUMMARY_HEADER = "Summary of the earlier conversation:\n"
+
+# Rough per-message overhead of the chat format (role, separators)
+MESSAGE_OVERHEAD_TOKENS = 4
+
+Summarizer = Callable[[str, str], Awaitable[str]]
+
+
+def _part_text(part: Any) -> str:
+    if isinstance(part, ToolCallPart):
+        args = part.args if isinstance(part.args, str) else json.dumps(part.args or {})
+        return f"{part.tool_name}{args}"
+    content = getattr(part, "content", "")
+    if isinstance(content, str):
+        return content
+    try:
+        return json.dumps(content, default=str)
+    except (TypeError, ValueError):
+        return str(content)
+
+
+def message_tokens(message: ModelMessage) -> int:
+    """
+    Estimated token count of a message, using tiktoken if installed.
+    """
+    return MESSAGE_OVERHEAD_TOKENS + sum(text_tokens(_part_text(part)) for part in message.parts)
+
+
+def _truncate(text: str, limit: int) -> str:
+    text = " ".join(text.split())
+    return text if len(text) <= limit else text[:limit - 3] + "..."
+
+
+def transcript(messages: Iterable[ModelMessage]) -> str:
+    """
+    Short plain-text rendering of a turn: the user prompt, tools used and final answer.
+    """
+    lines = []
+    tools = []
+    answer = ""
+    for message in messages:
+        for part in message.parts:
+            if isinstance(part, UserPromptPart):
+                lines.append(f"User: {_truncate(_part_text(part), 300)}")
+            elif isinstance(part, ToolCallPart):
+                tools.append(part.tool_name)
+            elif isinstance(part, TextPart) and part.content:
+                answer = part.content
+    if tools:
+        lines.append(f"Tools used: {', '.join(dict.fromkeys(tools))}")
+    if answer:
+        lines.append(f"Assistant: {_truncate(answer, 400)}")
+    return "\n".join(lines)
+
+
+def model_summarizer(model: Any) -> Summarizer:
+    """
+    Build a summarizer that asks a model to merge older turns into the running summary.
+
+    Args:
+        model: Model (or model name) to summarize with; a small, fast model is enough
+
+    Returns:
+        Async callable (previous_summary, new_transcript) -> summary
+    """
+    agent = Agent(
+        model=model,
+        system_prompt=(
+            "You maintain a compact summary of a conversation between a user and an assistant. "
+            "Merge the new exchanges into the existing summary. Keep facts, decisions, names, "
+            "file paths and open questions; drop pleasantries. Reply with the summary only."
+        ),
+    )
+
+    async def summarize(previous: str, new: str) -> str:
+        result = await agent.run(f"Existing summary:\n{previous or '(none)'}\n\nNew exchanges:\n{new}")
+        return str(result.output)
+
+    return summarize
+
+
+@dataclasses.dataclass
+class _Turn:
+    messages: List[ModelMessage]
+    tokens: int
+    elided: bool = False
+
+
+class ConversationHistory:
+    """
+    Message history of one conversation, kept within a token budget.
+
+    Usage:
+        history = ConversationHistory(max_tokens=16000)
+        result = await agent.run(prompt, message_history=history.messages)
+        await history.add(result.new_messages())
+    """
+    def __init__(
+        self,
+        max_tokens: Optional[int] = None,
+        keep_recent_turns: int = 2,
+        low_water: float = 0.75,
+        max_summary_tokens: int = 800,
+        summarizer: Optional[Summarizer] = None,
+    ):
+        """
+        Initialize the history.
+
+        Args:
+            max_tokens: Token budget for the history (defaults to the AGENT_HISTORY_TOKENS
+                env var or 16000; 0 keeps everything)
+            keep_recent_turns: Number of most recent turns that are never compacted
+            low_water: Fraction of max_tokens that compaction reduces the history to
+            max_summary_tokens: Upper bound for the running summary of dropped turns
+            summarizer: Async callable (previous_summary, new_transcript) -> summary; by
+                default the summary is a truncated transcript and costs no model calls
+        """
+        if max_tokens is None:
+            max_tokens = int(os.getenv("AGENT_HISTORY_TOKENS", "16000"))
+        self.max_tokens = max_tokens
+        self.keep_recent_turns = max(keep_recent_turns, 1)
+        self.low_water = low_water
+        self.max_summary_tokens = max_summary_tokens
+        self.summarizer = summarizer
+        self.summary = ""
+        self._summary_tokens = 0
+        self._system_parts: List[SystemPromptPart] = []
+        self._system_tokens = 0
+        self._turns: List[_Turn] = []
+        self._tokens = 0
+        self.compactions = 0
+
+    @property
+    def tokens(self) -> int:
+        """
+        Estimated token count of the messages passed to the next run.
+        """
+        return self._system_tokens + self._summary_tokens + self._tokens
+
+    @property
+    def messages(self) -> List[ModelMessage]:
+        """
+        Messages to pass as message_history to the next run.
+        """
+        head: List[Any] = list(self._system_parts)
+        if self.summary:
+            head.append(SystemPromptPart(SUMMARY_HEADER + self.summary))
+        messages: List[ModelMessage] = [ModelRequest(parts=head)] if head else []
+        for turn in self._turns:
+            messages.extend(turn.messages)
+        return messages
+
+    def clear(self) -> None:
+        """
+        Forget the conversation, keeping the system prompt.
+        """
+        self.summary = ""
+        self._summary_tokens = 0
+        self._turns = []
+        self._tokens = 0
+
+    async def add(self, messages: List[ModelMessage]) -> None:
+        """
+        Append the new messages of a finished run and compact if over budget.
+
+        Args:
+            messages: The run's new messages (result.new_messages())
+        """
+        messages = list(messages)
+        if not messages:
+            return
+        # The first run carries the system prompt; keep it apart so it survives compaction
+        if not self._system_parts and not self._turns and isinstance(messages[0], ModelRequest):
+            system = [part for part in messages[0].parts if isinstance(part, SystemPromptPart)]
+            if system:
+                self._system_parts = system
+                self._system_tokens = MESSAGE_OVERHEAD_TOKENS + sum(
+                    text_tokens(part.content) for part in system)
+                rest = [part for part in messages[0].parts if not isinstance(part, SystemPromptPart)]
+                messages = [dataclasses.replace(messages[0], parts=rest)] + messages[1:]
+
+        tokens = sum(message_tokens(message) for message in messages)
+        self._turns.append(_Turn(messages, tokens))
+        self._tokens += tokens
+
+        if self.max_tokens and self.tokens > self.max_tokens:
+            await self.compact()
+
+    async def compact(self) -> None:
+        """
+        Shrink the history to the low-water mark: elide old tool results, then summarize.
+        """
+        target = int(self.max_tokens * self.low_water)
+        compactable = len(self._turns) - self.keep_recent_turns
+        compacted = False
+
+        # Stale tool results first: they are usually the bulk of the history
+        for turn in self._turns[:max(compactable, 0)]:
+            if self.tokens <= target:
+                break
+            if not turn.elided:
+                compacted = self._elide_tool_results(turn) or compacted
+
+        # Then fold the oldest turns into the summary
+        dropped: List[_Turn] = []
+        while self._turns[len(dropped):] and len(self._turns) - len(dropped) > self.keep_recent_turns:
+            if self.tokens - sum(turn.tokens for turn in dropped) <= target:
+                break
+            dropped.append(self._turns[len(dropped)])
+        if dropped:
+            del self._turns[:len(dropped)]
+            self._tokens -= sum(turn.tokens for turn in dropped)
+            await self._summarize(dropped)
+            compacted = True
+        if compacted:
+            self.compactions += 1
+
+    def _elide_tool_results(self, turn: _Turn) -> bool:
+        elided = False
+        messages = []
+        for message in turn.messages:
+            if isinstance(message, ModelRequest) and any(
+                    isinstance(part, ToolReturnPart) for part in message.parts):
+                parts = [dataclasses.replace(part, content=ELIDED_RESULT)
+                         if isinstance(part, ToolReturnPart) else part
+                         for part in message.parts]
+                message = dataclasses.replace(message, parts=parts)
+                elided = True
+            messages.append(message)
+        tokens = sum(message_tokens(message) for message in messages)
+        self._tokens += tokens - turn.tokens
+        turn.messages, turn.tokens, turn.elided = messages, tokens, True
+        return elided
+
+    async def _summarize(self, turns: List[_Turn]) -> None:
+        new = "\n\n".join(text for text in (transcript(turn.messages) for turn in turns) if text)
+        if not new:
+            return
+        summary = None
+        if self.summarizer is not None:
+            try:
+                summary = await self.summarizer(self.summary, new)
+            except Exception:
+                # Fall back to the plain transcript rather than losing the turns entirely
+                summary = None
+        if summary is None:
+            summary = f"{self.summary}\n\n{new}" if self.summary else new
+
+        # Keep the summary bounded by dropping its oldest lines
+        lines = summary.strip().splitlines()
+        while len(lines) > 1 and text_tokens("\n".join(lines)) > self.max_summary_tokens:
+            lines.pop(0)
+        self.summary = "\n".join(lines)
+        self._summary_tokens = text_tokens(SUMMARY_HEADER + self.summary)
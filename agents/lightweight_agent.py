@@ -6,13 +6,12 @@ import pathlib
 import asyncio
 import os
 
-from pydantic_ai import Agent
-from pydantic_ai.models.openai import OpenAIModel
-
 import sys
 import pathlib
 sys.path.append(str(pathlib.Path(__file__).parent.parent.resolve()))
 from agents.mcp_client import MCPClient
+from agents.mcp.result_store import READ_RESULT_TOOL_NAME
+from agents.console import run_repl
 
 # Load environment variables
 load_dotenv()
@@ -23,7 +22,11 @@ def get_model(
     api_key=None
 ):
     """
-    Create an OpenAI model for use with agents.
+    Get an OpenAI model for use with agents.
+    
+    Models come from the process-wide MODEL_POOL, so agents reuse one HTTP connection
+    pool per base URL and API key, and the same model instance per model name. With
+    MODEL_REPLAY_MODE set, responses are recorded or replayed (see agents.model_replay).
     
     Args:
         model_name: Model name (defaults to MODEL_CHOICE env var or gpt-4o-mini)
@@ -33,6 +36,10 @@ def get_model(
     Returns:
         Configured OpenAI model
     """
+    # pydantic_ai and openai are imported on first use; together they take about a second
+    from agents.model_pool import MODEL_POOL
+    from agents.model_replay import replay_model, replay_mode
+
     # Get model name
     llm = model_name or os.getenv('MODEL_CHOICE') or os.getenv('MODEL_NAME', 'gpt-4o-mini')
     
@@ -42,20 +49,20 @@ def get_model(
     # Get API key (check multiple env vars)
     api_key = api_key or os.getenv('LLM_API_KEY') or os.getenv('OPENAI_API_KEY')
     if not api_key:
-        raise ValueError("API key not found in environment variables")
+        # Replaying recorded responses never reaches the API
+        if replay_mode() != 'replay':
+            raise ValueError("API key not found in environment variables")
+        api_key = 'replay'
 
-    return OpenAIModel(
-        llm,
-        base_url=base_url,
-        api_key=api_key
-    )
+    return replay_model(MODEL_POOL.model(llm, base_url=base_url, api_key=api_key))
 
 async def create_agent(
     config_path=None,
     model_name=None,
     base_url=None,
     api_key=None,
-    system_prompt=None
+    system_prompt=None,
+    tool_top_k=None
 ):
     """
     Create an agent with MCP tool support.
@@ -66,10 +73,15 @@ async def create_agent(
         base_url: Base URL for API
         api_key: API key
         system_prompt: Optional system prompt for the agent
+        tool_top_k: Only expose this many tools most relevant to each prompt, plus a
+            find_tools fallback (defaults to MCP_TOOL_TOP_K env var; unset exposes all tools)
     
     Returns:
         Tuple of (MCP client, configured agent)
     """
+    from pydantic_ai import Agent
+    from agents.mcp.tool_selection import select_tools
+
     # Default config path if not provided
     if not config_path:
         # Get project root directory (where this script is located)
@@ -83,11 +95,19 @@ async def create_agent(
     # Start client and get tools
     tools = await client.start()
     
+    # Optionally narrow the tools sent to the model to the ones relevant to each prompt
+    tools = select_tools(
+        tools,
+        tool_top_k or int(os.getenv('MCP_TOOL_TOP_K', '0')),
+        always_include=[READ_RESULT_TOOL_NAME],
+    )
+    
     # Create agent with model and tools
     agent = Agent(
         model=get_model(model_name, base_url, api_key),
         tools=tools,
-        system_prompt=system_prompt
+        # Agent takes a string or a sequence of them, not None
+        system_prompt=system_prompt or ()
     )
     
     return client, agent
@@ -98,7 +118,10 @@ async def run_interactive_session(
     base_url=None, 
     api_key=None,
     system_prompt=None,
-    exit_commands=('exit', 'quit', 'bye', 'goodbye')
+    exit_commands=('exit', 'quit', 'bye', 'goodbye'),
+    history_tokens=None,
+    session_id=None,
+    resume_turns=50
 ):
     """
     Run an interactive session with an MCP-enabled agent.
@@ -110,7 +133,18 @@ async def run_interactive_session(
         api_key: API key
         system_prompt: Optional system prompt for the agent
         exit_commands: Tuple of commands that will exit the session
+        history_tokens: Token budget for the conversation history (defaults to
+            AGENT_HISTORY_TOKENS env var or 16000); older turns are compacted beyond it
+        session_id: Persist the conversation under this id and resume it if it exists
+            (defaults to AGENT_SESSION_ID env var; unset keeps the session in memory only)
+        resume_turns: Number of most recent turns loaded when resuming a session
     """
+    from agents.streaming import print_stream
+    from agents.history import ConversationHistory
+    from agents.session_store import SessionStore
+
+    session_id = session_id or os.getenv('AGENT_SESSION_ID')
+    store = SessionStore() if session_id else None
     try:
         # Create client and agent
         client, agent = await create_agent(
@@ -121,36 +155,36 @@ async def run_interactive_session(
             system_prompt
         )
         
+        # Earlier turns are sent with each prompt, compacted to stay within the budget
+        history = ConversationHistory(max_tokens=history_tokens)
+        if store:
+            turns = await store.load_turns(session_id, last_turns=resume_turns)
+            for turn in turns:
+                await history.add(turn)
+            if turns:
+                print(f"Resumed session '{session_id}' ({len(turns)} turns).")
+        
+        async def answer(user_input):
+            # Run the agent, printing text and tool calls as they arrive
+            result = await print_stream(agent, user_input, message_history=history.messages)
+            await history.add(result.new_messages())
+            if store:
+                await store.append(session_id, result.new_messages())
+        
         print("Agent ready. Type your questions or 'exit' to quit.")
+        print("Type '/cancel' or press Ctrl-C to stop an answer; prompts typed meanwhile are queued.")
         
-        # Main interaction loop
-        while True:
-            # Get user input
-            user_input = input("\n[You] ")
-            
-            # Check if user wants to exit
-            if user_input.lower() in exit_commands:
-                print("Goodbye!")
-                break
-            
-            try:
-                # Run the agent
-                result = await agent.run(user_input)
-                
-                # Print response (handle different result formats)
-                if hasattr(result, 'final_output'):
-                    print('[Assistant] ', result.final_output)
-                elif hasattr(result, 'output'):
-                    print('[Assistant] ', result.output)
-                elif hasattr(result, 'data'):
-                    print('[Assistant] ', result.data)
-                else:
-                    print('[Assistant] ', result)
-                    
-            except Exception as e:
-                print(f"Error: {e}")
+        # Main interaction loop. Input is read without blocking the event loop, so MCP
+        # servers stay serviced while waiting for the user.
+        await run_repl(
+            answer,
+            prompt="\n[You] ",
+            exit_commands=exit_commands
+        )
     
     finally:
         # Clean up
         if 'client' in locals():
-            await client.cleanup()
\ No newline at end of file
+            await client.cleanup()
+        if store:
+            store.close()
\ No newline at end of file
@@ -1,2 +1,11 @@
 # Make the MCP module a proper Python package
-from .client import MCPClient
\ No newline at end of file
+
+# MCPClient is imported on first use, so helpers such as agents.mcp.config and the daemon
+# entry point load without the client's dependencies
+
+
+def __getattr__(name):
+    if name == "MCPClient":
+        from .client import MCPClient
+        return MCPClient
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
@@ -2,27 +2,73 @@
 Factory for creating MCP-enabled agents.
 """
 import os
+import time
+import uuid
+import asyncio
+import hashlib
 import pathlib
 import logging
-from typing import Tuple, Dict, Any, List, Optional
+import contextlib
+from typing import Tuple, Dict, Any, AsyncIterator, List, Optional
 
 from pydantic_ai import Agent, RunContext
 from pydantic_ai.models.openai import OpenAIModel
 
 # Use the real MCP client
 from .client import MCPClient
+from .scheduler import call_context
+from .metrics import REGISTRY
+from .metrics_model import MetricsModel
+from .tool_selection import select_tools
+from .result_store import READ_RESULT_TOOL_NAME
+from ..streaming import stream_run
+from ..history import ConversationHistory
+from ..model_pool import MODEL_POOL
+from ..model_replay import replay_model, replay_mode
 
-# Setup logging
-logging.basicConfig(level=logging.INFO)
+# Logging is configured by the entry points (example.py, agents.server), not on import
 logger = logging.getLogger("mcp_agent_factory")
 
 # Get the MCP config path
 SCRIPT_DIR = pathlib.Path(__file__).parent.resolve()
 CONFIG_PATH = str(SCRIPT_DIR.parent.parent / "mcp_config.json")
 
-def get_openai_model() -> OpenAIModel:
+# System prompts of the built-in agents
+GENERAL_ASSISTANT_PROMPT = """
+    You are a helpful AI assistant with access to various tools through the Model Context Protocol (MCP).
+    You can use these tools to help users with their tasks, answer questions, and provide assistance.
+    
+    When using tools:
+    1. Choose the most appropriate tool for the task
+    2. Use tools efficiently and effectively
+    3. Explain your reasoning and process
+    4. Provide clear and concise responses
+    
+    Your goal is to be as helpful as possible while using the available tools to their full potential.
     """
-    Create an OpenAI model instance for use with agents.
+
+TOOL_LISTING_PROMPT = """
+    You are a Tool Demonstration Agent. Your primary purpose is to help users understand
+    the tools available to you through the Model Context Protocol (MCP).
+    
+    When asked about your tools:
+    1. List all available tools with their names and descriptions
+    2. Explain what each tool does and how it can be used
+    3. Provide examples of how to use each tool effectively
+    4. If asked to demonstrate a specific tool, use it to show its capabilities
+    
+    Your goal is to clearly explain the capabilities provided by your tools.
+    """
+
+def get_openai_model(model_name: Optional[str] = None) -> OpenAIModel:
+    """
+    Get an OpenAI model instance for use with agents.
+
+    Models come from the process-wide MODEL_POOL, so agents share one HTTP connection pool
+    and repeated calls return the same instance.
+
+    Args:
+        model_name: Optional model name (defaults to the MODEL_NAME environment variable)
 
     Returns:
         Configured OpenAI model
@@ -33,22 +79,24 @@ def get_openai_model() -> OpenAIModel:
     # Get API key and model name from environment
     api_key = os.getenv("OPENAI_API_KEY")
     if not api_key:
-        raise ValueError("OPENAI_API_KEY environment variable not set")
+        # Replaying recorded responses never reaches the API
+        if replay_mode() != "replay":
+            raise ValueError("OPENAI_API_KEY environment variable not set")
+        api_key = "replay"
 
-    model_name = os.getenv("MODEL_NAME", "gpt-4.1")
+    model_name = model_name or os.getenv("MODEL_NAME", "gpt-4.1")
 
-    logger.info(f"Creating OpenAI model with model_name={model_name}")
+    logger.info(f"Getting OpenAI model with model_name={model_name}")
 
-    # Create a simple model with just the model name
-    # The OpenAI API key should be set in the environment
-    return OpenAIModel(model_name)
+    return MODEL_POOL.model(model_name, api_key=api_key)
 
 async def create_mcp_agent(
     system_prompt: str,
     model_name: Optional[str] = None,
     use_web_search: bool = True,
     search_context_size: str = "medium",
-    user_location: Optional[Dict[str, str]] = None
+    user_location: Optional[Dict[str, str]] = None,
+    tool_top_k: Optional[int] = None
 ) -> Tuple[MCPClient, Agent]:
     """
     Create an agent with MCP tool support and optional web search.
@@ -59,6 +107,9 @@ async def create_mcp_agent(
         use_web_search: Whether to enable web search capability
         search_context_size: Size of search context ("low", "medium", or "high")
         user_location: Optional user location for search context
+        tool_top_k: Expose only this many tools most relevant to each prompt, plus a
+            find_tools fallback (defaults to the MCP_TOOL_TOP_K environment variable; unset
+            exposes every tool)
 
     Returns:
         Tuple of (MCP client, configured agent)
@@ -70,23 +121,10 @@ async def create_mcp_agent(
     try:
         # Start the client and get tools
         logger.info("Starting MCP client and getting tools")
-        mcp_tools = await client.start()
+        mcp_tools = await client.start(concurrent=True)
         logger.info(f"Got {len(mcp_tools)} MCP tools")
-        
-        # Override model name if provided
-        model = get_openai_model()
-        if model_name:
-            model.model = model_name
-            logger.info(f"Overriding model name to: {model_name}")
-
-        # Create the agent with MCP tools
-        logger.info("Creating agent with MCP tools")
-        agent = Agent(
-            model=model,
-            system_prompt=system_prompt,
-            tools=mcp_tools
-        )
 
+        agent = build_agent(client, mcp_tools, system_prompt, model_name=model_name, tool_top_k=tool_top_k)
         return client, agent
     except Exception as e:
         # Clean up the client if there's an error
@@ -94,57 +132,298 @@ async def create_mcp_agent(
         await client.cleanup()
         raise
 
-async def get_general_assistant_agent() -> Tuple[MCPClient, Agent]:
+def build_agent(
+    client: MCPClient,
+    mcp_tools: List[Any],
+    system_prompt: str,
+    model_name: Optional[str] = None,
+    tool_top_k: Optional[int] = None
+) -> Agent:
     """
-    Create a General Assistant Agent with MCP integration.
+    Create an agent over the tools of an already started MCP client.
+
+    Args:
+        client: The started MCP client the tools come from
+        mcp_tools: Tools returned by client.start()
+        system_prompt: The system prompt for the agent
+        model_name: Optional model name override
+        tool_top_k: Expose only this many tools most relevant to each prompt (defaults to
+            the MCP_TOOL_TOP_K environment variable)
 
     Returns:
-        Tuple of (MCP client, configured agent)
-    """
-    system_prompt = """
-    You are a helpful AI assistant with access to various tools through the Model Context Protocol (MCP).
-    You can use these tools to help users with their tasks, answer questions, and provide assistance.
-    
-    When using tools:
-    1. Choose the most appropriate tool for the task
-    2. Use tools efficiently and effectively
-    3. Explain your reasoning and process
-    4. Provide clear and concise responses
-    
-    Your goal is to be as helpful as possible while using the available tools to their full potential.
+        The configured agent
     """
+    # Optionally narrow the tools sent to the model to the ones relevant to each prompt
+    tool_top_k = tool_top_k or int(os.getenv("MCP_TOOL_TOP_K", "0"))
+    mcp_tools = select_tools(mcp_tools, tool_top_k, always_include=[READ_RESULT_TOOL_NAME])
+
+    # Record or replay model responses when MODEL_REPLAY_MODE is set
+    model = replay_model(get_openai_model(model_name))
 
-    return await create_mcp_agent(
+    # Record model request latency and token usage alongside the tool call metrics
+    model = MetricsModel(model, client.metrics)
+
+    # Create the agent with MCP tools
+    logger.info("Creating agent with MCP tools")
+    return Agent(
+        model=model,
         system_prompt=system_prompt,
-        search_context_size="medium"
+        tools=mcp_tools
     )
 
-async def get_tool_listing_agent() -> Tuple[MCPClient, Agent]:
+def _config_key(config_path: str) -> Tuple[str, str]:
+    """
+    Identify a config file by its path and contents, so an edited config gets new servers.
     """
-    Create an agent specifically for listing and demonstrating available tools.
+    try:
+        with open(config_path, "rb") as f:
+            digest = hashlib.sha256(f.read()).hexdigest()
+    except OSError:
+        digest = ""
+    return os.path.abspath(config_path), digest
+
+class _SharedClient:
+    """
+    A started MCP client shared by every cached agent built on the same config.
+    """
+    def __init__(self, client: MCPClient, tools: List[Any]):
+        self.client = client
+        self.tools = tools
+        self.refs = 0
+        self.last_released = time.monotonic()
+        self.agents: Dict[Tuple[Any, ...], Agent] = {}
+
+class AgentLease:
+    """
+    A cached agent's claim on its shared MCP client.
+
+    Stands in for the client that create_mcp_agent returns: cleanup() releases the claim
+    instead of stopping the servers, and other attributes are read from the client.
+    """
+    def __init__(self, cache: "AgentCache", shared: _SharedClient):
+        self._cache = cache
+        self._shared = shared
+        self._released = False
+
+    @property
+    def client(self) -> MCPClient:
+        return self._shared.client
+
+    def __getattr__(self, name: str) -> Any:
+        return getattr(self._shared.client, name)
+
+    async def cleanup(self) -> None:
+        """
+        Release the agent; the servers stop once no lease is left and they have been idle.
+        """
+        if not self._released:
+            self._released = True
+            await self._cache._release(self._shared)
+
+class AgentCache:
+    """
+    Hands out started agents, reusing MCP clients and agents across calls.
+
+    Agents are keyed by system prompt, model and tool selection; their MCP clients by
+    config file. A client is reference counted by the leases on its agents and stopped when
+    the last lease is released and it has been idle for idle_timeout seconds.
+
+    Clients belong to the event loop that started them, so when the cache is used from a new
+    loop (e.g. a second asyncio.run()) the clients of the old one are stopped and dropped.
+    """
+    def __init__(self, idle_timeout: Optional[float] = None):
+        """
+        Initialize the cache.
+
+        Args:
+            idle_timeout: Seconds an unused client is kept running (defaults to the
+                MCP_AGENT_IDLE_TIMEOUT environment variable or 300; 0 stops it on release)
+        """
+        if idle_timeout is None:
+            idle_timeout = float(os.getenv("MCP_AGENT_IDLE_TIMEOUT", "300"))
+        self.idle_timeout = idle_timeout
+        self._clients: Dict[Tuple[str, str], _SharedClient] = {}
+        self._locks: Dict[Tuple[str, str], asyncio.Lock] = {}
+        self._reaper: Optional[asyncio.Task] = None
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+
+    def _use_running_loop(self) -> None:
+        """
+        Drop clients, locks and the reaper if they were created on another event loop.
+
+        The dropped clients are cleaned up on their own loop if it is still running (e.g. in
+        another thread); otherwise their server processes and daemon connections are
+        terminated directly.
+        """
+        loop = asyncio.get_running_loop()
+        if self._loop is loop:
+            return
+        old_loop, clients = self._loop, [shared.client for shared in self._clients.values()]
+        self._loop = loop
+        self._clients = {}
+        self._locks = {}
+        self._reaper = None
+        if not clients:
+            return
+        # Their sessions cannot be used, or cleanly stopped, from this loop
+        logger.warning(f"Event loop changed, stopping {len(clients)} cached MCP clients")
+        if old_loop.is_running() and not old_loop.is_closed():
+            for client in clients:
+                asyncio.run_coroutine_threadsafe(client.cleanup(), old_loop)
+        else:
+            for client in clients:
+                client.terminate()
+
+    async def acquire(
+        self,
+        system_prompt: str,
+        model_name: Optional[str] = None,
+        tool_top_k: Optional[int] = None,
+        config_path: str = CONFIG_PATH
+    ) -> Tuple[AgentLease, Agent]:
+        """
+        Get a started agent, creating it and its MCP client only if they are not cached.
+
+        Args:
+            system_prompt: The system prompt for the agent
+            model_name: Optional model name override
+            tool_top_k: Expose only this many tools most relevant to each prompt
+            config_path: Path to the MCP configuration file
+
+        Returns:
+            Tuple of (lease, agent); call lease.cleanup() when done with the agent
+        """
+        self._use_running_loop()
+        key = _config_key(config_path)
+        async with self._locks.setdefault(key, asyncio.Lock()):
+            shared = self._clients.get(key)
+            if shared is None:
+                logger.info(f"Starting shared MCP client for {config_path}")
+                client = MCPClient(config_path)
+                try:
+                    tools = await client.start(concurrent=True)
+                except Exception:
+                    await client.cleanup()
+                    raise
+                shared = self._clients[key] = _SharedClient(client, tools)
+            shared.refs += 1
+
+        agent_key = (system_prompt, model_name, tool_top_k or int(os.getenv("MCP_TOOL_TOP_K", "0")))
+        agent = shared.agents.get(agent_key)
+        if agent is None:
+            try:
+                agent = shared.agents[agent_key] = build_agent(
+                    shared.client, shared.tools, system_prompt, model_name=model_name, tool_top_k=tool_top_k
+                )
+            except Exception:
+                await self._release(shared)
+                raise
+        else:
+            logger.info("Reusing cached agent")
+        return AgentLease(self, shared), agent
+
+    @contextlib.asynccontextmanager
+    async def lease(self, system_prompt: str, **kwargs: Any) -> AsyncIterator[Agent]:
+        """
+        Acquire an agent for the duration of a block.
+        """
+        lease, agent = await self.acquire(system_prompt, **kwargs)
+        try:
+            yield agent
+        finally:
+            await lease.cleanup()
+
+    async def _release(self, shared: _SharedClient) -> None:
+        shared.refs -= 1
+        shared.last_released = time.monotonic()
+        if shared.refs > 0:
+            return
+        if not self.idle_timeout:
+            await self._close_idle(0)
+        elif self._reaper is None or self._reaper.done():
+            self._reaper = asyncio.create_task(self._reap_idle())
+
+    async def _reap_idle(self) -> None:
+        while any(shared.refs == 0 for shared in self._clients.values()):
+            await asyncio.sleep(max(self.idle_timeout / 4, 0.05))
+            await self._close_idle(self.idle_timeout)
+
+    async def _close_idle(self, idle_for: float) -> None:
+        now = time.monotonic()
+        for key, shared in list(self._clients.items()):
+            if shared.refs == 0 and now - shared.last_released >= idle_for:
+                del self._clients[key]
+                logger.info("Stopping idle shared MCP client")
+                await shared.client.cleanup()
+
+    def stats(self) -> Dict[str, Any]:
+        """
+        Report cached clients with their lease counts and cached agents.
+        """
+        return {
+            path: {"leases": shared.refs, "agents": len(shared.agents)}
+            for (path, _), shared in self._clients.items()
+        }
+
+    async def close(self) -> None:
+        """
+        Stop every cached client, whether or not it is still leased.
+        """
+        self._use_running_loop()
+        if self._reaper is not None:
+            self._reaper.cancel()
+            await asyncio.gather(self._reaper, return_exceptions=True)
+            self._reaper = None
+        clients, self._clients = list(self._clients.values()), {}
+        for shared in clients:
+            await shared.client.cleanup()
+
+# Cache the built-in agent getters draw from
+AGENT_CACHE = AgentCache()
+
+async def get_cached_agent(
+    system_prompt: str,
+    model_name: Optional[str] = None,
+    tool_top_k: Optional[int] = None
+) -> Tuple[AgentLease, Agent]:
+    """
+    Get an agent from the shared cache.
+
+    Args:
+        system_prompt: The system prompt for the agent
+        model_name: Optional model name override
+        tool_top_k: Expose only this many tools most relevant to each prompt
 
     Returns:
-        Tuple of (MCP client, configured agent)
+        Tuple of (lease, agent); the lease can be used wherever the MCP client is expected,
+        and its cleanup() releases the agent instead of stopping the servers
     """
-    system_prompt = """
-    You are a Tool Demonstration Agent. Your primary purpose is to help users understand
-    the tools available to you through the Model Context Protocol (MCP).
-    
-    When asked about your tools:
-    1. List all available tools with their names and descriptions
-    2. Explain what each tool does and how it can be used
-    3. Provide examples of how to use each tool effectively
-    4. If asked to demonstrate a specific tool, use it to show its capabilities
-    
-    Your goal is to clearly explain the capabilities provided by your tools.
+    return await AGENT_CACHE.acquire(system_prompt, model_name=model_name, tool_top_k=tool_top_k)
+
+async def get_general_assistant_agent() -> Tuple[AgentLease, Agent]:
     """
+    Get a General Assistant Agent with MCP integration.
 
-    return await create_mcp_agent(
-        system_prompt=system_prompt,
-        search_context_size="low"  # Lower context size since we're just listing tools
-    )
+    The agent and its MCP client are cached; the lease's cleanup() releases them.
+
+    Returns:
+        Tuple of (lease on the MCP client, configured agent)
+    """
+    return await get_cached_agent(GENERAL_ASSISTANT_PROMPT)
+
+async def get_tool_listing_agent() -> Tuple[AgentLease, Agent]:
+    """
+    Get an agent specifically for listing and demonstrating available tools.
+
+    The agent and its MCP client are cached; the lease's cleanup() releases them.
+
+    Returns:
+        Tuple of (lease on the MCP client, configured agent)
+    """
+    return await get_cached_agent(TOOL_LISTING_PROMPT)
 
-async def run_agent(agent: Agent, prompt: str, context: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+async def run_agent(agent: Agent, prompt: str, context: Optional[Dict[str, Any]] = None,
+                    history: Optional[ConversationHistory] = None) -> Dict[str, Any]:
     """
     Run an MCP agent with the given prompt and context.
 
@@ -152,24 +431,33 @@ async def run_agent(agent: Agent, prompt: str, context: Optional[Dict[str, Any]]
         agent: The agent to run
         prompt: The prompt to send to the agent
         context: Optional context for the agent
+        history: Optional conversation history; earlier turns are sent with the prompt and
+            the new messages are added to it
 
     Returns:
         The agent's output
     """
+    started = time.perf_counter()
+    message_history = history.messages if history is not None else None
     try:
-        # Run the agent - try different parameter combinations
-        try:
-            # First try with context parameter
-            logger.info(f"Running agent with prompt: {prompt}")
-            result = await agent.run(prompt, context=context or {})
-        except TypeError as e:
-            if "context" in str(e):
-                # If that fails, try without context parameter
-                logger.info("Falling back to agent.run without context parameter")
-                result = await agent.run(prompt)
-            else:
-                # Re-raise if it's a different TypeError
-                raise
+        # Run the agent - try different parameter combinations. Tool calls of this run
+        # share MCP servers fairly with other concurrent runs.
+        with call_context(owner=uuid.uuid4().hex):
+            try:
+                # First try with context parameter
+                logger.info(f"Running agent with prompt: {prompt}")
+                result = await agent.run(prompt, context=context or {}, message_history=message_history)
+            except TypeError as e:
+                if "context" in str(e):
+                    # If that fails, try without context parameter
+                    logger.info("Falling back to agent.run without context parameter")
+                    result = await agent.run(prompt, message_history=message_history)
+                else:
+                    # Re-raise if it's a different TypeError
+                    raise
+
+        if history is not None:
+            await history.add(result.new_messages())
 
         # Format the result - prioritize newer properties over deprecated ones
         if hasattr(result, "final_output"):
@@ -193,32 +481,81 @@ async def run_agent(agent: Agent, prompt: str, context: Optional[Dict[str, Any]]
         else:
             data = {}
 
+        REGISTRY.observe("agent_run_seconds", time.perf_counter() - started, status="ok")
         return {
             "text": text,
             "data": data
         }
     except Exception as e:
         logger.error(f"Error running agent: {e}")
+        REGISTRY.observe("agent_run_seconds", time.perf_counter() - started, status="error")
         return {
             "text": f"I'm sorry, but I encountered an error: {str(e)}",
             "data": {}
         }
 
-async def run_with_cleanup(client: MCPClient, agent: Agent, prompt: str, context: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+async def run_agent_stream(agent: Agent, prompt: str, history: Optional[ConversationHistory] = None,
+                           **kwargs: Any) -> AsyncIterator[Dict[str, Any]]:
+    """
+    Run an MCP agent and yield its output as it is produced.
+
+    Args:
+        agent: The agent to run
+        prompt: The prompt to send to the agent
+        history: Optional conversation history; earlier turns are sent with the prompt and
+            the new messages are added to it when the run finishes
+        **kwargs: Extra arguments for agent.iter (e.g. deps)
+
+    Yields:
+        Event dicts: {"type": "text", "delta"} for each piece of text,
+        {"type": "tool_call", ...} and {"type": "tool_result", ...} around tool calls,
+        and finally {"type": "final", "text", "data"} in the same shape run_agent returns.
+        Errors are reported as {"type": "error", "text"}.
+    """
+    logger.info(f"Streaming agent with prompt: {prompt}")
+    started = time.perf_counter()
+    if history is not None:
+        kwargs["message_history"] = history.messages
+    try:
+        with call_context(owner=uuid.uuid4().hex):
+            async for event in stream_run(agent, prompt, **kwargs):
+                if event["type"] == "final":
+                    if history is not None:
+                        await history.add(event["result"].new_messages())
+                    REGISTRY.observe("agent_run_seconds", time.perf_counter() - started, status="ok")
+                    output = event["output"]
+                    yield {
+                        "type": "final",
+                        "text": output,
+                        "data": output if isinstance(output, dict) else {},
+                    }
+                else:
+                    yield event
+    except Exception as e:
+        logger.error(f"Error running agent: {e}")
+        REGISTRY.observe("agent_run_seconds", time.perf_counter() - started, status="error")
+        yield {
+            "type": "error",
+            "text": f"I'm sorry, but I encountered an error: {str(e)}",
+        }
+
+async def run_with_cleanup(client: Any, agent: Agent, prompt: str, context: Optional[Dict[str, Any]] = None,
+                           history: Optional[ConversationHistory] = None) -> Dict[str, Any]:
     """
     Run an agent and ensure the MCP client is cleaned up afterward.
 
     Args:
-        client: The MCP client to clean up
+        client: The MCP client or agent lease to clean up
         agent: The agent to run
         prompt: The prompt to send to the agent
         context: Optional context for the agent
+        history: Optional conversation history
 
     Returns:
         The agent's output
     """
     try:
-        return await run_agent(agent, prompt, context)
+        return await run_agent(agent, prompt, context, history)
     finally:
         logger.info("Cleaning up MCP client")
         await client.cleanup()
\ No newline at end of file
@@ -0,0 +1,148 @@
+"""
+On-disk cache of the tools each MCP server provides.
+
+Entries are keyed by the fingerprint of the server's command/args/env, so editing a
+server's entry in mcp_config.json invalidates its cached catalog automatically.
+"""
+import os
+import json
+import time
+import logging
+import pathlib
+import tempfile
+from typing import TYPE_CHECKING, Any, AsyncIterator, Dict, List, Optional
+
+from .config import server_fingerprint
+
+if TYPE_CHECKING:
+    from mcp.types import Tool as MCPTool
+
+logger = logging.getLogger("mcp_catalog")
+
+DEFAULT_CATALOG_DIR = pathlib.Path.home() / ".cache" / "mcp-agent-factory" / "catalog"
+
+
+async def iter_tool_pages(session: Any) -> AsyncIterator[List["MCPTool"]]:
+    """
+    Yield a server's tools one page at a time, following list_tools cursors.
+
+    Args:
+        session: A ClientSession or compatible proxy
+
+    Yields:
+        Lists of MCP tools in the order the server returns them
+    """
+    cursor = None
+    while True:
+        result = await session.list_tools(cursor=cursor)
+        yield result.tools
+        cursor = result.nextCursor
+        if not cursor:
+            break
+
+
+async def list_all_tools(session: Any) -> List["MCPTool"]:
+    """
+    Collect every page of a server's tools.
+
+    Args:
+        session: A ClientSession or compatible proxy
+
+    Returns:
+        All tools the server provides
+    """
+    tools = []
+    async for page in iter_tool_pages(session):
+        tools.extend(page)
+    return tools
+
+
+class ToolCatalog:
+    """
+    Stores each server's tool names, descriptions and input schemas on disk.
+    """
+    def __init__(self, cache_dir: Optional[str] = None):
+        """
+        Initialize the catalog.
+
+        Args:
+            cache_dir: Directory for catalog files (defaults to MCP_CATALOG_DIR or
+                ~/.cache/mcp-agent-factory/catalog)
+        """
+        self.cache_dir = pathlib.Path(
+            cache_dir or os.getenv("MCP_CATALOG_DIR") or DEFAULT_CATALOG_DIR
+        )
+
+    def path_for(self, config: Dict[str, Any]) -> pathlib.Path:
+        """
+        Get the catalog file for a server configuration.
+        """
+        return self.cache_dir / f"{server_fingerprint(config)}.json"
+
+    def load(self, name: str, config: Dict[str, Any],
+             server_version: Optional[str] = None) -> Optional[List["MCPTool"]]:
+        """
+        Load a server's cached tools.
+
+        Args:
+            name: Name of the server
+            config: The server's entry from mcp_config.json
+            server_version: If given, entries recorded for another version are ignored
+
+        Returns:
+            The cached tools, or None if there is no usable entry
+        """
+        path = self.path_for(config)
+        try:
+            with open(path, "r") as f:
+                entry = json.load(f)
+            if server_version is not None and entry.get("server_version") != server_version:
+                logger.info(f"Catalog for {name} was recorded for another server version")
+                return None
+            from mcp.types import Tool as MCPTool
+            return [MCPTool.model_validate(tool) for tool in entry["tools"]]
+        except FileNotFoundError:
+            return None
+        except Exception as e:
+            logger.warning(f"Ignoring unreadable catalog {path} for {name}: {e}")
+            return None
+
+    def cached_version(self, config: Dict[str, Any]) -> Optional[str]:
+        """
+        Get the server version a cached catalog was recorded for, if any.
+        """
+        try:
+            with open(self.path_for(config), "r") as f:
+                return json.load(f).get("server_version")
+        except Exception:
+            return None
+
+    def store(self, name: str, config: Dict[str, Any], tools: List["MCPTool"],
+              server_version: Optional[str] = None) -> None:
+        """
+        Write a server's tools to the catalog, replacing any previous entry atomically.
+
+        Args:
+            name: Name of the server
+            config: The server's entry from mcp_config.json
+            tools: The tools the server reported
+            server_version: The version from the server's initialize response
+        """
+        entry = {
+            "server": name,
+            "server_version": server_version,
+            "updated_at": time.time(),
+            "tools": [
+                tool.model_dump(mode="json", by_alias=True, exclude_none=True)
+                for tool in tools
+            ],
+        }
+        path = self.path_for(config)
+        try:
+            self.cache_dir.mkdir(parents=True, exist_ok=True)
+            fd, tmp_path = tempfile.mkstemp(dir=self.cache_dir, suffix=".tmp")
+            with os.fdopen(fd, "w") as f:
+                json.dump(entry, f)
+            os.replace(tmp_path, path)
+        except OSError as e:
+            logger.warning(f"Could not write catalog for {name}: {e}")
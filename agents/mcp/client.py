@@ -6,26 +6,34 @@ import os
 import json
 import asyncio
 import logging
-import shutil
-from typing import Dict, List, Any, Optional
+import time
+import importlib.util
+from typing import TYPE_CHECKING, Dict, List, Any, Optional
 from contextlib import AsyncExitStack
 
-# Configure logging
-logging.basicConfig(
-    level=logging.INFO,
-    format="%(asctime)s - %(name)s - %(levelname)s - %(message)s"
-)
 logger = logging.getLogger("mcp_client")
 
-try:
-    # Try to import MCP dependencies
-    from mcp import ClientSession, StdioServerParameters
-    from mcp.client.stdio import stdio_client
+if TYPE_CHECKING:
     from mcp.types import Tool as MCPTool
 
-    # Try to import Pydantic AI dependencies
-    from pydantic_ai import RunContext, Tool
-    from pydantic_ai.tools import ToolDefinition
+try:
+    # Check for MCP without importing it: the mcp package takes about half a second to
+    # load, so it is imported when the first server is spawned
+    if importlib.util.find_spec("mcp") is None:
+        raise ImportError("No module named 'mcp'")
+
+    # pydantic_ai is likewise only imported once tools are created
+    if importlib.util.find_spec("pydantic_ai") is None:
+        raise ImportError("No module named 'pydantic_ai'")
+    
+    from .catalog import ToolCatalog
+    from .result_cache import ToolResultCache
+    from .metrics import REGISTRY, MetricsRegistry
+    from .schema import schema_tool
+    from .result_store import ResultStore
+    from .daemon import DaemonSession, attachable_servers, connect_to_daemon
+    from .health import health_report, monitor_health
+    from .server import BaseMCPServer, reap_idle_servers
     
     MCP_AVAILABLE = True
     logger.info("MCP dependencies are available")
@@ -38,22 +46,43 @@ class MCPClient:
     Manages connections to one or more MCP servers based on config.json.
     Handles the case when MCP servers are not available.
     """
-    def __init__(self, config_path: str):
+    def __init__(self, config_path: str, catalog: Optional["ToolCatalog"] = None,
+                 result_cache: Optional["ToolResultCache"] = None,
+                 metrics: Optional["MetricsRegistry"] = None,
+                 result_store: Optional["ResultStore"] = None):
         """
         Initialize the MCP client.
         
         Args:
             config_path: Path to the configuration file
+            catalog: Optional on-disk tool catalog. Servers with a cached catalog advertise
+                their tools immediately while the handshake runs in the background.
+            result_cache: Optional cache for results of tools that opt in through the
+                "cache" section of their server's config entry
+            metrics: Registry for tool call and startup metrics (defaults to the shared REGISTRY)
+            result_store: Where results over a server's "max_result_bytes" are spilled
+                (defaults to a temp directory); the model pages through them with the
+                read_tool_result tool
         """
         self.config_path = config_path
         self.servers = []
         self.tools = []
+        self.startup_times: Dict[str, float] = {}
+        self.daemon = None
+        self.catalog = catalog
+        self.result_cache = result_cache
+        self.metrics = metrics
+        self.result_store = result_store
+        self._metrics_server = None
+        self._background_tasks = set()
         self.exit_stack = AsyncExitStack()
         
         # Check if MCP is available
         if not MCP_AVAILABLE:
             logger.warning("MCP is not available. Using fallback mode.")
             return
+        self.metrics = metrics or REGISTRY
+        self.result_store = result_store or ResultStore()
             
         # Load configuration
         try:
@@ -62,40 +91,297 @@ class MCPClient:
                 
             # Create server instances
             self.servers = [
-                MCPServer(name, config) 
+                MCPServer(name, config, catalog=catalog, result_cache=result_cache,
+                          metrics=self.metrics, result_store=self.result_store)
                 for name, config in self.config.get("mcpServers", {}).items()
             ]
             logger.info(f"Loaded {len(self.servers)} MCP servers from config")
         except Exception as e:
             logger.error(f"Error loading MCP configuration: {e}")
     
-    async def start(self) -> List:
+    async def start(self, concurrent: bool = False, startup_timeout: Optional[float] = None,
+                    lazy: bool = False, idle_timeout: Optional[float] = None,
+                    health_interval: Optional[float] = None, use_daemon: bool = True) -> List:
         """
         Start the MCP client and return the tools.
         
+        Args:
+            concurrent: Initialize and list tools for all servers at once instead of one after another
+            startup_timeout: Deadline in seconds for each server's initialize and tool discovery
+            lazy: Advertise tools from the catalog and start each server on its first tool call.
+                Servers without a catalog entry are started up front to discover their tools.
+            idle_timeout: Shut down servers that handled no tool call for this many seconds;
+                they start again on their next tool call
+            health_interval: Ping running servers this often (in seconds). A server that fails
+                its ping, or whose connection breaks during a call, reconnects in the background.
+            use_daemon: Attach to the daemon at MCP_DAEMON_SOCKET if one is running. The daemon
+                itself starts its servers with this off, so it never proxies to another daemon.
+            
         Returns:
-            A list of tools
+            A list of tools from the servers that came up
         """
         # If MCP is not available, return an empty list
         if not MCP_AVAILABLE:
             logger.warning("MCP is not available. Returning empty tools list.")
             return []
             
+        # Prefer a running daemon over spawning the servers ourselves
+        socket_path = os.getenv("MCP_DAEMON_SOCKET") if use_daemon else None
+        if socket_path and os.path.exists(socket_path):
+            try:
+                return await self.attach(socket_path, startup_timeout)
+            except Exception as e:
+                logger.warning(f"Could not attach to MCP daemon, starting servers locally: {e}")
+            
         # Start each server and collect tools
-        self.tools = []
+        self.tools = self._result_tools()
+        self.startup_times = {}
+        if lazy and self.catalog is None:
+            self.catalog = ToolCatalog()
+            for server in self.servers:
+                server.catalog = self.catalog
+        if idle_timeout:
+            self._run_in_background(reap_idle_servers(self.servers, idle_timeout))
+        if health_interval:
+            self._run_in_background(monitor_health(self.servers, health_interval))
+        
+        # Advertise cached catalogs right away and finish those handshakes in the background
+        servers = []
         for server in self.servers:
-            try:
-                logger.info(f"Initializing MCP server: {server.name}")
-                await server.initialize()
-                tools = await server.create_tools()
-                logger.info(f"Server {server.name} provided {len(tools)} tools")
+            server.startup_timeout = startup_timeout
+            cached = server.cached_tools_from_catalog()
+            if cached is None:
+                servers.append(server)
+                continue
+            logger.info(f"Server {server.name} provided {len(cached)} tools from the catalog")
+            self.tools.extend(cached)
+            if not lazy:
+                server.launch()
+                self._run_in_background(self._refresh_server(server, startup_timeout))
+            
+        if concurrent:
+            results = await asyncio.gather(
+                *(self._start_server(server, startup_timeout) for server in servers)
+            )
+            for tools in results:
                 self.tools.extend(tools)
-            except Exception as e:
-                logger.error(f"Error starting MCP server {server.name}: {e}")
+        else:
+            for server in servers:
+                self.tools.extend(await self._start_server(server, startup_timeout))
                 
         logger.info(f"Total MCP tools available: {len(self.tools)}")
         return self.tools
     
+    async def attach(self, socket_path: Optional[str] = None,
+                     startup_timeout: Optional[float] = None) -> List:
+        """
+        Attach to a running MCP daemon and return tools that proxy calls through its sessions.
+        
+        Servers the daemon does not run with the same command, args and env are started locally.
+        
+        Args:
+            socket_path: The daemon's Unix socket (defaults to MCP_DAEMON_SOCKET)
+            startup_timeout: Deadline in seconds for each locally started server
+            
+        Returns:
+            A list of tools
+        """
+        connection = await connect_to_daemon(socket_path)
+        if connection is None:
+            raise ConnectionError("No MCP daemon is listening")
+            
+        self.daemon = connection
+        self.tools = self._result_tools()
+        self.startup_times = {}
+        try:
+            attached = attachable_servers(await connection.request("list_servers"), self.servers)
+            for server in attached:
+                server.attach(DaemonSession(connection, server.name))
+                self.tools.extend(await server.create_tools())
+            logger.info(f"Attached to {len(attached)} MCP servers through the daemon")
+        except Exception:
+            for server in self.servers:
+                await server.cleanup()
+            await self._detach()
+            raise
+            
+        local = [server for server in self.servers if server not in attached]
+        results = await asyncio.gather(
+            *(self._start_server(server, startup_timeout) for server in local)
+        )
+        for tools in results:
+            self.tools.extend(tools)
+        return self.tools
+    
+    def _result_tools(self) -> List:
+        """
+        Get the read_tool_result tool if any server spills large results.
+        
+        Returns:
+            A list with the tool, or an empty list
+        """
+        if self.result_store is not None and any(server.max_result_bytes for server in self.servers):
+            return [self.result_store.tool()]
+        return []
+    
+    async def _detach(self) -> None:
+        """
+        Close the connection to the MCP daemon, if any.
+        """
+        if self.daemon is not None:
+            await self.daemon.close()
+            self.daemon = None
+    
+    async def _start_server(self, server: "MCPServer", startup_timeout: Optional[float]) -> List:
+        """
+        Start a single server and record how long it took.
+        
+        Args:
+            server: The server to start
+            startup_timeout: Deadline in seconds for initialize and tool discovery
+            
+        Returns:
+            The server's tools, or an empty list if it failed or timed out
+        """
+        started = time.perf_counter()
+        try:
+            logger.info(f"Initializing MCP server: {server.name}")
+            tools = await asyncio.wait_for(self._initialize_server(server), startup_timeout)
+        except asyncio.TimeoutError:
+            logger.error(f"MCP server {server.name} did not start within {startup_timeout}s")
+            await server.cleanup()
+            return []
+        except Exception as e:
+            logger.error(f"Error starting MCP server {server.name}: {e}")
+            await server.cleanup()
+            return []
+            
+        self.startup_times[server.name] = time.perf_counter() - started
+        logger.info(
+            f"Server {server.name} provided {len(tools)} tools "
+            f"in {self.startup_times[server.name]:.2f}s"
+        )
+        return tools
+    
+    def _run_in_background(self, coro: Any) -> None:
+        """
+        Run a coroutine as a task that is cancelled on cleanup.
+        """
+        task = asyncio.create_task(coro)
+        self._background_tasks.add(task)
+        task.add_done_callback(self._background_tasks.discard)
+    
+    async def _refresh_server(self, server: "MCPServer", startup_timeout: Optional[float]) -> None:
+        """
+        Finish starting a server whose tools came from the catalog, then refresh its entry.
+        
+        Args:
+            server: The launched server
+            startup_timeout: Deadline in seconds for the handshake
+        """
+        cached_names = [tool.name for tool in server.cached_tools or []]
+        cached_version = self.catalog.cached_version(server.config)
+        started = time.perf_counter()
+        try:
+            await asyncio.wait_for(server.wait_until_ready(), startup_timeout)
+            self.startup_times[server.name] = time.perf_counter() - started
+            tools = await server.create_tools()
+        except Exception as e:
+            logger.error(f"Error starting MCP server {server.name}: {e}")
+            await server.cleanup()
+            return
+            
+        if server.server_version != cached_version:
+            logger.info(f"Server {server.name} version changed, refreshed its catalog")
+        if [tool.name for tool in tools] != cached_names:
+            logger.warning(
+                f"Tools of server {server.name} changed since they were cached; "
+                "the new catalog applies from the next start"
+            )
+    
+    async def _initialize_server(self, server: "MCPServer") -> List:
+        """
+        Initialize a server and create its tools.
+        """
+        await server.initialize()
+        return await server.create_tools()
+    
+    def cache_stats(self) -> Dict[str, Any]:
+        """
+        Get the result cache's hit and miss counters.
+        
+        Returns:
+            The counters, or an empty dict if result caching is disabled
+        """
+        return self.result_cache.stats() if self.result_cache is not None else {}
+    
+    def scheduler_stats(self) -> Dict[str, Dict[str, Any]]:
+        """
+        Get queue depth, in-flight and wait time statistics for each server.
+        
+        Returns:
+            Server name to scheduler statistics mapping
+        """
+        return {server.name: server.scheduler.stats() for server in self.servers}
+    
+    def coalescing_stats(self) -> Dict[str, Dict[str, Any]]:
+        """
+        Get how many identical concurrent tool calls each server's calls absorbed.
+        
+        Returns:
+            Server name to coalescing statistics mapping
+        """
+        return {server.name: server.single_flight.stats() for server in self.servers}
+    
+    def schema_report(self) -> Dict[str, Dict[str, Any]]:
+        """
+        Get the bytes and tokens saved by compacting each server's tool schemas.
+        
+        Returns:
+            Server name to schema size report mapping
+        """
+        return {server.name: server.schema_stats.report() for server in self.servers}
+    
+    def server_health(self) -> Dict[str, Dict[str, Any]]:
+        """
+        Get whether each server is healthy, its last error and its reconnect attempts.
+        
+        Returns:
+            Server name to health mapping
+        """
+        return health_report(self.servers)
+    
+    def export_metrics(self, fmt: str = "json") -> Any:
+        """
+        Export the metrics registry.
+        
+        Args:
+            fmt: "json" for a JSON-serializable dict or "prometheus" for the text format
+            
+        Returns:
+            The metrics in the requested format
+        """
+        if self.metrics is None:
+            return "" if fmt == "prometheus" else {}
+        if fmt == "prometheus":
+            return self.metrics.to_prometheus()
+        return self.metrics.to_json()
+    
+    async def serve_metrics(self, host: str = "127.0.0.1", port: int = 9464) -> Any:
+        """
+        Serve the metrics over HTTP at /metrics and /metrics.json until cleanup.
+        
+        Args:
+            host: Interface to listen on
+            port: Port to listen on
+            
+        Returns:
+            The running asyncio server
+        """
+        if self._metrics_server is None and self.metrics is not None:
+            self._metrics_server = await self.metrics.serve(host, port)
+        return self._metrics_server
+    
     async def cleanup(self) -> None:
         """
         Clean up resources.
@@ -104,12 +390,22 @@ class MCPClient:
         if not MCP_AVAILABLE:
             return
             
+        # Stop background catalog refreshes
+        for task in list(self._background_tasks):
+            task.cancel()
+        await asyncio.gather(*self._background_tasks, return_exceptions=True)
+            
         # Clean up each server
         for server in self.servers:
             try:
                 await server.cleanup()
             except Exception as e:
                 logger.error(f"Error cleaning up MCP server: {e}")
+        await self._detach()
+        if self._metrics_server is not None:
+            self._metrics_server.close()
+            self._metrics_server = None
+        self.result_store.close()
                 
         # Close the exit stack
         try:
@@ -117,68 +413,31 @@ class MCPClient:
         except Exception as e:
             logger.error(f"Error closing exit stack: {e}")
 
+    def terminate(self) -> None:
+        """
+        Terminate the server processes and the daemon connection without the event loop.
+
+        For clients whose event loop was closed before cleanup() ran; use cleanup() otherwise.
+        """
+        self._background_tasks = set()
+        for server in self.servers:
+            server.terminate()
+        if self.daemon is not None:
+            self.daemon.abort()
+            self.daemon = None
+        self._metrics_server = None
+        if self.result_store is not None:
+            self.result_store.close()
+
 # Only define MCPServer if MCP is available
 if MCP_AVAILABLE:
-    class MCPServer:
+    class MCPServer(BaseMCPServer):
         """
         Manages a connection to a single MCP server and its tools.
-        """
-        def __init__(self, name: str, config: Dict[str, Any]):
-            """
-            Initialize a server connection.
-            
-            Args:
-                name: Name of the server
-                config: Server configuration
-            """
-            self.name = name
-            self.config = config
-            self.session = None
-            self.exit_stack = AsyncExitStack()
-            self._cleanup_lock = asyncio.Lock()
-        
-        async def initialize(self) -> None:
-            """
-            Initialize and connect to the MCP server.
-            """
-            # Get command (handle npx specially)
-            command = self.config.get("command")
-            if command == "npx":
-                command = shutil.which("npx")
-                if not command:
-                    raise ValueError("npx command not found. Please install Node.js and npm.")
-            
-            # Get arguments and environment
-            args = self.config.get("args", [])
-            env = self.config.get("env")
-            
-            try:
-                # Create server parameters
-                server_params = StdioServerParameters(
-                    command=command,
-                    args=args,
-                    env=env
-                )
-                
-                # Start the server process
-                stdio_transport = await self.exit_stack.enter_async_context(
-                    stdio_client(server_params)
-                )
-                
-                # Create and initialize session
-                read, write = stdio_transport
-                session = await self.exit_stack.enter_async_context(
-                    ClientSession(read, write)
-                )
-                await session.initialize()
-                
-                self.session = session
-                logger.info(f"Successfully initialized MCP server: {self.name}")
-            except Exception as e:
-                logger.error(f"Failed to initialize MCP server {self.name}: {e}")
-                await self.cleanup()
-                raise
         
+        The lifecycle and call pipeline are shared with the lightweight client through
+        BaseMCPServer.
+        """
         async def create_tools(self) -> List:
             """
             Create tools from the MCP server.
@@ -186,21 +445,32 @@ if MCP_AVAILABLE:
             Returns:
                 A list of tools
             """
-            # Get tools from the server
             try:
-                tools_response = await self.session.list_tools()
-                mcp_tools = tools_response.tools
-                
-                # Convert MCP tools to Pydantic AI tools
-                return [self._create_tool(tool) for tool in mcp_tools]
+                mcp_tools = await self.list_tools()
             except Exception as e:
                 logger.error(f"Error getting tools from server {self.name}: {e}")
                 return []
+            return [self._create_tool(tool) for tool in mcp_tools]
         
-        def _create_tool(self, mcp_tool: MCPTool):
+        def cached_tools_from_catalog(self) -> Optional[List]:
+            """
+            Create tools from the catalog without contacting the server.
+            
+            Returns:
+                A list of tools, or None if the catalog has no entry for this server
+            """
+            cached = self.load_catalog()
+            if cached is None:
+                return None
+            return [self._create_tool(tool) for tool in cached]
+        
+        def _create_tool(self, mcp_tool: "MCPTool"):
             """
             Create a Pydantic AI tool from an MCP tool.
             
+            Results over max_result_bytes are spilled to the result store and only their
+            first part is returned.
+            
             Args:
                 mcp_tool: The MCP tool
                 
@@ -210,33 +480,15 @@ if MCP_AVAILABLE:
             # Create the execute function
             async def execute_tool(**kwargs):
                 try:
-                    return await self.session.call_tool(mcp_tool.name, arguments=kwargs)
+                    result = await self.call_tool(mcp_tool.name, kwargs)
                 except Exception as e:
                     logger.error(f"Error calling tool {mcp_tool.name}: {e}")
                     return {"error": str(e)}
+                return self.bound_result(mcp_tool.name, result)
             
-            # Create the prepare function
-            async def prepare_tool(ctx: RunContext, tool_def: ToolDefinition):
-                tool_def.parameters_json_schema = mcp_tool.inputSchema
-                return tool_def
-            
-            # Create and return the tool
-            return Tool(
+            return schema_tool(
                 execute_tool,
-                name=mcp_tool.name,
-                description=mcp_tool.description or f"MCP tool from server {self.name}",
-                takes_ctx=False,
-                prepare=prepare_tool
+                mcp_tool.name,
+                mcp_tool.description or f"MCP tool from server {self.name}",
+                self.prepare_tool(mcp_tool),
             )
-        
-        async def cleanup(self) -> None:
-            """
-            Clean up server resources.
-            """
-            async with self._cleanup_lock:
-                try:
-                    await self.exit_stack.aclose()
-                    self.session = None
-                    logger.info(f"Cleaned up MCP server: {self.name}")
-                except Exception as e:
-                    logger.error(f"Error during cleanup of server {self.name}: {e}")
\ No newline at end of file
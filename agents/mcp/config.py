@@ -0,0 +1,90 @@
+"""
+Helpers for reading entries of the "mcpServers" section of mcp_config.json.
+"""
+import os
+import sys
+import json
+import hashlib
+from typing import Any, Dict, List, Tuple
+
+# Standalone script that relays a server's stdio and records its traffic
+TRAFFIC_SCRIPT = os.path.join(os.path.dirname(os.path.abspath(__file__)), "traffic.py")
+
+
+def server_fingerprint(config: Dict[str, Any]) -> str:
+    """
+    Compute a stable hash identifying how a server is launched.
+    
+    Only the command, arguments and environment are included, so options that
+    do not change which process is spawned leave the fingerprint untouched.
+    
+    Args:
+        config: The server's entry from the "mcpServers" section
+        
+    Returns:
+        A hex digest of the launch configuration
+    """
+    launch = {
+        "command": config.get("command"),
+        "args": config.get("args") or [],
+        "env": config.get("env") or {},
+    }
+    encoded = json.dumps(launch, sort_keys=True, separators=(",", ":"))
+    return hashlib.sha256(encoded.encode("utf-8")).hexdigest()
+
+
+# Servers that keep state in their process and must never be replicated
+STATEFUL_PACKAGES = ("@modelcontextprotocol/server-memory",)
+
+
+def is_stateful(config: Dict[str, Any]) -> bool:
+    """
+    Check whether a server keeps state in its process.
+    
+    A server is stateful if its entry sets "stateful": true, or if it runs a
+    package known to keep state (such as the memory server) and does not set
+    "stateful": false.
+    
+    Args:
+        config: The server's entry from the "mcpServers" section
+        
+    Returns:
+        True if calls must all go to a single process
+    """
+    if "stateful" in config:
+        return bool(config["stateful"])
+    return any(package in config.get("args", []) for package in STATEFUL_PACKAGES)
+
+
+def replica_count(config: Dict[str, Any]) -> int:
+    """
+    Get the number of server processes to run for an entry.
+    
+    Args:
+        config: The server's entry from the "mcpServers" section
+        
+    Returns:
+        The configured "replicas" (default 1), or 1 for stateful servers
+    """
+    if is_stateful(config):
+        return 1
+    return max(1, int(config.get("replicas", 1)))
+
+
+def launch_command(command: str, args: List[str], config: Dict[str, Any]) -> Tuple[str, List[str]]:
+    """
+    Get the command line that starts a server, wrapped in the traffic recorder if the
+    entry sets "record_traffic" to a JSONL file.
+    
+    Args:
+        command: Resolved server command
+        args: Server arguments
+        config: The server's entry from the "mcpServers" section
+        
+    Returns:
+        Tuple of (command, args) to spawn
+    """
+    output = config.get("record_traffic")
+    if not output:
+        return command, list(args)
+    return sys.executable, [TRAFFIC_SCRIPT, "record", "--output", os.path.abspath(output), "--", command, *args]
@@ -0,0 +1,482 @@
+"""
+Long-lived supervisor that owns MCP server sessions and shares them over a Unix socket.
+
+Run it once per host:
+
+    python -m agents.mcp.daemon --config mcp_config.json
+
+Agent processes then attach to it instead of spawning every stdio server themselves,
+either by calling MCPClient.attach() or by setting MCP_DAEMON_SOCKET before start().
+
+The wire protocol is one JSON object per line. Requests look like
+{"id": 1, "method": "call_tool", "params": {...}} and responses carry the same id
+with either a "result" or an "error" field.
+"""
+import os
+import re
+import json
+import signal
+import socket
+import asyncio
+import logging
+import argparse
+import tempfile
+from typing import TYPE_CHECKING, Dict, List, Any, Optional, Set, Tuple
+
+from .config import server_fingerprint
+
+if TYPE_CHECKING:
+    from mcp.types import CallToolResult, EmptyResult, ListToolsResult
+
+logger = logging.getLogger("mcp_daemon")
+
+DEFAULT_SOCKET_PATH = os.path.join(
+    tempfile.gettempdir(), f"mcp-agent-factory-{os.getuid()}.sock"
+)
+
+# Large tool results (e.g. fetched pages) travel as a single line
+STREAM_LIMIT = 64 * 1024 * 1024
+
+# Requests and responses start with their id, so it survives in a skipped message's first bytes
+_MESSAGE_ID = re.compile(rb'\{"id":\s*(\d+)')
+
+
+def default_socket_path() -> str:
+    """
+    Get the socket path from MCP_DAEMON_SOCKET, falling back to a per-user temp path.
+    """
+    return os.getenv("MCP_DAEMON_SOCKET") or DEFAULT_SOCKET_PATH
+
+
+class DaemonError(Exception):
+    """Raised when the daemon reports an error for a request."""
+
+
+class DaemonDisconnected(DaemonError):
+    """Raised when the connection to the daemon is closed or lost."""
+
+
+async def read_message(reader: asyncio.StreamReader) -> Tuple[bytes, bool]:
+    """
+    Read one newline-terminated message.
+
+    A message over the stream limit is skipped instead of breaking the stream, so the
+    other side can be sent an error for it and the connection stays usable.
+
+    Args:
+        reader: The stream to read from
+
+    Returns:
+        Tuple of (message, whether it was skipped). A skipped message is cut to its first
+        bytes; the message is empty at the end of the stream.
+    """
+    head = None
+    while True:
+        try:
+            line = await reader.readuntil(b"\n")
+        except asyncio.IncompleteReadError as e:
+            line = e.partial
+        except asyncio.LimitOverrunError as e:
+            chunk = await reader.read(e.consumed)
+            if head is None:
+                head = chunk[:1024]
+            continue
+        if head is None:
+            return line, False
+        return head, True
+
+
+def message_id(message: bytes) -> Optional[int]:
+    """
+    Get the id of a request or response from its first bytes.
+    """
+    match = _MESSAGE_ID.match(message)
+    return int(match.group(1)) if match else None
+
+
+class MCPDaemon:
+    """
+    Starts every server in a config once and serves their sessions to attached clients.
+    """
+    def __init__(self, config_path: str, socket_path: Optional[str] = None,
+                 startup_timeout: Optional[float] = None):
+        """
+        Initialize the daemon.
+
+        Args:
+            config_path: Path to the MCP configuration file
+            socket_path: Unix socket to listen on
+            startup_timeout: Deadline in seconds for each server to start
+        """
+        # Imported here because client.py imports this module for attach mode
+        from .client import MCPClient
+        from .result_cache import ToolResultCache
+
+        self.config_path = config_path
+        self.socket_path = socket_path or default_socket_path()
+        self.startup_timeout = startup_timeout
+        # Shared by every attached client, for tools with a "cache" policy in the config
+        self.client = MCPClient(config_path, result_cache=ToolResultCache())
+        self.servers: Dict[str, Any] = {}
+        self._server: Optional[asyncio.AbstractServer] = None
+        self._connections: Set[asyncio.StreamWriter] = set()
+        self._stopped = asyncio.Event()
+
+    async def start(self) -> None:
+        """
+        Start all configured servers and begin listening on the socket.
+        """
+        await self.client.start(concurrent=True, startup_timeout=self.startup_timeout, use_daemon=False)
+        self.servers = {
+            server.name: server for server in self.client.servers if server.session is not None
+        }
+        logger.info(f"Serving {len(self.servers)} MCP servers: {', '.join(self.servers)}")
+
+        # Remove a stale socket left behind by a previous daemon
+        if os.path.exists(self.socket_path):
+            os.unlink(self.socket_path)
+        # Created owner-only, so other users never get a window to connect
+        umask = os.umask(0o177)
+        try:
+            self._server = await asyncio.start_unix_server(
+                self._handle_connection, path=self.socket_path, limit=STREAM_LIMIT
+            )
+        finally:
+            os.umask(umask)
+        logger.info(f"MCP daemon listening on {self.socket_path}")
+
+    async def serve_forever(self) -> None:
+        """
+        Start the daemon and serve until stop() is called or a termination signal arrives.
+        """
+        await self.start()
+        loop = asyncio.get_running_loop()
+        for sig in (signal.SIGINT, signal.SIGTERM):
+            loop.add_signal_handler(sig, self._stopped.set)
+        try:
+            await self._stopped.wait()
+        finally:
+            await self.stop()
+
+    async def stop(self) -> None:
+        """
+        Stop listening and shut down every server.
+        """
+        self._stopped.set()
+        if self._server is not None:
+            self._server.close()
+            # Attached clients see the daemon go away and start their servers locally
+            for writer in list(self._connections):
+                writer.close()
+            await self._server.wait_closed()
+            self._server = None
+        if os.path.exists(self.socket_path):
+            os.unlink(self.socket_path)
+        await self.client.cleanup()
+
+    async def _handle_connection(self, reader: asyncio.StreamReader,
+                                 writer: asyncio.StreamWriter) -> None:
+        """
+        Serve requests from one attached client. Requests are handled concurrently.
+        """
+        write_lock = asyncio.Lock()
+        pending = set()
+        self._connections.add(writer)
+        try:
+            while True:
+                line, skipped = await read_message(reader)
+                if not line:
+                    break
+                if skipped:
+                    logger.error(f"Daemon request exceeds the {STREAM_LIMIT} byte limit")
+                    response = {"id": message_id(line),
+                                "error": f"Request exceeds the daemon's {STREAM_LIMIT} byte limit"}
+                    task = asyncio.create_task(self._write(response, writer, write_lock))
+                else:
+                    task = asyncio.create_task(self._respond(line, writer, write_lock))
+                pending.add(task)
+                task.add_done_callback(pending.discard)
+        except (ConnectionError, asyncio.IncompleteReadError) as e:
+            logger.warning(f"Client connection lost: {e}")
+        finally:
+            self._connections.discard(writer)
+            for task in pending:
+                task.cancel()
+            writer.close()
+
+    async def _respond(self, line: bytes, writer: asyncio.StreamWriter,
+                       write_lock: asyncio.Lock) -> None:
+        """
+        Dispatch a single request line and write its response.
+        """
+        request_id = None
+        try:
+            request = json.loads(line)
+            request_id = request.get("id")
+            result = await self._dispatch(request["method"], request.get("params") or {})
+            response = {"id": request_id, "result": result}
+        except Exception as e:
+            logger.error(f"Error handling daemon request: {e}")
+            response = {"id": request_id, "error": str(e)}
+        await self._write(response, writer, write_lock)
+
+    async def _write(self, response: Dict[str, Any], writer: asyncio.StreamWriter,
+                     write_lock: asyncio.Lock) -> None:
+        """
+        Write a response line, one at a time per connection.
+        """
+        async with write_lock:
+            writer.write(json.dumps(response).encode("utf-8") + b"\n")
+            await writer.drain()
+
+    async def _dispatch(self, method: str, params: Dict[str, Any]) -> Any:
+        """
+        Run a request against the owned servers.
+
+        Args:
+            method: One of list_servers, list_tools, call_tool or ping
+            params: Method parameters
+
+        Returns:
+            A JSON-serializable result
+        """
+        if method == "list_servers":
+            return {
+                name: server_fingerprint(server.config)
+                for name, server in self.servers.items()
+            }
+
+        server = self.servers.get(params.get("server"))
+        if method == "call_tool" and server is not None:
+            # Through the server, so its replicas, scheduler, result cache and coalescing apply
+            result = await server.call_tool(params["name"], params.get("arguments") or {})
+        elif server is None or server.session is None:
+            raise DaemonError(f"Server {params.get('server')!r} is not available")
+        elif method == "list_tools":
+            result = await server.session.list_tools(cursor=params.get("cursor"))
+        elif method == "ping":
+            result = await server.session.send_ping()
+        else:
+            raise DaemonError(f"Unknown method {method!r}")
+        return result.model_dump(mode="json", by_alias=True, exclude_none=True)
+
+
+class DaemonConnection:
+    """
+    A multiplexed connection from an agent process to the daemon.
+    """
+    def __init__(self, socket_path: Optional[str] = None):
+        """
+        Initialize the connection.
+
+        Args:
+            socket_path: Unix socket the daemon listens on
+        """
+        self.socket_path = socket_path or default_socket_path()
+        self._reader: Optional[asyncio.StreamReader] = None
+        self._writer: Optional[asyncio.StreamWriter] = None
+        self._reader_task: Optional[asyncio.Task] = None
+        self._pending: Dict[int, asyncio.Future] = {}
+        self._next_id = 0
+        self._error: Optional[Exception] = None
+
+    async def connect(self) -> None:
+        """
+        Open the socket and start reading responses.
+        """
+        self._reader, self._writer = await asyncio.open_unix_connection(
+            self.socket_path, limit=STREAM_LIMIT
+        )
+        self._reader_task = asyncio.create_task(self._read_responses())
+
+    async def request(self, method: str, params: Optional[Dict[str, Any]] = None) -> Any:
+        """
+        Send a request and wait for its response.
+
+        Args:
+            method: Daemon method name
+            params: Method parameters
+
+        Returns:
+            The decoded result
+        """
+        if self._reader_task is not None and self._reader_task.done():
+            raise DaemonDisconnected(f"Not connected to the MCP daemon: {self._error}")
+        if self._writer is None:
+            raise DaemonDisconnected("Not connected to the MCP daemon")
+
+        self._next_id += 1
+        request_id = self._next_id
+        future = asyncio.get_running_loop().create_future()
+        self._pending[request_id] = future
+        try:
+            payload = {"id": request_id, "method": method, "params": params or {}}
+            self._writer.write(json.dumps(payload).encode("utf-8") + b"\n")
+            await self._writer.drain()
+            return await future
+        finally:
+            self._pending.pop(request_id, None)
+
+    async def _read_responses(self) -> None:
+        """
+        Resolve pending requests as responses arrive.
+        """
+        error: Exception = DaemonDisconnected("The MCP daemon closed the connection")
+        try:
+            while True:
+                line, skipped = await read_message(self._reader)
+                if not line:
+                    break
+                if skipped:
+                    response = {"id": message_id(line),
+                                "error": f"Response exceeds the {STREAM_LIMIT} byte limit"}
+                else:
+                    response = json.loads(line)
+                future = self._pending.get(response.get("id"))
+                if future is None or future.done():
+                    continue
+                if "error" in response:
+                    future.set_exception(DaemonError(response["error"]))
+                else:
+                    future.set_result(response.get("result"))
+        except Exception as e:
+            error = DaemonDisconnected(f"Lost the connection to the MCP daemon: {e!r}")
+        finally:
+            # Requests sent from now on fail at once instead of waiting for a reply
+            self._error = error
+            if self._writer is not None:
+                self._writer.close()
+                self._writer = None
+            for future in self._pending.values():
+                if not future.done():
+                    future.set_exception(error)
+
+    async def close(self) -> None:
+        """
+        Close the connection.
+        """
+        if self._writer is not None:
+            self._writer.close()
+            self._writer = None
+        if self._reader_task is not None:
+            self._reader_task.cancel()
+            await asyncio.gather(self._reader_task, return_exceptions=True)
+            self._reader_task = None
+
+    def abort(self) -> None:
+        """
+        Shut the socket down without going through the event loop, e.g. once it is closed.
+        """
+        if self._writer is not None:
+            sock = self._writer.get_extra_info("socket")
+            if sock is not None:
+                try:
+                    sock.shutdown(socket.SHUT_RDWR)
+                except OSError:
+                    pass
+            self._writer = None
+        self._reader_task = None
+
+
+class DaemonSession:
+    """
+    Stand-in for mcp.ClientSession that proxies one server's requests to the daemon.
+    """
+    def __init__(self, connection: DaemonConnection, server_name: str):
+        """
+        Initialize the proxy session.
+
+        Args:
+            connection: An open daemon connection
+            server_name: Name of the server in the daemon's config
+        """
+        self.connection = connection
+        self.server_name = server_name
+
+    async def list_tools(self, cursor: Optional[str] = None) -> "ListToolsResult":
+        """
+        List the server's tools through the daemon.
+        """
+        result = await self.connection.request(
+            "list_tools", {"server": self.server_name, "cursor": cursor}
+        )
+        from mcp.types import ListToolsResult
+        return ListToolsResult.model_validate(result)
+
+    async def call_tool(self, name: str, arguments: Optional[Dict[str, Any]] = None) -> "CallToolResult":
+        """
+        Call a tool on the server through the daemon.
+        """
+        result = await self.connection.request(
+            "call_tool", {"server": self.server_name, "name": name, "arguments": arguments}
+        )
+        from mcp.types import CallToolResult
+        return CallToolResult.model_validate(result)
+
+    async def send_ping(self) -> "EmptyResult":
+        """
+        Ping the server through the daemon.
+        """
+        result = await self.connection.request("ping", {"server": self.server_name})
+        from mcp.types import EmptyResult
+        return EmptyResult.model_validate(result)
+
+
+async def connect_to_daemon(socket_path: Optional[str] = None) -> Optional[DaemonConnection]:
+    """
+    Connect to a running daemon if one is listening.
+
+    Args:
+        socket_path: Unix socket the daemon listens on
+
+    Returns:
+        An open connection, or None if no daemon is reachable
+    """
+    connection = DaemonConnection(socket_path)
+    if not os.path.exists(connection.socket_path):
+        return None
+    try:
+        await connection.connect()
+    except OSError as e:
+        logger.warning(f"MCP daemon at {connection.socket_path} is not reachable: {e}")
+        return None
+    return connection
+
+
+def attachable_servers(served: Dict[str, str], servers: List[Any]) -> List[Any]:
+    """
+    Pick the configured servers the daemon runs with an identical launch configuration.
+
+    Args:
+        served: Server name to fingerprint mapping reported by the daemon
+        servers: The client's MCPServer instances
+
+    Returns:
+        The servers that can be proxied through the daemon
+    """
+    return [
+        server for server in servers
+        if served.get(server.name) == server_fingerprint(server.config)
+    ]
+
+
+async def main() -> None:
+    """
+    Main entry point for the daemon.
+    """
+    parser = argparse.ArgumentParser(description="MCP server daemon")
+    parser.add_argument("--config", default="mcp_config.json", help="Path to MCP config file")
+    parser.add_argument("--socket", help="Unix socket path (defaults to MCP_DAEMON_SOCKET)")
+    parser.add_argument("--startup-timeout", type=float, help="Per-server startup deadline in seconds")
+    args = parser.parse_args()
+
+    logging.basicConfig(
+        level=logging.INFO,
+        format="%(asctime)s - %(name)s - %(levelname)s - %(message)s"
+    )
+    daemon = MCPDaemon(args.config, args.socket, args.startup_timeout)
+    await daemon.serve_forever()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
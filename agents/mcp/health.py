@@ -0,0 +1,230 @@
+"""
+Health checks, fail-fast calls and reconnects for MCP server connections.
+
+A stdio server can crash, hang or close its pipes in the middle of a run. Without a check,
+every call to it then waits for a reply that never comes. BaseMCPServer, the base of both
+clients' MCPServer classes, mixes in ServerHealth:
+
+- check_health() pings every replica and marks the server down if a ping fails or times out.
+  The clients run it periodically with start(health_interval=...).
+- Calls in flight when the connection is lost fail at once with ConnectionError, and calls
+  made while the server is down fail immediately instead of queueing.
+- A server that is down reconnects in the background with exponential backoff and full
+  jitter, starting at "reconnect_initial_delay" and capped at "reconnect_max_delay" seconds
+  (both can be set in the server's entry in mcp_config.json).
+
+server_health() reports per-server state, and the mcp_server_failures_total and
+mcp_server_reconnects_total counters are kept in the metrics registry.
+"""
+import random
+import asyncio
+import logging
+from typing import Any, Dict, Iterable, Optional
+
+logger = logging.getLogger("mcp_health")
+
+
+def is_connection_lost(error: BaseException) -> bool:
+    """
+    Check whether an error means the session's server process or pipes are gone.
+    """
+    # Only needed once a call fails, so neither is imported up front
+    import anyio
+    from mcp.shared.exceptions import McpError
+    from mcp.types import CONNECTION_CLOSED
+    from .daemon import DaemonDisconnected
+
+    if isinstance(error, DaemonDisconnected):
+        # The daemon is gone; the server is started locally by the reconnect
+        return True
+    if isinstance(error, McpError):
+        # Raised for requests that were pending when the server's stdout closed
+        return error.error.code == CONNECTION_CLOSED
+    return isinstance(error, (anyio.ClosedResourceError, anyio.BrokenResourceError, anyio.EndOfStream))
+
+
+class ServerHealth:
+    """
+    Mixin that adds health checks and reconnects to an MCPServer.
+
+    The server provides name, metrics, startup_timeout, launch(), wait_until_ready() and
+    _stop_connection(), calls _init_health() from __init__ and creates a fresh
+    _connection_lost future in launch().
+    """
+    # Reconnect backoff in seconds, overridable with the same keys in the server's config entry
+    reconnect_initial_delay: float = 0.5
+    reconnect_max_delay: float = 30.0
+
+    def _init_health(self, config: Dict[str, Any]) -> None:
+        """
+        Initialize the health state.
+
+        Args:
+            config: The server's entry from the "mcpServers" section
+        """
+        self.healthy = True
+        self.last_error: Optional[str] = None
+        self.reconnect_attempts = 0
+        self.reconnect_initial_delay = float(config.get("reconnect_initial_delay", self.reconnect_initial_delay))
+        self.reconnect_max_delay = float(config.get("reconnect_max_delay", self.reconnect_max_delay))
+        self._connection_lost: Optional[asyncio.Future] = None
+        self._reconnect_task: Optional[asyncio.Task] = None
+
+    def is_reconnecting(self) -> bool:
+        """
+        Whether the server is down and a reconnect is in progress.
+        """
+        return self._reconnect_task is not None and not self._reconnect_task.done()
+
+    def health(self) -> Dict[str, Any]:
+        """
+        Report whether the server is healthy, its last error and its reconnect attempts.
+        """
+        return {
+            "healthy": self.healthy,
+            "running": self.is_running(),
+            "reconnecting": self.is_reconnecting(),
+            "last_error": self.last_error,
+            "reconnect_attempts": self.reconnect_attempts,
+        }
+
+    async def check_health(self, timeout: float) -> bool:
+        """
+        Ping every replica, marking the server down if any ping fails or times out.
+
+        Args:
+            timeout: Seconds to wait for the pings
+
+        Returns:
+            Whether every replica answered
+        """
+        try:
+            await asyncio.wait_for(
+                asyncio.gather(*(session.send_ping() for session in self.sessions)), timeout
+            )
+            return True
+        except Exception as e:
+            self.mark_down(e if str(e) else ConnectionError(f"ping timed out after {timeout}s"))
+            return False
+
+    def mark_down(self, error: BaseException) -> None:
+        """
+        Fail the server's in-flight calls and start reconnecting it in the background.
+
+        Args:
+            error: Why the server is considered down
+        """
+        if self.is_reconnecting():
+            return
+        logger.error(f"MCP server {self.name} is down, reconnecting: {error!r}")
+        self.healthy = False
+        self.last_error = repr(error)
+        self.metrics.inc("mcp_server_failures_total", server=self.name)
+        if self._connection_lost is not None and not self._connection_lost.done():
+            self._connection_lost.set_result(None)
+        self._reconnect_task = asyncio.create_task(
+            self._reconnect(), name=f"mcp-server-{self.name}-reconnect"
+        )
+
+    async def _reconnect(self) -> None:
+        """
+        Restart the connection with exponential backoff until it comes back up.
+        """
+        delay = self.reconnect_initial_delay
+        self.reconnect_attempts = 0
+        while True:
+            await self._stop_connection()
+            self.reconnect_attempts += 1
+            try:
+                self.launch()
+                await asyncio.wait_for(self.wait_until_ready(), self.startup_timeout)
+            except Exception as e:
+                self.last_error = repr(e)
+                # Full jitter keeps replicas of many clients from retrying in lockstep
+                wait = random.uniform(0, delay)
+                logger.warning(
+                    f"Reconnect {self.reconnect_attempts} to MCP server {self.name} failed, "
+                    f"retrying in {wait:.1f}s: {e}"
+                )
+                await asyncio.sleep(wait)
+                delay = min(delay * 2, self.reconnect_max_delay)
+                continue
+            self.healthy = True
+            logger.info(f"MCP server {self.name} reconnected after {self.reconnect_attempts} attempt(s)")
+            self.metrics.inc("mcp_server_reconnects_total", server=self.name)
+            return
+
+    async def _stop_reconnecting(self) -> None:
+        """
+        Cancel a reconnect in progress, unless it is the caller.
+        """
+        task = self._reconnect_task
+        if task is not None and task is not asyncio.current_task():
+            task.cancel()
+            await asyncio.gather(task, return_exceptions=True)
+            self._reconnect_task = None
+
+    def _fail_fast(self) -> None:
+        """
+        Raise ConnectionError if the server is down and reconnecting.
+        """
+        if self.is_reconnecting():
+            raise ConnectionError(f"MCP server {self.name} is unavailable, reconnecting: {self.last_error}")
+
+    async def _call_or_fail(self, session: Any, name: str, arguments: Dict[str, Any]) -> Any:
+        """
+        Call a tool on a session, failing as soon as the connection is lost.
+
+        Attached sessions (e.g. through the daemon) have no connection of ours to lose; errors
+        are reported by their owner.
+
+        Args:
+            session: The replica's session
+            name: Name of the tool
+            arguments: Tool arguments
+
+        Returns:
+            The tool result
+        """
+        lost = self._connection_lost
+        call = asyncio.ensure_future(session.call_tool(name, arguments=arguments))
+        try:
+            if lost is not None:
+                await asyncio.wait((call, lost), return_when=asyncio.FIRST_COMPLETED)
+                if not call.done():
+                    raise ConnectionError(f"MCP server {self.name} went down during the call to {name}")
+            return await call
+        except Exception as e:
+            if not is_connection_lost(e):
+                raise
+            self.mark_down(e)
+            raise ConnectionError(f"MCP server {self.name} went down during the call to {name}") from e
+        finally:
+            if not call.done():
+                call.cancel()
+
+
+def health_report(servers: Iterable[Any]) -> Dict[str, Dict[str, Any]]:
+    """
+    Get the health of each server.
+
+    Returns:
+        Server name to health mapping
+    """
+    return {server.name: server.health() for server in servers}
+
+
+async def monitor_health(servers: Iterable[Any], interval: float) -> None:
+    """
+    Ping running servers every interval seconds; failing servers reconnect themselves.
+
+    Args:
+        servers: The client's servers
+        interval: Seconds between checks, also used as the ping timeout
+    """
+    while True:
+        await asyncio.sleep(interval)
+        await asyncio.gather(*(
+            server.check_health(timeout=interval)
+            for server in servers if server.is_running()
+        ))
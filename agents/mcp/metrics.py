@@ -0,0 +1,286 @@
+"""
+In-process metrics for MCP tool calls, server startup and model requests.
+
+Both MCP clients record into the shared REGISTRY unless they are given their own:
+
+    mcp_tool_call_seconds{server,tool}          histogram of tool call latency
+    mcp_tool_calls_total{server,tool}           tool calls
+    mcp_tool_errors_total{server,tool}          calls that raised or returned an error result
+    mcp_tool_result_bytes_total{server,tool}    bytes of content returned
+    mcp_server_startup_seconds{server}          histogram of launch-to-handshake time
+    mcp_server_failures_total{server}           times a server was detected as down
+    mcp_server_reconnects_total{server}         successful reconnects
+    model_request_seconds{model}                histogram of model request latency (MetricsModel)
+    model_tokens_total{model,kind}              request and response tokens (MetricsModel)
+    agent_run_seconds{status}                   histogram of run_agent duration
+
+The registry renders as Prometheus text or JSON and can be served over HTTP:
+
+    await client.serve_metrics(port=9464)   # GET /metrics or /metrics.json
+"""
+import json
+import bisect
+import asyncio
+import logging
+from typing import Any, Dict, List, Optional, Tuple
+
+logger = logging.getLogger("mcp_metrics")
+
+# Seconds; spans cached results (sub-millisecond) to slow web tools and model calls
+DEFAULT_BUCKETS = (
+    0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0
+)
+
+_DESCRIPTIONS = {
+    "mcp_tool_call_seconds": ("histogram", "Latency of MCP tool calls in seconds"),
+    "mcp_tool_calls_total": ("counter", "MCP tool calls"),
+    "mcp_tool_errors_total": ("counter", "MCP tool calls that raised or returned an error result"),
+    "mcp_tool_result_bytes_total": ("counter", "Bytes of content returned by MCP tools"),
+    "mcp_server_startup_seconds": ("histogram", "Time from launching an MCP server to a completed handshake in seconds"),
+    "mcp_server_failures_total": ("counter", "Times an MCP server was detected as down"),
+    "mcp_server_reconnects_total": ("counter", "Successful reconnects to an MCP server"),
+    "model_request_seconds": ("histogram", "Latency of model requests in seconds"),
+    "model_request_errors_total": ("counter", "Model requests that raised"),
+    "model_tokens_total": ("counter", "Tokens used by model requests"),
+    "agent_run_seconds": ("histogram", "Duration of agent runs in seconds"),
+}
+
+Labels = Tuple[Tuple[str, str], ...]
+
+
+def result_size(result: Any) -> int:
+    """
+    Count the bytes of text and binary content in a tool result.
+    """
+    size = 0
+    for item in getattr(result, "content", None) or []:
+        text = getattr(item, "text", None)
+        if text is not None:
+            size += len(text.encode("utf-8"))
+        data = getattr(item, "data", None)
+        if data is not None:
+            size += len(data)
+    return size
+
+
+class _Histogram:
+    def __init__(self, buckets: Tuple[float, ...]):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)
+        self.count = 0
+        self.sum = 0.0
+
+    def observe(self, value: float) -> None:
+        self.counts[bisect.bisect_left(self.buckets, value)] += 1
+        self.count += 1
+        self.sum += value
+
+    def cumulative(self) -> List[int]:
+        total, cumulative = 0, []
+        for count in self.counts:
+            total += count
+            cumulative.append(total)
+        return cumulative
+
+    def quantile(self, q: float) -> Optional[float]:
+        """
+        Estimate a quantile by interpolating within its bucket, like histogram_quantile().
+        """
+        if not self.count:
+            return None
+        rank = q * self.count
+        lower_bound, seen = 0.0, 0
+        for upper_bound, count in zip(self.buckets, self.counts):
+            if count and seen + count >= rank:
+                return lower_bound + (upper_bound - lower_bound) * (rank - seen) / count
+            seen += count
+            lower_bound = upper_bound
+        # Above the largest bucket
+        return self.buckets[-1]
+
+
+class MetricsRegistry:
+    """
+    Counters and histograms keyed by metric name and label values.
+    """
+    def __init__(self, buckets: Tuple[float, ...] = DEFAULT_BUCKETS):
+        """
+        Initialize the registry.
+
+        Args:
+            buckets: Upper bounds in seconds of the histogram buckets
+        """
+        self.buckets = tuple(buckets)
+        self._counters: Dict[str, Dict[Labels, float]] = {}
+        self._histograms: Dict[str, Dict[Labels, _Histogram]] = {}
+
+    def inc(self, name: str, value: float = 1.0, **labels: str) -> None:
+        """
+        Add to a counter.
+        """
+        series = self._counters.setdefault(name, {})
+        key = tuple(sorted(labels.items()))
+        series[key] = series.get(key, 0.0) + value
+
+    def observe(self, name: str, value: float, **labels: str) -> None:
+        """
+        Record a value in a histogram.
+        """
+        series = self._histograms.setdefault(name, {})
+        key = tuple(sorted(labels.items()))
+        if key not in series:
+            series[key] = _Histogram(self.buckets)
+        series[key].observe(value)
+
+    def record_tool_call(self, server: str, tool: str, seconds: float,
+                         result: Any = None, error: bool = False) -> None:
+        """
+        Record one tool call.
+
+        Args:
+            server: Name of the server
+            tool: Name of the tool
+            seconds: Duration of the call
+            result: The tool result, if the call returned
+            error: Whether the call raised
+        """
+        self.observe("mcp_tool_call_seconds", seconds, server=server, tool=tool)
+        self.inc("mcp_tool_calls_total", server=server, tool=tool)
+        if error or getattr(result, "isError", False):
+            self.inc("mcp_tool_errors_total", server=server, tool=tool)
+        if result is not None:
+            self.inc("mcp_tool_result_bytes_total", result_size(result), server=server, tool=tool)
+
+    def record_startup(self, server: str, seconds: float) -> None:
+        """
+        Record how long a server took to start.
+        """
+        self.observe("mcp_server_startup_seconds", seconds, server=server)
+
+    def reset(self) -> None:
+        """
+        Drop all recorded values.
+        """
+        self._counters.clear()
+        self._histograms.clear()
+
+    def to_json(self) -> Dict[str, Any]:
+        """
+        Get every series as a JSON-serializable dict.
+
+        Returns:
+            {"counters": {name: [...]}, "histograms": {name: [...]}} where histogram series
+            carry count, sum, estimated p50/p95/p99 and cumulative bucket counts
+        """
+        counters = {
+            name: [{"labels": dict(key), "value": value} for key, value in series.items()]
+            for name, series in self._counters.items()
+        }
+        histograms = {}
+        for name, series in self._histograms.items():
+            histograms[name] = []
+            for key, histogram in series.items():
+                bounds = [str(bound) for bound in self.buckets] + ["+Inf"]
+                histograms[name].append({
+                    "labels": dict(key),
+                    "count": histogram.count,
+                    "sum": histogram.sum,
+                    "p50": histogram.quantile(0.5),
+                    "p95": histogram.quantile(0.95),
+                    "p99": histogram.quantile(0.99),
+                    "buckets": dict(zip(bounds, histogram.cumulative())),
+                })
+        return {"counters": counters, "histograms": histograms}
+
+    def to_prometheus(self) -> str:
+        """
+        Render every series in the Prometheus text exposition format.
+        """
+        lines = []
+        for name, series in sorted(self._counters.items()):
+            lines.extend(self._header(name, "counter"))
+            for key, value in series.items():
+                lines.append(f"{name}{_format_labels(key)} {_format_value(value)}")
+        for name, series in sorted(self._histograms.items()):
+            lines.extend(self._header(name, "histogram"))
+            for key, histogram in series.items():
+                bounds = [_format_value(bound) for bound in self.buckets] + ["+Inf"]
+                for bound, count in zip(bounds, histogram.cumulative()):
+                    lines.append(f"{name}_bucket{_format_labels(key + (('le', bound),))} {count}")
+                lines.append(f"{name}_sum{_format_labels(key)} {_format_value(histogram.sum)}")
+                lines.append(f"{name}_count{_format_labels(key)} {histogram.count}")
+        return "\n".join(lines) + "\n"
+
+    @staticmethod
+    def _header(name: str, kind: str) -> List[str]:
+        description = _DESCRIPTIONS.get(name, (kind, name))[1]
+        return [f"# HELP {name} {description}", f"# TYPE {name} {kind}"]
+
+    async def serve(self, host: str = "127.0.0.1", port: int = 9464) -> asyncio.AbstractServer:
+        """
+        Serve the metrics over HTTP: /metrics as Prometheus text, /metrics.json as JSON.
+
+        Args:
+            host: Interface to listen on
+            port: Port to listen on (0 picks a free port)
+
+        Returns:
+            The running server; close it to stop serving
+        """
+        server = await asyncio.start_server(self._handle_http, host, port)
+        bound = server.sockets[0].getsockname()
+        logger.info(f"Serving metrics on http://{bound[0]}:{bound[1]}/metrics")
+        return server
+
+    async def _handle_http(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+        try:
+            request_line = (await reader.readline()).decode("latin-1").split()
+            # Skip the request headers
+            while (await reader.readline()).strip():
+                pass
+            path = request_line[1].split("?")[0] if len(request_line) > 1 else ""
+            if path == "/metrics":
+                status, content_type = "200 OK", "text/plain; version=0.0.4"
+                body = self.to_prometheus().encode("utf-8")
+            elif path == "/metrics.json":
+                status, content_type = "200 OK", "application/json"
+                body = json.dumps(self.to_json()).encode("utf-8")
+            else:
+                status, content_type, body = "404 Not Found", "text/plain", b"Not found\n"
+            writer.write(
+                f"HTTP/1.1 {status}\r\nContent-Type: {content_type}\r\n"
+                f"Content-Length: {len(body)}\r\nConnection: close\r\n\r\n".encode("latin-1") + body
+            )
+            await writer.drain()
+        except (ConnectionError, asyncio.IncompleteReadError) as e:
+            logger.warning(f"Metrics request failed: {e}")
+        finally:
+            writer.close()
+
+
+def _format_labels(labels: Labels) -> str:
+    if not labels:
+        return ""
+    escaped = (
+        key + '="' + str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n") + '"'
+        for key, value in labels
+    )
+    return "{" + ",".join(escaped) + "}"
+
+
+def _format_value(value: float) -> str:
+    return repr(float(value)) if value != int(value) else str(int(value))
+
+
+# Registry the clients and the agent factory record into by default
+REGISTRY = MetricsRegistry()
+
+
+def __getattr__(name):
+    # MetricsModel subclasses a pydantic_ai class, so it is loaded on first use and the
+    # clients can record tool calls without importing pydantic_ai
+    if name == "MetricsModel":
+        from .metrics_model import MetricsModel
+        globals()[name] = MetricsModel
+        return MetricsModel
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
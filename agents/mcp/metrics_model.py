@@ -0,0 +1,85 @@
+"""
+Model wrapper that records request latency and token usage into a MetricsRegistry.
+
+Kept apart from agents.mcp.metrics because it subclasses a pydantic_ai class; it is still
+importable from there.
+"""
+import time
+from contextlib import asynccontextmanager
+from typing import Any, AsyncIterator, List, Optional
+
+from pydantic_ai.messages import ModelMessage, ModelResponse, ModelResponseStreamEvent
+from pydantic_ai.models import Model, ModelRequestParameters, StreamedResponse
+from pydantic_ai.models.wrapper import WrapperModel
+from pydantic_ai.settings import ModelSettings
+
+from .metrics import REGISTRY, MetricsRegistry
+
+
+class MetricsModel(WrapperModel):
+    """
+    Wraps a model to record request latency and token usage.
+    """
+    def __init__(self, wrapped: Model, registry: Optional[MetricsRegistry] = None):
+        """
+        Initialize the wrapper.
+
+        Args:
+            wrapped: The model to wrap
+            registry: Registry to record into (defaults to REGISTRY)
+        """
+        super().__init__(wrapped)
+        self.registry = registry or REGISTRY
+
+    async def request(self, messages: List[ModelMessage], model_settings: Optional[ModelSettings],
+                      model_request_parameters: ModelRequestParameters) -> ModelResponse:
+        started = time.perf_counter()
+        try:
+            response = await self.wrapped.request(messages, model_settings, model_request_parameters)
+        except Exception:
+            self.registry.inc("model_request_errors_total", model=self.model_name)
+            raise
+        self._record(time.perf_counter() - started, response.usage)
+        return response
+
+    @asynccontextmanager
+    async def request_stream(self, messages: List[ModelMessage], model_settings: Optional[ModelSettings],
+                             model_request_parameters: ModelRequestParameters) -> AsyncIterator[StreamedResponse]:
+        started = time.perf_counter()
+        stream_errors: List[BaseException] = []
+        consumer_error = None
+        try:
+            async with self.wrapped.request_stream(
+                messages, model_settings, model_request_parameters
+            ) as response_stream:
+                response_stream._event_iterator = _tracked(aiter(response_stream), stream_errors)
+                try:
+                    yield response_stream
+                except Exception as e:
+                    # Raised in the caller's block; it is the model's only if reading the stream raised it
+                    if not any(e is error for error in stream_errors):
+                        consumer_error = e
+                    raise
+        except Exception as e:
+            if e is not consumer_error:
+                self.registry.inc("model_request_errors_total", model=self.model_name)
+            raise
+        self._record(time.perf_counter() - started, response_stream.usage())
+
+    def _record(self, seconds: float, usage: Any) -> None:
+        self.registry.observe("model_request_seconds", seconds, model=self.model_name)
+        if usage.request_tokens:
+            self.registry.inc("model_tokens_total", usage.request_tokens, model=self.model_name, kind="request")
+        if usage.response_tokens:
+            self.registry.inc("model_tokens_total", usage.response_tokens, model=self.model_name, kind="response")
+
+
+async def _tracked(events: AsyncIterator[ModelResponseStreamEvent],
+                   errors: List[BaseException]) -> AsyncIterator[ModelResponseStreamEvent]:
+    # Pass the stream's events through, remembering the errors the stream itself raised
+    try:
+        async for event in events:
+            yield event
+    except Exception as e:
+        errors.append(e)
+        raise
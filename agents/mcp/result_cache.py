@@ -0,0 +1,263 @@
+"""
+Result cache for idempotent MCP tool calls.
+
+Caching is opt-in per tool through a "cache" section in the server's entry in
+mcp_config.json:
+
+    "fetch": {
+      "command": "uvx",
+      "args": ["mcp-server-fetch"],
+      "cache": {"fetch": {"ttl": 300}}
+    },
+    "filesystem": {
+      ...
+      "cache": {
+        "read_file": {"ttl": 60},
+        "write_file": {"invalidates": ["read_file", "list_directory"]}
+      }
+    }
+
+Tools with a ttl are cached; tools with "invalidates" drop the cached results of the
+listed tools on the same server whenever they are called, even if the call fails. A result
+of a call that was already running when its tool was invalidated is not cached.
+"""
+import os
+import json
+import time
+import shutil
+import hashlib
+import logging
+import pathlib
+import tempfile
+from collections import OrderedDict
+from typing import Any, Dict, List, Optional, Tuple
+
+logger = logging.getLogger("mcp_result_cache")
+
+
+def canonical_arguments(arguments: Optional[Dict[str, Any]]) -> str:
+    """
+    Serialize tool arguments so that equal arguments always produce the same string.
+    """
+    return json.dumps(arguments or {}, sort_keys=True, separators=(",", ":"), default=str)
+
+
+def _digest(*parts: str) -> str:
+    return hashlib.sha256("\0".join(parts).encode("utf-8")).hexdigest()
+
+
+class CachePolicy:
+    """
+    How results of a single tool are cached.
+    """
+    def __init__(self, ttl: float = 0, invalidates: Optional[List[str]] = None):
+        """
+        Initialize the policy.
+
+        Args:
+            ttl: Seconds a result stays valid; 0 disables caching of this tool
+            invalidates: Tools on the same server whose cached results this tool invalidates
+        """
+        self.ttl = ttl
+        self.invalidates = list(invalidates or [])
+
+    @classmethod
+    def from_config(cls, entry: Dict[str, Any]) -> "CachePolicy":
+        """
+        Build a policy from a tool's entry in a server's "cache" section.
+        """
+        return cls(ttl=float(entry.get("ttl", 0)), invalidates=entry.get("invalidates"))
+
+
+def load_cache_policies(config: Dict[str, Any]) -> Dict[str, CachePolicy]:
+    """
+    Read the per-tool cache policies from a server's config entry.
+
+    Args:
+        config: The server's entry from the "mcpServers" section
+
+    Returns:
+        Tool name to cache policy mapping
+    """
+    return {
+        tool_name: CachePolicy.from_config(entry)
+        for tool_name, entry in (config.get("cache") or {}).items()
+    }
+
+
+class ToolResultCache:
+    """
+    Size-bounded LRU cache of tool results with per-entry expiry and an optional disk tier.
+    """
+    def __init__(self, max_entries: int = 1024, disk_dir: Optional[str] = None):
+        """
+        Initialize the cache.
+
+        Args:
+            max_entries: Maximum number of results kept in memory
+            disk_dir: Optional directory that keeps results across processes
+        """
+        self.max_entries = max_entries
+        self.disk_dir = pathlib.Path(disk_dir) if disk_dir else None
+        self._entries: "OrderedDict[str, Tuple[float, str, str, Any]]" = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.invalidations = 0
+        self._tool_stats: Dict[str, Dict[str, int]] = {}
+        self._generations: Dict[Tuple[str, str], int] = {}
+
+    def get(self, server: str, tool: str, arguments: Optional[Dict[str, Any]]) -> Optional[Any]:
+        """
+        Look up a cached result.
+
+        Args:
+            server: Name of the server
+            tool: Name of the tool
+            arguments: Tool arguments
+
+        Returns:
+            The cached result, or None on a miss
+        """
+        key = _digest(server, tool, canonical_arguments(arguments))
+        entry = self._entries.get(key)
+        if entry is not None and entry[0] <= time.time():
+            del self._entries[key]
+            entry = None
+        if entry is None:
+            entry = self._load_from_disk(server, tool, key)
+            if entry is not None:
+                self._remember(key, entry)
+        if entry is None:
+            self._count(server, tool, "misses")
+            return None
+
+        self._entries.move_to_end(key)
+        self._count(server, tool, "hits")
+        return entry[3]
+
+    def generation(self, server: str, tool: str) -> int:
+        """
+        Get a tool's invalidation counter, to pass to put() for a call about to be made.
+        """
+        return self._generations.get((server, tool), 0)
+
+    def put(self, server: str, tool: str, arguments: Optional[Dict[str, Any]],
+            result: Any, ttl: float, generation: Optional[int] = None) -> None:
+        """
+        Store a result.
+
+        Args:
+            server: Name of the server
+            tool: Name of the tool
+            arguments: Tool arguments
+            result: The tool result
+            ttl: Seconds the result stays valid
+            generation: The tool's generation() from before the call; if the tool has been
+                invalidated since, the result may be stale and is not stored
+        """
+        if generation is not None and generation != self.generation(server, tool):
+            return
+        key = _digest(server, tool, canonical_arguments(arguments))
+        entry = (time.time() + ttl, server, tool, result)
+        self._remember(key, entry)
+        if self.disk_dir is not None:
+            from mcp.types import CallToolResult
+            if isinstance(result, CallToolResult):
+                self._write_to_disk(key, entry)
+
+    def invalidate(self, server: str, tools: List[str]) -> None:
+        """
+        Drop every cached result of the given tools on a server.
+
+        Args:
+            server: Name of the server
+            tools: Names of the tools whose results are dropped
+        """
+        stale = [
+            key for key, (_, entry_server, entry_tool, _) in self._entries.items()
+            if entry_server == server and entry_tool in tools
+        ]
+        for key in stale:
+            del self._entries[key]
+        self.invalidations += len(stale)
+        for tool in tools:
+            self._generations[(server, tool)] = self.generation(server, tool) + 1
+
+        if self.disk_dir is not None:
+            for tool in tools:
+                shutil.rmtree(self._disk_dir_for(server, tool), ignore_errors=True)
+
+    def clear(self) -> None:
+        """
+        Drop all cached results, including the disk tier.
+        """
+        self._entries.clear()
+        if self.disk_dir is not None:
+            shutil.rmtree(self.disk_dir, ignore_errors=True)
+
+    def stats(self) -> Dict[str, Any]:
+        """
+        Get hit, miss, eviction and invalidation counters.
+
+        Returns:
+            Totals plus per-tool hits and misses keyed by "server/tool"
+        """
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "invalidations": self.invalidations,
+            "entries": len(self._entries),
+            "tools": {name: dict(counts) for name, counts in self._tool_stats.items()},
+        }
+
+    def _count(self, server: str, tool: str, counter: str) -> None:
+        setattr(self, counter, getattr(self, counter) + 1)
+        counts = self._tool_stats.setdefault(f"{server}/{tool}", {"hits": 0, "misses": 0})
+        counts[counter] += 1
+
+    def _remember(self, key: str, entry: Tuple[float, str, str, Any]) -> None:
+        self._entries[key] = entry
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+            self.evictions += 1
+
+    def _disk_dir_for(self, server: str, tool: str) -> pathlib.Path:
+        return self.disk_dir / _digest(server, tool)[:32]
+
+    def _write_to_disk(self, key: str, entry: Tuple[float, str, str, Any]) -> None:
+        expires_at, server, tool, result = entry
+        directory = self._disk_dir_for(server, tool)
+        try:
+            directory.mkdir(parents=True, exist_ok=True)
+            fd, tmp_path = tempfile.mkstemp(dir=directory, suffix=".tmp")
+            with os.fdopen(fd, "w") as f:
+                json.dump({
+                    "expires_at": expires_at,
+                    "result": result.model_dump(mode="json", by_alias=True, exclude_none=True),
+                }, f)
+            os.replace(tmp_path, directory / f"{key}.json")
+        except OSError as e:
+            logger.warning(f"Could not write cached result for {server}/{tool}: {e}")
+
+    def _load_from_disk(self, server: str, tool: str,
+                        key: str) -> Optional[Tuple[float, str, str, Any]]:
+        if self.disk_dir is None:
+            return None
+        path = self._disk_dir_for(server, tool) / f"{key}.json"
+        try:
+            with open(path, "r") as f:
+                stored = json.load(f)
+        except FileNotFoundError:
+            return None
+        except Exception as e:
+            logger.warning(f"Ignoring unreadable cached result {path}: {e}")
+            return None
+
+        if stored["expires_at"] <= time.time():
+            path.unlink(missing_ok=True)
+            return None
+        from mcp.types import CallToolResult
+        return (stored["expires_at"], server, tool, CallToolResult.model_validate(stored["result"]))
@@ -0,0 +1,218 @@
+"""
+Bounded handling of large tool results.
+
+A tool result is kept in the message history and sent to the model on every following
+step, so a read_file on a big log or a fetch of a large page costs memory and tokens for
+the rest of the run. ResultStore spills the text of results over a size threshold to a
+temp file and hands the model the first part plus a handle; the read_tool_result tool
+pages through the remainder on demand.
+
+Spilling is opt-in: the threshold is set per server with "max_result_bytes" in its
+mcp_config.json entry (0, the default, disables spilling for that server):
+
+    "filesystem": {
+      ...
+      "max_result_bytes": 65536
+    }
+"""
+import os
+import uuid
+import shutil
+import logging
+import tempfile
+from collections import OrderedDict
+from typing import TYPE_CHECKING, Any, Dict, Optional, Tuple
+
+if TYPE_CHECKING:
+    from pydantic_ai import Tool
+
+logger = logging.getLogger("mcp_result_store")
+
+READ_RESULT_TOOL_NAME = "read_tool_result"
+
+DEFAULT_MAX_RESULT_BYTES = 0
+
+
+def max_result_bytes(config: Dict[str, Any]) -> int:
+    """
+    Read the spill threshold from a server's config entry.
+
+    Args:
+        config: The server's entry from the "mcpServers" section
+
+    Returns:
+        The threshold in bytes; 0 means results are never spilled
+    """
+    return max(0, int(config.get("max_result_bytes", DEFAULT_MAX_RESULT_BYTES)))
+
+
+def _char_boundary(data: bytes, offset: int) -> int:
+    # Move back to the start of a UTF-8 character so pages never split one
+    while 0 < offset < len(data) and (data[offset] & 0xC0) == 0x80:
+        offset -= 1
+    return offset
+
+
+class ResultStore:
+    """
+    Temp-file store for the full text of spilled tool results.
+    """
+    def __init__(self, head_bytes: int = 4096, page_bytes: int = 16384,
+                 max_results: int = 256, directory: Optional[str] = None):
+        """
+        Initialize the store.
+
+        Args:
+            head_bytes: Bytes of a spilled result returned inline
+            page_bytes: Default bytes returned per read_tool_result call
+            max_results: Spilled results kept on disk; the oldest are deleted first
+            directory: Directory for the spill files (defaults to a fresh temp directory)
+        """
+        self.head_bytes = head_bytes
+        self.page_bytes = page_bytes
+        self.max_results = max_results
+        self._directory = directory
+        self._owns_directory = directory is None
+        self._results: "OrderedDict[str, Tuple[str, int]]" = OrderedDict()
+        self.spilled = 0
+        self.spilled_bytes = 0
+
+    def _path(self, handle: str) -> str:
+        if self._directory is None:
+            self._directory = tempfile.mkdtemp(prefix="mcp-results-")
+        os.makedirs(self._directory, exist_ok=True)
+        return os.path.join(self._directory, f"{handle}.txt")
+
+    def bound(self, server: str, tool: str, result: Any, max_bytes: int) -> Any:
+        """
+        Spill a result's text if it exceeds max_bytes.
+
+        Args:
+            server: Name of the server
+            tool: Name of the tool
+            result: The tool result
+            max_bytes: Threshold in bytes; 0 returns the result unchanged
+
+        Returns:
+            The result itself, or a copy whose text is the first head_bytes plus a
+            note with the handle to page through the rest
+        """
+        if not max_bytes:
+            return result
+        from mcp.types import CallToolResult, TextContent
+        if not isinstance(result, CallToolResult):
+            return result
+        texts = [item.text for item in result.content if isinstance(item, TextContent)]
+        data = "\n".join(texts).encode("utf-8")
+        if len(data) <= max_bytes:
+            return result
+
+        handle = f"{server}-{tool}-{uuid.uuid4().hex[:12]}"
+        path = self._path(handle)
+        with open(path, "wb") as f:
+            f.write(data)
+        self._results[handle] = (path, len(data))
+        self.spilled += 1
+        self.spilled_bytes += len(data)
+        while len(self._results) > self.max_results:
+            _, (old_path, _) = self._results.popitem(last=False)
+            try:
+                os.remove(old_path)
+            except OSError:
+                pass
+
+        end = _char_boundary(data, min(self.head_bytes, max_bytes))
+        head = data[:end].decode("utf-8")
+        note = (
+            f"\n\n[Result truncated: showing bytes 0-{end} of {len(data)}. "
+            f'Call {READ_RESULT_TOOL_NAME}(handle="{handle}", offset={end}) to read more.]'
+        )
+        logger.info(f"Spilled {len(data)} byte result of {server}/{tool} to {path}")
+        others = [item for item in result.content if not isinstance(item, TextContent)]
+        # model_copy keeps structuredContent, _meta and any other field of the result
+        return result.model_copy(update={"content": [TextContent(type="text", text=head + note)] + others})
+
+    def read(self, handle: str, offset: int = 0, length: Optional[int] = None) -> str:
+        """
+        Read part of a spilled result.
+
+        Args:
+            handle: Handle from the truncation note
+            offset: Byte offset to start at
+            length: Bytes to read (defaults to page_bytes)
+
+        Returns:
+            The text of the page followed by a note with the next offset
+        """
+        entry = self._results.get(handle)
+        if entry is None:
+            return f"Unknown or expired result handle: {handle}"
+        path, size = entry
+        offset = max(0, min(offset, size))
+        length = length if length and length > 0 else self.page_bytes
+        with open(path, "rb") as f:
+            f.seek(offset)
+            # A few extra bytes so the page can end on a character boundary
+            data = f.read(length + 3)
+        # Skip the rest of a character if offset points into the middle of one
+        skip = 0
+        while skip < min(3, len(data)) and (data[skip] & 0xC0) == 0x80:
+            skip += 1
+        data, start = data[skip:], offset + skip
+        if start + length >= size:
+            end = size
+        else:
+            end = start + (_char_boundary(data, length) or length)
+        text = data[:end - start].decode("utf-8", errors="replace")
+        if end >= size:
+            return text + f"\n\n[End of result: bytes {start}-{end} of {size}.]"
+        return text + (
+            f"\n\n[Showing bytes {start}-{end} of {size}. "
+            f'Call {READ_RESULT_TOOL_NAME}(handle="{handle}", offset={end}) to read more.]'
+        )
+
+    def tool(self) -> "Tool":
+        """
+        Get the read_tool_result tool for paging through spilled results.
+        """
+        # Imported here so the clients and agents can import this module without pydantic-ai
+        from pydantic_ai import Tool
+
+        async def read_tool_result(handle: str, offset: int = 0, length: int = 0) -> str:
+            """
+            Read more of a tool result that was truncated because it was too large.
+
+            Args:
+                handle: The handle given in the truncation note
+                offset: Byte offset to continue from, as given in the note
+                length: Bytes to read; 0 reads one page
+            """
+            return self.read(handle, offset, length or None)
+
+        return Tool(read_tool_result, name=READ_RESULT_TOOL_NAME, takes_ctx=False)
+
+    def stats(self) -> Dict[str, int]:
+        """
+        Get the number and total size of spilled results.
+        """
+        return {
+            "spilled": self.spilled,
+            "spilled_bytes": self.spilled_bytes,
+            "stored": len(self._results),
+        }
+
+    def close(self) -> None:
+        """
+        Delete the spill files.
+        """
+        if self._directory is not None and self._owns_directory:
+            shutil.rmtree(self._directory, ignore_errors=True)
+            self._directory = None
+        else:
+            for path, _ in self._results.values():
+                try:
+                    os.remove(path)
+                except OSError:
+                    pass
+        self._results.clear()
+
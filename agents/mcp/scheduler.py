@@ -0,0 +1,199 @@
+"""
+Per-server scheduling of MCP tool calls.
+
+Limits are read from the server's entry in mcp_config.json:
+
+    "brave-search": {
+      ...
+      "max_in_flight": 4,
+      "tool_limits": {"brave_local_search": 1},
+      "max_queue": 64
+    }
+
+Calls over the limits wait in a queue ordered by priority, then by how many calls the
+calling agent run already has in flight, then by arrival. Runs identify themselves with
+call_context(); calls made outside of one share a single anonymous owner.
+"""
+import time
+import asyncio
+import itertools
+import contextvars
+from contextlib import asynccontextmanager, contextmanager
+from typing import Any, AsyncIterator, Dict, Iterator, List, Optional
+
+_call_owner: contextvars.ContextVar[Any] = contextvars.ContextVar("mcp_call_owner", default=None)
+_call_priority: contextvars.ContextVar[int] = contextvars.ContextVar("mcp_call_priority", default=0)
+
+
+@contextmanager
+def call_context(owner: Any = None, priority: int = 0) -> Iterator[None]:
+    """
+    Tag the tool calls made inside the block with an owner and a priority.
+
+    Args:
+        owner: Identifier of the agent run the calls belong to, used for fair sharing
+        priority: Higher priorities are dequeued first
+    """
+    owner_token = _call_owner.set(owner)
+    priority_token = _call_priority.set(priority)
+    try:
+        yield
+    finally:
+        _call_priority.reset(priority_token)
+        _call_owner.reset(owner_token)
+
+
+class SchedulerQueueFull(Exception):
+    """Raised when a call arrives while the wait queue is at capacity."""
+
+
+class _Waiter:
+    def __init__(self, seq: int, tool: str, owner: Any, priority: int, future: asyncio.Future):
+        self.seq = seq
+        self.tool = tool
+        self.owner = owner
+        self.priority = priority
+        self.future = future
+
+
+class ToolScheduler:
+    """
+    Limits concurrent calls into one server and queues the excess.
+    """
+    def __init__(self, max_in_flight: Optional[int] = None,
+                 tool_limits: Optional[Dict[str, int]] = None,
+                 max_queue: Optional[int] = None):
+        """
+        Initialize the scheduler.
+
+        Args:
+            max_in_flight: Maximum concurrent calls into the server (None for no limit)
+            tool_limits: Maximum concurrent calls per tool name
+            max_queue: Maximum number of waiting calls (None for no limit)
+        """
+        self.max_in_flight = max_in_flight
+        self.tool_limits = dict(tool_limits or {})
+        self.max_queue = max_queue
+        self.in_flight = 0
+        self._tool_in_flight: Dict[str, int] = {}
+        self._owner_in_flight: Dict[Any, int] = {}
+        self._waiters: List[_Waiter] = []
+        self._seq = itertools.count()
+        self.completed = 0
+        self.queued = 0
+        self.rejected = 0
+        self.max_queue_depth = 0
+        self.total_wait = 0.0
+        self.max_wait = 0.0
+
+    @classmethod
+    def from_config(cls, config: Dict[str, Any]) -> "ToolScheduler":
+        """
+        Build a scheduler from a server's config entry.
+        """
+        return cls(
+            max_in_flight=config.get("max_in_flight"),
+            tool_limits=config.get("tool_limits"),
+            max_queue=config.get("max_queue"),
+        )
+
+    @asynccontextmanager
+    async def slot(self, tool: str) -> AsyncIterator[None]:
+        """
+        Hold a slot for one call to a tool, waiting in the queue if the limits are reached.
+
+        Args:
+            tool: Name of the tool being called
+
+        Raises:
+            SchedulerQueueFull: If the call would have to wait and the queue is full
+        """
+        owner = _call_owner.get()
+        queued_at = time.perf_counter()
+        if self._can_run(tool):
+            self._acquire(tool, owner)
+        else:
+            await self._wait(tool, owner, _call_priority.get())
+            waited = time.perf_counter() - queued_at
+            self.total_wait += waited
+            self.max_wait = max(self.max_wait, waited)
+
+        try:
+            yield
+        finally:
+            self._release(tool, owner)
+            self.completed += 1
+            self._dispatch()
+
+    def stats(self) -> Dict[str, Any]:
+        """
+        Get queue depth, in-flight and wait time statistics.
+        """
+        return {
+            "in_flight": self.in_flight,
+            "queue_depth": len(self._waiters),
+            "max_queue_depth": self.max_queue_depth,
+            "completed": self.completed,
+            "queued": self.queued,
+            "rejected": self.rejected,
+            "total_wait_seconds": self.total_wait,
+            "avg_wait_seconds": self.total_wait / self.queued if self.queued else 0.0,
+            "max_wait_seconds": self.max_wait,
+            "tools_in_flight": {tool: n for tool, n in self._tool_in_flight.items() if n},
+        }
+
+    async def _wait(self, tool: str, owner: Any, priority: int) -> None:
+        if self.max_queue is not None and len(self._waiters) >= self.max_queue:
+            self.rejected += 1
+            raise SchedulerQueueFull(f"Too many queued calls (limit {self.max_queue})")
+
+        waiter = _Waiter(next(self._seq), tool, owner, priority,
+                         asyncio.get_running_loop().create_future())
+        self._waiters.append(waiter)
+        self.queued += 1
+        self.max_queue_depth = max(self.max_queue_depth, len(self._waiters))
+        try:
+            await waiter.future
+        except asyncio.CancelledError:
+            if waiter.future.done() and not waiter.future.cancelled():
+                # The slot was granted just before the cancellation landed
+                self._release(tool, owner)
+                self._dispatch()
+            elif waiter in self._waiters:
+                self._waiters.remove(waiter)
+            raise
+
+    def _can_run(self, tool: str) -> bool:
+        if self.max_in_flight is not None and self.in_flight >= self.max_in_flight:
+            return False
+        limit = self.tool_limits.get(tool)
+        return limit is None or self._tool_in_flight.get(tool, 0) < limit
+
+    def _acquire(self, tool: str, owner: Any) -> None:
+        self.in_flight += 1
+        self._tool_in_flight[tool] = self._tool_in_flight.get(tool, 0) + 1
+        self._owner_in_flight[owner] = self._owner_in_flight.get(owner, 0) + 1
+
+    def _release(self, tool: str, owner: Any) -> None:
+        self.in_flight -= 1
+        self._tool_in_flight[tool] -= 1
+        self._owner_in_flight[owner] -= 1
+        if not self._owner_in_flight[owner]:
+            del self._owner_in_flight[owner]
+
+    def _dispatch(self) -> None:
+        """
+        Grant slots to waiters until no waiting call can run.
+        """
+        # Drop waiters whose task was cancelled but has not resumed yet
+        self._waiters = [waiter for waiter in self._waiters if not waiter.future.done()]
+        while self._waiters:
+            runnable = [waiter for waiter in self._waiters if self._can_run(waiter.tool)]
+            if not runnable:
+                return
+            waiter = min(runnable, key=lambda w: (
+                -w.priority, self._owner_in_flight.get(w.owner, 0), w.seq
+            ))
+            self._waiters.remove(waiter)
+            self._acquire(waiter.tool, waiter.owner)
+            waiter.future.set_result(None)
@@ -0,0 +1,245 @@
+"""
+Compaction of MCP tool input schemas.
+
+MCP servers send their input schemas verbatim, often with generated titles, duplicated
+$defs and long descriptions. compact_schema() rewrites a schema once, when the tool is
+discovered, into an equivalent but smaller form:
+
+- $refs to definitions used only once are inlined, identical definitions are merged and
+  unused ones dropped
+- "title" and "$schema" are removed; descriptions and examples optionally as well
+  ("strip_schema_descriptions": true in the server's config entry)
+- keys are sorted so the same schema always serializes to the same bytes
+
+SchemaStats tallies the bytes and tokens saved for a server's tools.
+"""
+import copy
+import json
+import functools
+from collections import Counter
+from typing import TYPE_CHECKING, Any, Callable, Dict, Iterable, Optional, Set, Tuple
+
+if TYPE_CHECKING:
+    from pydantic_ai import Tool
+
+# Keys whose value is a single subschema, and keys whose value is a list or map of them
+_SCHEMA_KEYS = ("items", "additionalProperties", "not", "if", "then", "else", "contains",
+                "propertyNames", "unevaluatedItems", "unevaluatedProperties")
+_SCHEMA_LIST_KEYS = ("anyOf", "allOf", "oneOf", "prefixItems")
+_SCHEMA_MAP_KEYS = ("properties", "patternProperties", "$defs", "definitions", "dependentSchemas")
+
+ALWAYS_STRIPPED = ("title", "$schema")
+DESCRIPTION_KEYS = ("description", "examples", "$comment")
+
+
+def _map_subschemas(node: Dict[str, Any], fn: Callable[[Any], Any]) -> Dict[str, Any]:
+    """
+    Apply fn to every direct subschema of a schema node.
+    """
+    result = {}
+    for key, value in node.items():
+        if key in _SCHEMA_KEYS and isinstance(value, dict):
+            result[key] = fn(value)
+        elif key in _SCHEMA_LIST_KEYS and isinstance(value, list):
+            result[key] = [fn(item) for item in value]
+        elif key in _SCHEMA_MAP_KEYS and isinstance(value, dict):
+            result[key] = {name: fn(item) for name, item in value.items()}
+        else:
+            result[key] = value
+    return result
+
+
+def _refs(node: Any) -> Iterable[str]:
+    """
+    Yield every $ref in a schema.
+    """
+    if isinstance(node, dict):
+        if isinstance(node.get("$ref"), str):
+            yield node["$ref"]
+        for value in node.values():
+            yield from _refs(value)
+    elif isinstance(node, list):
+        for item in node:
+            yield from _refs(item)
+
+
+def _escape(name: str) -> str:
+    """
+    Escape a definition name for use in a JSON pointer.
+    """
+    return name.replace("~", "~0").replace("/", "~1")
+
+
+def _recursive_refs(edges: Dict[str, Set[str]]) -> Set[str]:
+    """
+    Find the definitions that can reach themselves, given the definitions each one refers to.
+    """
+    recursive = set()
+    for start in edges:
+        stack, seen = list(edges[start]), set()
+        while stack:
+            ref = stack.pop()
+            if ref == start:
+                recursive.add(start)
+                break
+            if ref not in seen:
+                seen.add(ref)
+                stack.extend(edges[ref])
+    return recursive
+
+
+def compact_schema(schema: Dict[str, Any], strip_descriptions: bool = False) -> Dict[str, Any]:
+    """
+    Rewrite a JSON schema into a smaller equivalent with a stable key order.
+
+    Args:
+        schema: A tool's input schema
+        strip_descriptions: Also drop descriptions, examples and comments
+
+    Returns:
+        The compacted schema; the input is not modified
+    """
+    schema = copy.deepcopy(schema)
+    definitions = {}
+    for section in ("$defs", "definitions"):
+        for name, definition in (schema.pop(section, None) or {}).items():
+            definitions[f"#/{section}/{_escape(name)}"] = (name, definition)
+
+    # Merge definitions that are identical, keeping the first name
+    canonical: Dict[str, str] = {}
+    alias = {
+        ref: canonical.setdefault(json.dumps(definition, sort_keys=True), ref)
+        for ref, (_, definition) in definitions.items()
+    }
+    unique = {ref: definition for ref, (_, definition) in definitions.items() if alias[ref] == ref}
+    uses = Counter(alias[ref] for ref in _refs(schema) if ref in alias)
+    for definition in unique.values():
+        uses.update(alias[ref] for ref in _refs(definition) if ref in alias)
+    recursive = _recursive_refs({
+        ref: {alias[inner] for inner in _refs(definition) if inner in alias}
+        for ref, definition in unique.items()
+    })
+    inline = {ref for ref in unique if uses[ref] == 1 and ref not in recursive}
+
+    # Kept definitions all move to $defs; $defs/X and definitions/X must not collide there
+    names: Dict[str, str] = {}
+    for ref in unique:
+        if ref in inline or not uses[ref]:
+            continue
+        name = base = definitions[ref][0]
+        suffix = 2
+        while name in names.values():
+            name, suffix = f"{base}_{suffix}", suffix + 1
+        names[ref] = name
+
+    stripped = ALWAYS_STRIPPED + (DESCRIPTION_KEYS if strip_descriptions else ())
+
+    def rewrite(node: Any) -> Any:
+        if not isinstance(node, dict):
+            return node
+        ref = node.get("$ref")
+        if isinstance(ref, str) and ref in alias:
+            target = alias[ref]
+            if target in inline:
+                siblings = {key: value for key, value in node.items() if key != "$ref"}
+                return rewrite({**unique[target], **siblings})
+            node = {**node, "$ref": f"#/$defs/{_escape(names[target])}"}
+        node = {key: value for key, value in node.items() if key not in stripped}
+        return _map_subschemas(node, rewrite)
+
+    compacted = rewrite(schema)
+    kept = {names[ref]: rewrite(unique[ref]) for ref in names}
+    if kept:
+        compacted["$defs"] = kept
+    # Sorting keys makes the serialized schema stable across runs and servers
+    return json.loads(json.dumps(compacted, sort_keys=True))
+
+
+def schema_bytes(schema: Dict[str, Any]) -> int:
+    """
+    Size of a schema serialized as compact JSON.
+    """
+    return len(json.dumps(schema, separators=(",", ":")).encode("utf-8"))
+
+
+@functools.lru_cache(maxsize=None)
+def _encoding() -> Any:
+    # Loading the BPE ranks takes a while (and may download them), so only on first use
+    try:
+        import tiktoken
+        return tiktoken.get_encoding("cl100k_base")
+    except Exception:
+        return None
+
+
+def text_tokens(text: str) -> int:
+    """
+    Token count of a text, using tiktoken if installed or about 4 bytes per token otherwise.
+    """
+    encoding = _encoding()
+    if encoding is not None:
+        return len(encoding.encode(text, disallowed_special=()))
+    return (len(text.encode("utf-8")) + 3) // 4
+
+
+def schema_tokens(schema: Dict[str, Any]) -> int:
+    """
+    Token count of a schema serialized as compact JSON.
+    """
+    return text_tokens(json.dumps(schema, separators=(",", ":")))
+
+
+class SchemaStats:
+    """
+    Bytes and tokens of a server's tool schemas before and after compaction.
+    """
+    def __init__(self):
+        self._tools: Dict[str, Tuple[int, int, int, int]] = {}
+
+    def add(self, name: str, original: Dict[str, Any], compacted: Dict[str, Any]) -> None:
+        """
+        Record one tool's schema sizes, replacing any earlier entry for the same tool.
+        """
+        self._tools[name] = (
+            schema_bytes(original), schema_bytes(compacted),
+            schema_tokens(original), schema_tokens(compacted),
+        )
+
+    def report(self) -> Dict[str, Any]:
+        """
+        Get the totals and savings.
+        """
+        original_bytes, compacted_bytes, original_tokens, compacted_tokens = (
+            sum(column) for column in zip(*self._tools.values())
+        ) if self._tools else (0, 0, 0, 0)
+        return {
+            "tools": len(self._tools),
+            "original_bytes": original_bytes,
+            "compacted_bytes": compacted_bytes,
+            "saved_bytes": original_bytes - compacted_bytes,
+            "original_tokens": original_tokens,
+            "compacted_tokens": compacted_tokens,
+            "saved_tokens": original_tokens - compacted_tokens,
+        }
+
+
+def schema_tool(function: Callable[..., Any], name: str, description: Optional[str],
+                parameters_json_schema: Dict[str, Any]) -> "Tool":
+    """
+    Create a Tool that advertises a precompiled JSON schema instead of one derived from
+    the function signature, so no prepare hook has to patch it in on every model step.
+
+    Args:
+        function: Coroutine taking the tool arguments as keyword arguments
+        name: Tool name
+        description: Tool description
+        parameters_json_schema: The schema sent to the model
+
+    Returns:
+        The tool
+    """
+    # Imported here so the clients can import this module without pydantic-ai
+    from pydantic_ai import Tool
+
+    return Tool.from_schema(function, name=name, description=description or "",
+                            json_schema=parameters_json_schema)
@@ -0,0 +1,484 @@
+"""
+Server lifecycle and tool call pipeline shared by both MCP clients.
+
+BaseMCPServer owns a server's replicas and its calls; the MCPServer classes of the
+lightweight client (agents/mcp_client.py) and of the factory client (agents/mcp/client.py)
+only add how MCP tools become Pydantic AI tools:
+
+- launch(), ensure_started() and cleanup() start and stop the server's replicas in a
+  dedicated task, so servers can start concurrently, lazily on their first call, or again
+  after being reaped for idleness by reap_idle_servers().
+- call_tool() coalesces identical concurrent calls, serves cacheable results from the
+  result cache, waits for a scheduler slot and sends the call to the least busy replica.
+"""
+import os
+import time
+import shutil
+import signal
+import asyncio
+import logging
+from contextlib import AsyncExitStack
+from typing import TYPE_CHECKING, Any, Dict, Iterable, List, Optional
+
+from .catalog import ToolCatalog, iter_tool_pages
+from .config import launch_command, replica_count
+from .health import ServerHealth
+from .metrics import REGISTRY, MetricsRegistry
+from .result_cache import ToolResultCache, load_cache_policies
+from .result_store import ResultStore, max_result_bytes
+from .scheduler import ToolScheduler
+from .schema import SchemaStats, compact_schema
+from .single_flight import SingleFlight
+
+if TYPE_CHECKING:
+    from mcp.types import Tool as MCPTool
+
+logger = logging.getLogger("mcp_server")
+
+
+class BaseMCPServer(ServerHealth):
+    """
+    Manages the connection to a single MCP server and calls to its tools.
+
+    Subclasses turn the server's MCP tools into tools for their agents, using list_tools(),
+    load_catalog(), prepare_tool() and bound_result().
+    """
+    def __init__(self, name: str, config: Dict[str, Any], catalog: Optional[ToolCatalog] = None,
+                 result_cache: Optional[ToolResultCache] = None,
+                 metrics: Optional[MetricsRegistry] = None,
+                 result_store: Optional[ResultStore] = None):
+        """
+        Initialize a server connection.
+
+        Args:
+            name: Name of the server
+            config: The server's entry from the "mcpServers" section
+            catalog: Optional on-disk tool catalog
+            result_cache: Optional cache for results of cacheable tools
+            metrics: Registry for tool call and startup metrics (defaults to REGISTRY)
+            result_store: Optional store that large results are spilled to
+        """
+        self.name = name
+        self.config = config
+        self.catalog = catalog
+        self.result_cache = result_cache
+        self.cache_policies = load_cache_policies(config)
+        self.metrics = metrics or REGISTRY
+        self.scheduler = ToolScheduler.from_config(config)
+        self.single_flight = SingleFlight.from_config(name, config, self.cache_policies, self.metrics)
+        self.result_store = result_store
+        self.max_result_bytes = max_result_bytes(config)
+        self.strip_schema_descriptions = bool(config.get("strip_schema_descriptions", False))
+        self.schema_stats = SchemaStats()
+        self.cached_tools: Optional[List["MCPTool"]] = None
+        self.server_version: Optional[str] = None
+        self.startup_timeout: Optional[float] = None
+        self.in_flight = 0
+        self.last_used = time.monotonic()
+        self.session = None
+        self.sessions = []
+        self.replicas = replica_count(config)
+        if self.replicas < int(config.get("replicas", 1)):
+            logger.warning(f"MCP server {name} is stateful, running a single replica")
+        self._outstanding: List[int] = []
+        self._pids: List[int] = []
+        self._cleanup_lock = asyncio.Lock()
+        self._connection_task: Optional[asyncio.Task] = None
+        self._ready: Optional[asyncio.Future] = None
+        self._stop_event: Optional[asyncio.Event] = None
+        self._init_health(config)
+
+    async def initialize(self) -> None:
+        """
+        Initialize and connect to the MCP server.
+
+        The transport and session are owned by a dedicated task until cleanup(), since
+        their anyio cancel scopes must be exited by the task that entered them. This lets
+        servers be started concurrently and cleaned up in any order.
+        """
+        self.launch()
+        try:
+            await self.wait_until_ready()
+        except BaseException:
+            await self.cleanup()
+            raise
+
+    def launch(self) -> None:
+        """
+        Start connecting in the background without waiting for the handshake.
+        """
+        loop = asyncio.get_running_loop()
+        self._ready = loop.create_future()
+        self._connection_lost = loop.create_future()
+        self._stop_event = asyncio.Event()
+        self._connection_task = asyncio.create_task(
+            self._run_connection(self._ready, self._stop_event),
+            name=f"mcp-server-{self.name}"
+        )
+
+    async def ensure_started(self) -> None:
+        """
+        Start the server if it is not running and wait for it to be ready.
+
+        Concurrent callers share a single startup. A server that is being shut down
+        finishes stopping before it is started again.
+        """
+        if self._stop_event is not None and self._stop_event.is_set():
+            async with self._cleanup_lock:
+                pass
+        if self.session is None and (self._connection_task is None or self._connection_task.done()):
+            self.launch()
+        try:
+            await asyncio.wait_for(self.wait_until_ready(), self.startup_timeout)
+        except asyncio.TimeoutError:
+            await self.cleanup()
+            raise ConnectionError(
+                f"MCP server {self.name} did not start within {self.startup_timeout}s"
+            )
+
+    def is_running(self) -> bool:
+        """
+        Whether this server owns a live connection (attached sessions are not counted).
+        """
+        return self._connection_task is not None and self.session is not None
+
+    async def wait_until_ready(self) -> None:
+        """
+        Wait for a launched connection to finish its handshake.
+        """
+        if self._ready is None:
+            return
+        try:
+            await asyncio.shield(self._ready)
+        except asyncio.CancelledError:
+            if self._ready.cancelled():
+                raise ConnectionError(f"MCP server {self.name} is not running") from None
+            raise
+
+    async def _run_connection(self, ready: asyncio.Future, stop_event: asyncio.Event) -> None:
+        """
+        Open every replica, signal readiness and hold them open until asked to stop.
+        """
+        loop = asyncio.get_running_loop()
+        started = time.perf_counter()
+        replica_ready = [loop.create_future() for _ in range(self.replicas)]
+        tasks = [
+            asyncio.create_task(
+                self._run_replica(replica, stop_event),
+                name=f"mcp-server-{self.name}-{index}"
+            )
+            for index, replica in enumerate(replica_ready)
+        ]
+        try:
+            results = await asyncio.gather(
+                *(asyncio.shield(replica) for replica in replica_ready),
+                return_exceptions=True
+            )
+            errors = [result for result in results if isinstance(result, BaseException)]
+            if errors:
+                raise errors[0]
+
+            self.sessions = list(results)
+            self._outstanding = [0] * len(results)
+            self.session = self.sessions[0]
+            self.last_used = time.monotonic()
+            logger.info(f"Initialized MCP server {self.name} ({len(results)} replicas)")
+            self.metrics.record_startup(self.name, time.perf_counter() - started)
+            self.healthy = True
+            self.last_error = None
+            ready.set_result(None)
+            await stop_event.wait()
+        except Exception as e:
+            if not ready.done():
+                logger.error(f"Failed to initialize MCP server {self.name}: {e}")
+                ready.set_exception(e)
+        finally:
+            self.session = None
+            self.sessions = []
+            stop_event.set()
+            for task, replica in zip(tasks, replica_ready):
+                if not replica.done():
+                    task.cancel()
+            await asyncio.gather(*tasks, return_exceptions=True)
+            if not ready.done():
+                ready.cancel()
+
+    async def _run_replica(self, ready: asyncio.Future, stop_event: asyncio.Event) -> None:
+        """
+        Run one server process and session, handing the session over through ready.
+        """
+        pid = None
+        try:
+            # mcp takes about half a second to load, so it is imported when the first server is spawned
+            from mcp import ClientSession, StdioServerParameters
+            from mcp.client.stdio import stdio_client
+
+            command = self.config.get("command")
+            if command == "npx":
+                command = shutil.which("npx")
+                if not command:
+                    raise ValueError("npx command not found. Please install Node.js and npm.")
+            if not command:
+                raise ValueError(f"MCP server {self.name} has no command")
+
+            command, args = launch_command(command, self.config.get("args", []), self.config)
+            server_params = StdioServerParameters(
+                command=command,
+                args=args,
+                env=self.config.get("env") or None
+            )
+
+            async with AsyncExitStack() as exit_stack:
+                transport = stdio_client(server_params)
+                read, write = await exit_stack.enter_async_context(transport)
+                pid = _process_id(transport)
+                if pid is not None:
+                    self._pids.append(pid)
+                session = await exit_stack.enter_async_context(ClientSession(read, write))
+                init_result = await session.initialize()
+                self.server_version = init_result.serverInfo.version
+
+                ready.set_result(session)
+                await stop_event.wait()
+        except Exception as e:
+            if ready.done():
+                logger.error(f"Error during cleanup of MCP server {self.name}: {e}")
+            else:
+                ready.set_exception(e)
+        finally:
+            if pid in self._pids:
+                self._pids.remove(pid)
+            if not ready.done():
+                ready.cancel()
+
+    def attach(self, session: Any) -> None:
+        """
+        Use a session owned elsewhere, such as a DaemonSession, instead of spawning the server.
+
+        Args:
+            session: An object exposing the ClientSession tool methods
+        """
+        self.session = session
+        self.sessions = [session]
+        self._outstanding = [0]
+
+    async def list_tools(self) -> List["MCPTool"]:
+        """
+        List the server's tools, following list_tools pagination cursors.
+
+        The tools are written to the catalog, if one is configured.
+
+        Returns:
+            The MCP tools
+        """
+        tools: List["MCPTool"] = []
+        async for page in iter_tool_pages(self.session):
+            tools.extend(page)
+        if self.catalog is not None:
+            self.catalog.store(self.name, self.config, tools, self.server_version)
+        return tools
+
+    def load_catalog(self) -> Optional[List["MCPTool"]]:
+        """
+        Load the server's tools from the catalog without contacting the server.
+
+        Returns:
+            The cached MCP tools, or None if the catalog has no entry for this server
+        """
+        if self.catalog is None:
+            return None
+        self.cached_tools = self.catalog.load(self.name, self.config)
+        return self.cached_tools
+
+    def prepare_tool(self, tool: "MCPTool") -> Dict[str, Any]:
+        """
+        Register a tool with the call pipeline and compact its input schema.
+
+        The schema is compacted once here, so nothing has to patch it into the tool
+        definition on every model step. Tools annotated as read-only or idempotent have
+        their concurrent identical calls coalesced.
+
+        Args:
+            tool: The MCP tool
+
+        Returns:
+            The compacted input schema
+        """
+        self.single_flight.register(tool)
+        schema = compact_schema(tool.inputSchema, strip_descriptions=self.strip_schema_descriptions)
+        self.schema_stats.add(tool.name, tool.inputSchema, schema)
+        return schema
+
+    def bound_result(self, name: str, result: Any) -> Any:
+        """
+        Spill a result over max_result_bytes to the result store, keeping its first part.
+
+        Args:
+            name: Name of the tool
+            result: The tool result
+
+        Returns:
+            The result, or its first part and a handle to the rest
+        """
+        if self.result_store is None:
+            return result
+        return self.result_store.bound(self.name, name, result, self.max_result_bytes)
+
+    async def call_tool(self, name: str, arguments: Dict[str, Any]) -> Any:
+        """
+        Call a tool, recording its latency, errors and result size in the metrics registry.
+
+        An identical call already in flight is waited for instead of sent again.
+
+        Args:
+            name: Name of the tool
+            arguments: Tool arguments
+
+        Returns:
+            The tool result
+        """
+        started = time.perf_counter()
+        try:
+            result = await self.single_flight.call(
+                name, arguments, lambda: self._call_cached(name, arguments)
+            )
+        except Exception:
+            self.metrics.record_tool_call(self.name, name, time.perf_counter() - started, error=True)
+            raise
+        self.metrics.record_tool_call(self.name, name, time.perf_counter() - started, result)
+        return result
+
+    async def _call_cached(self, name: str, arguments: Dict[str, Any]) -> Any:
+        """
+        Call a tool, serving results of cacheable tools from the result cache.
+        """
+        policy = self.cache_policies.get(name) if self.result_cache is not None else None
+        generation = None
+        if policy is not None and policy.ttl:
+            cached = self.result_cache.get(self.name, name, arguments)
+            if cached is not None:
+                return cached
+            generation = self.result_cache.generation(self.name, name)
+
+        try:
+            result = await self._call_session(name, arguments)
+        finally:
+            # A failed call may still have changed something
+            if policy is not None and policy.invalidates:
+                self.result_cache.invalidate(self.name, policy.invalidates)
+
+        if generation is not None and not result.isError:
+            self.result_cache.put(self.name, name, arguments, result, policy.ttl, generation=generation)
+        return result
+
+    async def _call_session(self, name: str, arguments: Dict[str, Any]) -> Any:
+        """
+        Call a tool on the session once the scheduler grants a slot, starting the server if needed.
+
+        Calls to a server that is reconnecting fail immediately, and calls in flight when
+        its connection is lost fail as soon as that is detected.
+        """
+        self._fail_fast()
+        self.in_flight += 1
+        try:
+            async with self.scheduler.slot(name):
+                await self.ensure_started()
+                replica, outstanding = self._pick_replica(), self._outstanding
+                outstanding[replica] += 1
+                try:
+                    return await self._call_or_fail(self.sessions[replica], name, arguments)
+                finally:
+                    outstanding[replica] -= 1
+        finally:
+            self.in_flight -= 1
+            self.last_used = time.monotonic()
+
+    def _pick_replica(self) -> int:
+        """
+        Pick the replica with the fewest outstanding requests.
+        """
+        return min(range(len(self.sessions)), key=self._outstanding.__getitem__)
+
+    async def cleanup(self) -> None:
+        """
+        Clean up server resources, stopping a reconnect in progress.
+        """
+        await self._stop_reconnecting()
+        await self._stop_connection()
+
+    async def _stop_connection(self) -> None:
+        """
+        Stop the connection task and close its sessions.
+        """
+        async with self._cleanup_lock:
+            task = self._connection_task
+            if task is None:
+                self.session = None
+                self.sessions = []
+                return
+            try:
+                if self._ready.done():
+                    self._stop_event.set()
+                else:
+                    task.cancel()
+                await asyncio.gather(task, return_exceptions=True)
+                logger.info(f"Cleaned up MCP server {self.name}")
+            except Exception as e:
+                logger.error(f"Error during cleanup of MCP server {self.name}: {e}")
+            finally:
+                self._connection_task = None
+                self.session = None
+
+    def terminate(self) -> None:
+        """
+        Terminate the server's processes without going through the event loop.
+
+        For servers whose event loop was closed before they were cleaned up: their
+        connection can no longer be stopped, but the processes it spawned would keep running.
+        """
+        for pid in self._pids:
+            try:
+                # stdio_client starts each server in a new session, so its group is its own
+                if hasattr(os, "killpg"):
+                    os.killpg(pid, signal.SIGTERM)
+                else:
+                    os.kill(pid, signal.SIGTERM)
+                logger.info(f"Terminated process {pid} of MCP server {self.name}")
+            except OSError:
+                pass
+        self._pids = []
+        self._connection_task = None
+        self._reconnect_task = None
+        self.session = None
+        self.sessions = []
+
+
+def _process_id(transport: Any) -> Optional[int]:
+    """
+    Get the pid of the process an entered stdio_client context spawned.
+
+    stdio_client keeps its process to itself, so it is read from the suspended generator.
+    """
+    frame = getattr(getattr(transport, "gen", None), "ag_frame", None)
+    process = frame.f_locals.get("process") if frame is not None else None
+    return getattr(process, "pid", None)
+
+
+async def reap_idle_servers(servers: Iterable[BaseMCPServer], idle_timeout: float) -> None:
+    """
+    Shut down running servers that have not handled a tool call within idle_timeout.
+
+    Reaped servers start again on their next tool call.
+
+    Args:
+        servers: The client's servers
+        idle_timeout: Idle time in seconds after which a server is stopped
+    """
+    while True:
+        await asyncio.sleep(min(idle_timeout / 2, 30))
+        now = time.monotonic()
+        for server in servers:
+            if (server.is_running() and server.in_flight == 0
+                    and now - server.last_used >= idle_timeout):
+                logger.info(f"Shutting down MCP server {server.name} after {idle_timeout}s idle")
+                await server.cleanup()
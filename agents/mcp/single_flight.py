@@ -0,0 +1,161 @@
+"""
+Single-flight coalescing of identical concurrent tool calls.
+
+Agent runs that share a client, or a model turn that repeats a call, often make a call while
+an identical one is still in flight. The first call goes to the server; calls with the same
+tool and canonical arguments that arrive before it finishes wait for it and share its result
+(or its error). Nothing is kept once the call finishes; that is what the result cache is for.
+
+Sharing a result is only safe for calls that do not change state, so by default only tools
+the server annotates as read-only or idempotent (readOnlyHint/idempotentHint) are coalesced.
+Other tools opt in, and any tool can be opted out, in the server's entry in mcp_config.json:
+
+    "fetch": {..., "coalesce_tools": ["fetch"]}
+    "brave-search": {..., "coalesce": true}
+    "memory": {..., "coalesce": false}
+    "filesystem": {..., "coalesce_exclude": ["write_file", "move_file"]}
+
+"coalesce": true coalesces every tool of the server and false none. Tools with "invalidates"
+in their cache policy change state and are never coalesced.
+"""
+import asyncio
+from typing import TYPE_CHECKING, Any, Awaitable, Callable, Dict, Iterable, Optional, Tuple
+
+from .result_cache import CachePolicy, canonical_arguments
+
+if TYPE_CHECKING:
+    from mcp.types import Tool as MCPTool
+
+
+class _Flight:
+    """
+    A call in flight and the number of callers waiting for it.
+    """
+    def __init__(self, task: asyncio.Task):
+        self.task = task
+        self.waiters = 0
+
+
+class SingleFlight:
+    """
+    Lets concurrent identical calls to one server share a single request.
+    """
+    def __init__(self, server: str, enabled: Optional[bool] = None, tools: Iterable[str] = (),
+                 excluded: Iterable[str] = (), metrics: Optional[Any] = None):
+        """
+        Initialize the coalescer.
+
+        Args:
+            server: Name of the server, used as a metrics label
+            enabled: True coalesces every tool and False none; None (the default) coalesces
+                the given tools and those registered as read-only or idempotent
+            tools: Tools whose calls are coalesced when enabled is None
+            excluded: Tools whose calls always go to the server
+            metrics: Registry that mcp_tool_calls_coalesced_total is counted in
+        """
+        self.server = server
+        self.enabled = enabled
+        self.tools = set(tools)
+        self.excluded = set(excluded)
+        self.metrics = metrics
+        self.calls = 0
+        self.collapsed = 0
+        self.collapsed_by_tool: Dict[str, int] = {}
+        self._flights: Dict[Tuple[str, str], _Flight] = {}
+
+    @classmethod
+    def from_config(cls, server: str, config: Dict[str, Any],
+                    cache_policies: Optional[Dict[str, CachePolicy]] = None,
+                    metrics: Optional[Any] = None) -> "SingleFlight":
+        """
+        Build a coalescer from a server's config entry.
+
+        Args:
+            server: Name of the server
+            config: The server's entry from the "mcpServers" section
+            cache_policies: The server's cache policies; tools that invalidate others are excluded
+            metrics: Registry for the coalesced call counter
+        """
+        excluded = set(config.get("coalesce_exclude") or [])
+        excluded.update(tool for tool, policy in (cache_policies or {}).items() if policy.invalidates)
+        enabled = config.get("coalesce")
+        return cls(server, enabled=None if enabled is None else bool(enabled),
+                   tools=config.get("coalesce_tools") or [], excluded=excluded, metrics=metrics)
+
+    def register(self, tool: "MCPTool") -> None:
+        """
+        Coalesce calls to a tool if the server annotates it as read-only or idempotent.
+
+        Args:
+            tool: The tool as listed by the server
+        """
+        annotations = tool.annotations
+        if annotations is not None and (annotations.readOnlyHint or annotations.idempotentHint):
+            self.tools.add(tool.name)
+
+    def coalesces(self, tool: str) -> bool:
+        """
+        Check whether calls to a tool are coalesced.
+        """
+        if self.enabled is False or tool in self.excluded:
+            return False
+        return self.enabled is True or tool in self.tools
+
+    async def call(self, tool: str, arguments: Optional[Dict[str, Any]],
+                   call: Callable[[], Awaitable[Any]]) -> Any:
+        """
+        Make a call, or wait for an identical one already in flight.
+
+        The call runs in its own task, so a caller that is cancelled does not cancel it for
+        the others; it is only cancelled once every caller has given up.
+
+        Args:
+            tool: Name of the tool
+            arguments: Tool arguments
+            call: Makes the request to the server
+
+        Returns:
+            The result of the call
+        """
+        if not self.coalesces(tool):
+            return await call()
+        key = (tool, canonical_arguments(arguments))
+        flight = self._flights.get(key)
+        if flight is None:
+            flight = _Flight(asyncio.ensure_future(call()))
+            self._flights[key] = flight
+            flight.task.add_done_callback(lambda task: self._finish(key, flight))
+            self.calls += 1
+        else:
+            self.collapsed += 1
+            self.collapsed_by_tool[tool] = self.collapsed_by_tool.get(tool, 0) + 1
+            if self.metrics is not None:
+                self.metrics.inc("mcp_tool_calls_coalesced_total", server=self.server, tool=tool)
+
+        flight.waiters += 1
+        try:
+            return await asyncio.shield(flight.task)
+        finally:
+            flight.waiters -= 1
+            if flight.waiters == 0 and not flight.task.done():
+                flight.task.cancel()
+
+    def _finish(self, key: Tuple[str, str], flight: _Flight) -> None:
+        if self._flights.get(key) is flight:
+            del self._flights[key]
+        # Mark the error as retrieved when every caller was cancelled before it arrived
+        if not flight.task.cancelled():
+            flight.task.exception()
+
+    def stats(self) -> Dict[str, Any]:
+        """
+        Report the coalescable calls sent to the server and the calls that shared their result.
+        """
+        return {
+            "enabled": self.enabled,
+            "tools": sorted(self.tools),
+            "calls": self.calls,
+            "collapsed": self.collapsed,
+            "in_flight": len(self._flights),
+            "collapsed_by_tool": dict(self.collapsed_by_tool),
+        }
@@ -0,0 +1,209 @@
+"""
+Per-run tool selection: expose only the tools relevant to the prompt.
+
+Every tool schema is sent to the model on every step, so an agent with dozens of MCP tools
+pays for all of them in prompt tokens and latency. ToolSelector indexes tool names and
+descriptions with BM25 and, through each tool's prepare hook, hides all but the top-k
+matches for the run's prompt. Tools the run has already called stay visible.
+
+The model can widen the selection with the find_tools fallback tool: its matches are
+exposed from the next step on, and calling it with an empty query exposes every tool.
+"""
+import re
+import copy
+import math
+import json
+from collections import Counter
+from typing import Any, Dict, Iterable, List, Optional, Set
+
+from pydantic_ai import RunContext, Tool
+from pydantic_ai.messages import ModelResponse, ToolCallPart
+from pydantic_ai.tools import ToolDefinition
+
+FALLBACK_TOOL_NAME = "find_tools"
+
+_STOPWORDS = frozenset(
+    "a an and are as at be by can could do does for from get has have how i in into is it its "
+    "me my of on or please should so that the their them then there these this to use using "
+    "want was what when where which who why will with would you your".split()
+)
+
+
+def tokenize(text: str) -> List[str]:
+    """
+    Split text into lowercase terms, breaking snake_case and camelCase identifiers apart.
+    """
+    text = re.sub(r"([a-z0-9])([A-Z])", r"\1 \2", text or "")
+    return [term for term in re.findall(r"[a-z0-9]+", text.lower()) if term not in _STOPWORDS]
+
+
+class ToolIndex:
+    """
+    BM25 index over tool names and descriptions.
+    """
+    def __init__(self, documents: Dict[str, str], k1: float = 1.5, b: float = 0.75):
+        """
+        Build the index.
+
+        Args:
+            documents: Tool name to searchable text mapping
+            k1: BM25 term frequency saturation
+            b: BM25 length normalization
+        """
+        self.k1 = k1
+        self.b = b
+        self._terms = {name: Counter(tokenize(text)) for name, text in documents.items()}
+        self._lengths = {name: sum(terms.values()) for name, terms in self._terms.items()}
+        self._average_length = (
+            sum(self._lengths.values()) / len(self._lengths) if self._lengths else 0.0
+        )
+        document_frequency = Counter(term for terms in self._terms.values() for term in terms)
+        count = len(self._terms)
+        self._idf = {
+            term: math.log(1 + (count - frequency + 0.5) / (frequency + 0.5))
+            for term, frequency in document_frequency.items()
+        }
+
+    def search(self, query: str, k: int) -> List[str]:
+        """
+        Find the tools that best match a query.
+
+        Args:
+            query: Free text, usually the user prompt
+            k: Maximum number of results
+
+        Returns:
+            Names of matching tools, best first; tools sharing no term with the query are omitted
+        """
+        query_terms = set(tokenize(query))
+        scores = {}
+        for name, terms in self._terms.items():
+            score = 0.0
+            length_norm = 1 - self.b + self.b * self._lengths[name] / (self._average_length or 1)
+            for term in query_terms & terms.keys():
+                frequency = terms[term]
+                score += self._idf[term] * frequency * (self.k1 + 1) / (frequency + self.k1 * length_norm)
+            if score > 0:
+                scores[name] = score
+        return sorted(scores, key=lambda name: (-scores[name], name))[:k]
+
+
+def _prompt_text(prompt: Any) -> str:
+    if isinstance(prompt, str):
+        return prompt
+    if isinstance(prompt, Iterable):
+        return " ".join(part for part in prompt if isinstance(part, str))
+    return ""
+
+
+class ToolSelector:
+    """
+    Limits the tools an agent sees to the most relevant ones for each run.
+    """
+    def __init__(self, tools: List[Tool], top_k: int = 8, always_include: Optional[Iterable[str]] = None):
+        """
+        Initialize the selector.
+
+        Args:
+            tools: The full set of tools
+            top_k: Number of tools exposed for the prompt and for each find_tools query
+            always_include: Names of tools that are never hidden
+        """
+        self.top_k = top_k
+        self.always_include = set(always_include or [])
+        self._tools = {tool.name: tool for tool in tools}
+        self.index = ToolIndex({
+            # Names count twice: they are short and usually the most specific terms
+            tool.name: f"{tool.name} {tool.name} {tool.description or ''}"
+            for tool in tools
+        })
+        self._last_ctx: Optional[RunContext] = None
+        self._last_selection: Set[str] = set()
+
+    def tools(self) -> List[Tool]:
+        """
+        Get copies of the tools whose prepare hooks apply the selection, plus find_tools.
+        """
+        return [self._wrap(tool) for tool in self._tools.values()] + [self._fallback_tool()]
+
+    def select(self, ctx: RunContext) -> Set[str]:
+        """
+        Get the names of the tools to expose at the current step of a run.
+
+        Args:
+            ctx: The run context passed to prepare hooks
+
+        Returns:
+            Names of the visible tools
+        """
+        # All tools' prepare hooks for one step share a context; select once per step
+        if ctx is self._last_ctx:
+            return self._last_selection
+
+        selection = set(self.always_include)
+        selection.update(self.index.search(_prompt_text(ctx.prompt), self.top_k))
+        for message in ctx.messages:
+            if not isinstance(message, ModelResponse):
+                continue
+            for part in message.parts:
+                if not isinstance(part, ToolCallPart):
+                    continue
+                if part.tool_name != FALLBACK_TOOL_NAME:
+                    selection.add(part.tool_name)
+                    continue
+                query = str(part.args_as_dict().get("query", "")).strip()
+                if not query:
+                    selection.update(self._tools)
+                else:
+                    selection.update(self.index.search(query, self.top_k))
+
+        self._last_ctx, self._last_selection = ctx, selection
+        return selection
+
+    def _wrap(self, tool: Tool) -> Tool:
+        original_prepare = tool.prepare
+
+        async def prepare(ctx: RunContext, tool_def: ToolDefinition) -> Optional[ToolDefinition]:
+            if tool_def.name not in self.select(ctx):
+                return None
+            if original_prepare is not None:
+                return await original_prepare(ctx, tool_def)
+            return tool_def
+
+        wrapped = copy.copy(tool)
+        wrapped.prepare = prepare
+        return wrapped
+
+    def _fallback_tool(self) -> Tool:
+        async def find_tools(query: str = "") -> str:
+            """
+            Search all available tools when none of the visible ones fit the task.
+            Matching tools become callable on the next step. An empty query makes every tool available.
+
+            Args:
+                query: What the tool should do, e.g. "read a file" or "search the web"
+            """
+            names = self.index.search(query, self.top_k) if query.strip() else list(self._tools)
+            return json.dumps([
+                {"name": name, "description": self._tools[name].description} for name in names
+            ])
+
+        return Tool(find_tools, name=FALLBACK_TOOL_NAME, takes_ctx=False)
+
+
+def select_tools(tools: List[Tool], top_k: Optional[int],
+                 always_include: Optional[Iterable[str]] = None) -> List[Tool]:
+    """
+    Apply per-run tool selection to a tool list.
+
+    Args:
+        tools: The full set of tools
+        top_k: Number of tools to expose per run; None or 0 returns the tools unchanged
+        always_include: Names of tools that are never hidden
+
+    Returns:
+        The tools to pass to the Agent
+    """
+    if not top_k or len(tools) <= top_k:
+        return tools
+    return ToolSelector(tools, top_k, always_include).tools()
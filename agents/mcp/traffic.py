@@ -0,0 +1,300 @@
+"""
+Recording and replay of MCP stdio traffic.
+
+record wraps a real server command, passes every JSON-RPC line through unchanged and
+appends each request with its response and latency to a JSONL file:
+
+    python agents/mcp/traffic.py record --output fs.jsonl -- npx -y @modelcontextprotocol/server-filesystem .
+
+Adding "record_traffic": "fs.jsonl" to a server's entry in mcp_config.json makes both MCP
+clients launch the server through the recorder.
+
+replay then serves a recording as a stdio MCP server, without Node or network access:
+
+    {"command": "python", "args": ["agents/mcp/traffic.py", "replay", "fs.jsonl", "--speed", "0"]}
+
+Requests are matched on method and canonical params. A tools/call with arguments that were
+never recorded falls back to other recordings of the same tool, so load tests see realistic
+payload sizes. Responses are delayed by the recorded latency times --speed (0 answers at
+once). Requests are answered concurrently, like a real server.
+
+This file only uses the standard library so it can run as a script from any directory.
+"""
+import os
+import sys
+import json
+import time
+import asyncio
+import argparse
+import itertools
+from collections import defaultdict
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+# Large results (e.g. fetched pages) travel as a single line
+STREAM_LIMIT = 64 * 1024 * 1024
+
+
+def canonical_params(params: Any) -> str:
+    """
+    Serialize request params so equal requests give equal strings, ignoring _meta.
+    """
+    if isinstance(params, dict):
+        params = {key: value for key, value in params.items() if key != "_meta"}
+    return json.dumps(params or {}, sort_keys=True, separators=(",", ":"))
+
+
+async def _stdin_reader() -> asyncio.StreamReader:
+    loop = asyncio.get_running_loop()
+    reader = asyncio.StreamReader(limit=STREAM_LIMIT)
+    await loop.connect_read_pipe(lambda: asyncio.StreamReaderProtocol(reader), sys.stdin)
+    return reader
+
+
+def _write_stdout(data: bytes) -> None:
+    sys.stdout.buffer.write(data)
+    sys.stdout.buffer.flush()
+
+
+class TrafficRecorder:
+    """
+    Relays stdio between a client and a server process and records every exchange.
+    """
+    def __init__(self, output: str, command: List[str]):
+        """
+        Initialize the recorder.
+
+        Args:
+            output: JSONL file exchanges are appended to
+            command: Server command line
+        """
+        self.output = output
+        self.command = command
+        self._pending: Dict[Any, Tuple[str, Any, float]] = {}
+        self._fd: Optional[int] = None
+
+    def _record(self, entry: Dict[str, Any]) -> None:
+        # One write per line on an O_APPEND file, so replicas can share a recording
+        os.write(self._fd, (json.dumps(entry, separators=(",", ":")) + "\n").encode("utf-8"))
+
+    def _observe_request(self, line: bytes) -> None:
+        try:
+            message = json.loads(line)
+        except ValueError:
+            return
+        if isinstance(message, dict) and "method" in message and "id" in message:
+            self._pending[message["id"]] = (message["method"], message.get("params"), time.perf_counter())
+
+    def _observe_response(self, line: bytes) -> None:
+        try:
+            message = json.loads(line)
+        except ValueError:
+            return
+        if not isinstance(message, dict) or "method" in message or message.get("id") not in self._pending:
+            return
+        method, params, started = self._pending.pop(message["id"])
+        entry = {
+            "method": method,
+            "params": params,
+            "seconds": round(time.perf_counter() - started, 6),
+            "bytes": len(line),
+            "recorded_at": time.time(),
+        }
+        if "error" in message:
+            entry["error"] = message["error"]
+        else:
+            entry["result"] = message.get("result")
+        self._record(entry)
+
+    async def run(self) -> int:
+        """
+        Run the server until either side closes, returning its exit code.
+        """
+        directory = os.path.dirname(os.path.abspath(self.output))
+        os.makedirs(directory, exist_ok=True)
+        self._fd = os.open(self.output, os.O_WRONLY | os.O_CREAT | os.O_APPEND, 0o644)
+        process = await asyncio.create_subprocess_exec(
+            *self.command, stdin=asyncio.subprocess.PIPE, stdout=asyncio.subprocess.PIPE,
+            limit=STREAM_LIMIT,
+        )
+        stdin = await _stdin_reader()
+
+        async def client_to_server() -> None:
+            while line := await stdin.readline():
+                self._observe_request(line)
+                process.stdin.write(line)
+                await process.stdin.drain()
+            process.stdin.close()
+
+        async def server_to_client() -> None:
+            while line := await process.stdout.readline():
+                self._observe_response(line)
+                _write_stdout(line)
+
+        try:
+            pumps = [asyncio.create_task(client_to_server()), asyncio.create_task(server_to_client())]
+            done, pending = await asyncio.wait(pumps, return_when=asyncio.FIRST_COMPLETED)
+            if pumps[0] in done:
+                # The client closed its end; let the server finish writing and exit
+                await asyncio.wait(pending, timeout=5)
+            for task in pending:
+                task.cancel()
+            await asyncio.gather(*pumps, return_exceptions=True)
+        finally:
+            if process.returncode is None:
+                try:
+                    process.terminate()
+                except ProcessLookupError:
+                    pass
+            await process.wait()
+            os.close(self._fd)
+        return process.returncode or 0
+
+
+def load_recording(path: str) -> List[Dict[str, Any]]:
+    """
+    Read the exchanges of a recording, skipping lines that cannot be parsed.
+    """
+    exchanges = []
+    with open(path, "r") as f:
+        for line in f:
+            try:
+                exchanges.append(json.loads(line))
+            except ValueError:
+                continue
+    return exchanges
+
+
+class ReplayServer:
+    """
+    Answers MCP requests from a recording over stdio.
+    """
+    def __init__(self, exchanges: List[Dict[str, Any]], speed: float = 1.0):
+        """
+        Initialize the server.
+
+        Args:
+            exchanges: Recorded exchanges
+            speed: Multiplier for the recorded latencies (0 answers at once)
+        """
+        self.speed = speed
+        exact: Dict[Tuple[str, str], List[Dict[str, Any]]] = defaultdict(list)
+        by_method: Dict[str, List[Dict[str, Any]]] = defaultdict(list)
+        by_tool: Dict[str, List[Dict[str, Any]]] = defaultdict(list)
+        for exchange in exchanges:
+            method = exchange.get("method")
+            exact[(method, canonical_params(exchange.get("params")))].append(exchange)
+            by_method[method].append(exchange)
+            if method == "tools/call":
+                by_tool[(exchange.get("params") or {}).get("name")].append(exchange)
+        # Repeated requests cycle through their recordings
+        self._exact = {key: itertools.cycle(items) for key, items in exact.items()}
+        self._by_method = {key: itertools.cycle(items) for key, items in by_method.items()}
+        self._by_tool = {key: itertools.cycle(items) for key, items in by_tool.items()}
+        self.served = 0
+        self.fallbacks = 0
+        self.misses = 0
+
+    def match(self, method: str, params: Any) -> Optional[Dict[str, Any]]:
+        """
+        Find the recorded exchange to answer a request with.
+
+        Args:
+            method: JSON-RPC method
+            params: Request params
+
+        Returns:
+            The exchange, or None if nothing suitable was recorded
+        """
+        recordings: Optional[Iterator[Dict[str, Any]]] = self._exact.get((method, canonical_params(params)))
+        if recordings is None:
+            if method == "tools/call":
+                recordings = self._by_tool.get((params or {}).get("name"))
+            elif method in ("initialize", "ping"):
+                recordings = self._by_method.get(method)
+            if recordings is not None:
+                self.fallbacks += 1
+        if recordings is None:
+            self.misses += 1
+            return None
+        self.served += 1
+        return next(recordings)
+
+    def respond(self, request: Dict[str, Any]) -> Tuple[float, Dict[str, Any]]:
+        """
+        Build the response to a request.
+
+        Returns:
+            Tuple of (delay in seconds, JSON-RPC response)
+        """
+        method, params = request.get("method"), request.get("params")
+        exchange = self.match(method, params)
+        response: Dict[str, Any] = {"jsonrpc": "2.0", "id": request["id"]}
+        if exchange is None:
+            if method == "ping":
+                response["result"] = {}
+            elif method == "tools/call":
+                response["result"] = {
+                    "content": [{"type": "text", "text": f"No recording for tool {(params or {}).get('name')!r}"}],
+                    "isError": True,
+                }
+            else:
+                response["error"] = {"code": -32601, "message": f"No recording for {method}"}
+            return 0.0, response
+        if "error" in exchange:
+            response["error"] = exchange["error"]
+        else:
+            response["result"] = exchange.get("result")
+        return exchange.get("seconds", 0.0) * self.speed, response
+
+    async def serve(self) -> None:
+        """
+        Serve requests from stdin until it closes.
+        """
+        stdin = await _stdin_reader()
+        pending = set()
+
+        async def answer(request: Dict[str, Any]) -> None:
+            delay, response = self.respond(request)
+            if delay > 0:
+                await asyncio.sleep(delay)
+            _write_stdout(json.dumps(response, separators=(",", ":")).encode("utf-8") + b"\n")
+
+        while line := await stdin.readline():
+            try:
+                message = json.loads(line)
+            except ValueError:
+                continue
+            # Notifications (initialized, cancelled, ...) need no answer
+            if not isinstance(message, dict) or "id" not in message or "method" not in message:
+                continue
+            task = asyncio.create_task(answer(message))
+            pending.add(task)
+            task.add_done_callback(pending.discard)
+        await asyncio.gather(*pending, return_exceptions=True)
+
+
+def main() -> None:
+    """
+    Main entry point: record or replay.
+    """
+    parser = argparse.ArgumentParser(description="Record or replay MCP stdio traffic")
+    commands = parser.add_subparsers(dest="mode", required=True)
+    record = commands.add_parser("record", help="Run a server and record its traffic")
+    record.add_argument("--output", required=True, help="JSONL file to append exchanges to")
+    record.add_argument("server", nargs=argparse.REMAINDER, help="Server command line (after --)")
+    replay = commands.add_parser("replay", help="Serve a recording as a stdio MCP server")
+    replay.add_argument("recording", help="JSONL file written by record")
+    replay.add_argument("--speed", type=float, default=1.0,
+                        help="Multiplier for recorded latencies; 0 answers as fast as possible")
+    args = parser.parse_args()
+
+    if args.mode == "record":
+        command = args.server[1:] if args.server[:1] == ["--"] else args.server
+        if not command:
+            parser.error("record needs a server command after --")
+        sys.exit(asyncio.run(TrafficRecorder(args.output, command).run()))
+    asyncio.run(ReplayServer(load_recording(args.recording), args.speed).serve())
+
+
+if __name__ == "__main__":
+    main()
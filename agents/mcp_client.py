@@ -1,28 +1,58 @@
-from pydantic_ai import RunContext, Tool as PydanticTool
-from pydantic_ai.tools import ToolDefinition
-from mcp import ClientSession, StdioServerParameters
-from mcp.client.stdio import stdio_client
-from mcp.types import Tool as MCPTool
+from agents.mcp.catalog import ToolCatalog
+from agents.mcp.result_cache import ToolResultCache
+from agents.mcp.metrics import REGISTRY, MetricsRegistry
+from agents.mcp.schema import schema_tool
+from agents.mcp.result_store import ResultStore
+from agents.mcp.daemon import DaemonConnection, DaemonSession, attachable_servers, connect_to_daemon
+from agents.mcp.health import health_report, monitor_health
+from agents.mcp.server import BaseMCPServer, reap_idle_servers
 from contextlib import AsyncExitStack
 from dotenv import load_dotenv
-from typing import Any, List
+from typing import TYPE_CHECKING, Any, List
 import asyncio
 import logging
-import shutil
 import json
+import time
 import os
 
-logging.basicConfig(
-    level=logging.ERROR, format="%(asctime)s - %(levelname)s - %(message)s"
-)
+# mcp is imported when the first server is spawned and pydantic_ai when the first tools are
+# created; each takes about half a second to load
+if TYPE_CHECKING:
+    from mcp.types import Tool as MCPTool
+    from pydantic_ai import Tool as PydanticTool
 
 class MCPClient:
     """Manages connections to one or more MCP servers based on mcp_config.json"""
 
-    def __init__(self) -> None:
+    def __init__(
+        self,
+        catalog: ToolCatalog | None = None,
+        result_cache: ToolResultCache | None = None,
+        metrics: MetricsRegistry | None = None,
+        result_store: ResultStore | None = None,
+    ) -> None:
+        """
+        Args:
+            catalog: Optional on-disk tool catalog. Servers with a cached catalog advertise their
+                tools immediately while the handshake and a catalog refresh run in the background.
+            result_cache: Optional cache for the results of tools that opt in through the "cache"
+                section of their server's config entry.
+            metrics: Registry for tool call and startup metrics (defaults to the shared REGISTRY).
+            result_store: Where results over a server's "max_result_bytes" are spilled (defaults to
+                a temp directory). The model gets the first part and pages through the rest with
+                the read_tool_result tool.
+        """
         self.servers: List[MCPServer] = []
         self.config: dict[str, Any] = {}
         self.tools: List[Any] = []
+        self.startup_times: dict[str, float] = {}
+        self.daemon: DaemonConnection | None = None
+        self.catalog: ToolCatalog | None = catalog
+        self.result_cache: ToolResultCache | None = result_cache
+        self.metrics: MetricsRegistry = metrics or REGISTRY
+        self.result_store: ResultStore = result_store or ResultStore()
+        self._metrics_server: asyncio.AbstractServer | None = None
+        self._background_tasks: set[asyncio.Task] = set()
         self.exit_stack = AsyncExitStack()
 
     def load_servers(self, config_path: str) -> None:
@@ -35,23 +65,214 @@ class MCPClient:
         with open(config_path, "r") as config_file:
             self.config = json.load(config_file)
 
-        self.servers = [MCPServer(name, config) for name, config in self.config["mcpServers"].items()]
+        self.servers = [
+            MCPServer(
+                name, config, catalog=self.catalog, result_cache=self.result_cache,
+                metrics=self.metrics, result_store=self.result_store,
+            )
+            for name, config in self.config["mcpServers"].items()
+        ]
+
+    async def start(
+        self,
+        concurrent: bool = False,
+        startup_timeout: float | None = None,
+        lazy: bool = False,
+        idle_timeout: float | None = None,
+        health_interval: float | None = None,
+    ) -> List["PydanticTool"]:
+        """Starts each MCP server and returns the tools for each server formatted for Pydantic AI.
 
-    async def start(self) -> List[PydanticTool]:
-        """Starts each MCP server and returns the tools for each server formatted for Pydantic AI."""
-        self.tools = []
-        for server in self.servers:
+        Args:
+            concurrent: Initialize and list tools for all servers at once. Servers that fail or miss
+                the startup deadline are cleaned up and skipped instead of failing the whole start.
+            startup_timeout: Deadline in seconds for each server's initialize and tool discovery.
+            lazy: Advertise tools from the catalog and only start a server on its first tool call.
+                Servers without a catalog entry are still started up front to discover their tools.
+            idle_timeout: Shut down servers that have handled no tool call for this many seconds.
+                They are started again on their next tool call.
+            health_interval: Ping running servers this often (in seconds). A server that fails its
+                ping, or whose connection breaks during a call, is reconnected in the background.
+
+        A server that fails to start is logged and skipped; the tools of the others are returned.
+        Startup durations of the servers that came up are recorded in ``startup_times``.
+        If MCP_DAEMON_SOCKET points at a running daemon, its servers are attached instead.
+        """
+        socket_path = os.getenv("MCP_DAEMON_SOCKET")
+        if socket_path and os.path.exists(socket_path):
             try:
-                await server.initialize()
-                tools = await server.create_pydantic_ai_tools()
+                return await self.attach(socket_path, startup_timeout)
+            except Exception as e:
+                logging.warning(f"Could not attach to MCP daemon, starting servers locally: {e}")
+
+        self.tools = self._result_tools()
+        self.startup_times = {}
+        if lazy and self.catalog is None:
+            self.catalog = ToolCatalog()
+            for server in self.servers:
+                server.catalog = self.catalog
+        if idle_timeout:
+            self._run_in_background(reap_idle_servers(self.servers, idle_timeout))
+        if health_interval:
+            self._run_in_background(monitor_health(self.servers, health_interval))
+
+        servers = []
+        for server in self.servers:
+            server.startup_timeout = startup_timeout
+            cached = server.cached_pydantic_ai_tools()
+            if cached is None:
+                servers.append(server)
+                continue
+            self.tools += cached
+            if not lazy:
+                server.launch()
+                self._run_in_background(self._refresh_server(server, startup_timeout))
+
+        if concurrent:
+            results = await asyncio.gather(
+                *(self._start_server(server, startup_timeout) for server in servers)
+            )
+            for tools in results:
                 self.tools += tools
+            return self.tools
+
+        for server in servers:
+            try:
+                started = time.perf_counter()
+                self.tools += await asyncio.wait_for(self._initialize_server(server), startup_timeout)
+                self.startup_times[server.name] = time.perf_counter() - started
             except Exception as e:
-                logging.error(f"Failed to initialize server: {e}")
-                await self.cleanup_servers()
-                return []
+                # Keep the servers that did come up
+                logging.error(f"Failed to initialize server {server.name}, skipping it: {e}")
+                await server.cleanup()
 
         return self.tools
 
+    async def attach(self, socket_path: str | None = None, startup_timeout: float | None = None) -> List["PydanticTool"]:
+        """Attach to a running MCP daemon and return tools that proxy calls through its sessions.
+
+        Servers the daemon does not run with the same command, args and env are started locally.
+
+        Args:
+            socket_path: The daemon's Unix socket (defaults to MCP_DAEMON_SOCKET).
+            startup_timeout: Deadline in seconds for each locally started server.
+        """
+        connection = await connect_to_daemon(socket_path)
+        if connection is None:
+            raise ConnectionError("No MCP daemon is listening")
+
+        self.daemon = connection
+        self.tools = self._result_tools()
+        self.startup_times = {}
+        try:
+            attached = attachable_servers(await connection.request("list_servers"), self.servers)
+            for server in attached:
+                server.attach(DaemonSession(connection, server.name))
+                self.tools += await server.create_pydantic_ai_tools()
+        except Exception:
+            await self.cleanup_servers()
+            await self._detach()
+            raise
+
+        local = [server for server in self.servers if server not in attached]
+        results = await asyncio.gather(*(self._start_server(server, startup_timeout) for server in local))
+        for tools in results:
+            self.tools += tools
+        return self.tools
+
+    def _result_tools(self) -> List["PydanticTool"]:
+        """Return the read_tool_result tool if any server spills large results."""
+        if any(server.max_result_bytes for server in self.servers):
+            return [self.result_store.tool()]
+        return []
+
+    async def _detach(self) -> None:
+        """Close the connection to the MCP daemon, if any."""
+        if self.daemon is not None:
+            await self.daemon.close()
+            self.daemon = None
+
+    async def _start_server(self, server: "MCPServer", startup_timeout: float | None) -> List["PydanticTool"]:
+        """Start a single server for concurrent startup, returning no tools if it fails."""
+        started = time.perf_counter()
+        try:
+            tools = await asyncio.wait_for(self._initialize_server(server), startup_timeout)
+        except asyncio.TimeoutError:
+            logging.error(f"Server {server.name} did not start within {startup_timeout}s")
+            await server.cleanup()
+            return []
+        except Exception as e:
+            logging.error(f"Failed to initialize server {server.name}: {e}")
+            await server.cleanup()
+            return []
+
+        self.startup_times[server.name] = time.perf_counter() - started
+        logging.info(f"Server {server.name} started in {self.startup_times[server.name]:.2f}s")
+        return tools
+
+    def _run_in_background(self, coro: Any) -> None:
+        """Run a coroutine as a task that is cancelled on cleanup."""
+        task = asyncio.create_task(coro)
+        self._background_tasks.add(task)
+        task.add_done_callback(self._background_tasks.discard)
+
+    async def _refresh_server(self, server: "MCPServer", startup_timeout: float | None) -> None:
+        """Finish starting a server whose tools came from the catalog, then refresh its entry."""
+        cached_names = [tool.name for tool in server.cached_tools or []]
+        cached_version = self.catalog.cached_version(server.config)
+        started = time.perf_counter()
+        try:
+            await asyncio.wait_for(server.wait_until_ready(), startup_timeout)
+            self.startup_times[server.name] = time.perf_counter() - started
+            tools = await server.create_pydantic_ai_tools()
+        except Exception as e:
+            logging.error(f"Failed to initialize server {server.name}: {e}")
+            await server.cleanup()
+            return
+
+        if server.server_version != cached_version:
+            logging.info(f"Server {server.name} version changed, refreshed its catalog")
+        if [tool.name for tool in tools] != cached_names:
+            logging.warning(f"Tools of server {server.name} changed since they were cached; "
+                            "the new catalog applies from the next start")
+
+    async def _initialize_server(self, server: "MCPServer") -> List["PydanticTool"]:
+        """Initialize a server and discover its tools."""
+        await server.initialize()
+        return await server.create_pydantic_ai_tools()
+
+    def cache_stats(self) -> dict[str, Any]:
+        """Return hit and miss counters of the result cache (empty if caching is disabled)."""
+        return self.result_cache.stats() if self.result_cache is not None else {}
+
+    def scheduler_stats(self) -> dict[str, dict[str, Any]]:
+        """Return queue depth, in-flight and wait time statistics for each server."""
+        return {server.name: server.scheduler.stats() for server in self.servers}
+
+    def coalescing_stats(self) -> dict[str, dict[str, Any]]:
+        """Return how many identical concurrent tool calls each server's calls absorbed."""
+        return {server.name: server.single_flight.stats() for server in self.servers}
+
+    def schema_report(self) -> dict[str, dict[str, Any]]:
+        """Return the bytes and tokens saved by compacting each server's tool schemas."""
+        return {server.name: server.schema_stats.report() for server in self.servers}
+
+    def server_health(self) -> dict[str, dict[str, Any]]:
+        """Return whether each server is healthy, its last error and its reconnect attempts."""
+        return health_report(self.servers)
+
+    def export_metrics(self, fmt: str = "json") -> dict[str, Any] | str:
+        """Return the metrics registry as a JSON-serializable dict or, with fmt="prometheus", as text."""
+        if fmt == "prometheus":
+            return self.metrics.to_prometheus()
+        return self.metrics.to_json()
+
+    async def serve_metrics(self, host: str = "127.0.0.1", port: int = 9464) -> asyncio.AbstractServer:
+        """Serve the metrics over HTTP at /metrics and /metrics.json until cleanup."""
+        if self._metrics_server is None:
+            self._metrics_server = await self.metrics.serve(host, port)
+        return self._metrics_server
+
     async def cleanup_servers(self) -> None:
         """Clean up all servers properly."""
         for server in self.servers:
@@ -63,85 +284,49 @@ class MCPClient:
     async def cleanup(self) -> None:
         """Clean up all resources including the exit stack."""
         try:
+            for task in list(self._background_tasks):
+                task.cancel()
+            await asyncio.gather(*self._background_tasks, return_exceptions=True)
             # First clean up all servers
             await self.cleanup_servers()
+            await self._detach()
+            if self._metrics_server is not None:
+                self._metrics_server.close()
+                self._metrics_server = None
+            self.result_store.close()
             # Then close the exit stack
             await self.exit_stack.aclose()
         except Exception as e:
             logging.warning(f"Warning during final cleanup: {e}")
 
 
-class MCPServer:
-    """Manages MCP server connections and tool execution."""
-
-    def __init__(self, name: str, config: dict[str, Any]) -> None:
-        self.name: str = name
-        self.config: dict[str, Any] = config
-        self.stdio_context: Any | None = None
-        self.session: ClientSession | None = None
-        self._cleanup_lock: asyncio.Lock = asyncio.Lock()
-        self.exit_stack: AsyncExitStack = AsyncExitStack()
-
-    async def initialize(self) -> None:
-        """Initialize the server connection."""
-        command = (
-            shutil.which("npx")
-            if self.config["command"] == "npx"
-            else self.config["command"]
-        )
-        if command is None:
-            raise ValueError("The command must be a valid string and cannot be None.")
-
-        server_params = StdioServerParameters(
-            command=command,
-            args=self.config["args"],
-            env=self.config["env"]
-            if self.config.get("env")
-            else None,
-        )
-        try:
-            stdio_transport = await self.exit_stack.enter_async_context(
-                stdio_client(server_params)
-            )
-            read, write = stdio_transport
-            session = await self.exit_stack.enter_async_context(
-                ClientSession(read, write)
-            )
-            await session.initialize()
-            self.session = session
-        except Exception as e:
-            logging.error(f"Error initializing server {self.name}: {e}")
-            await self.cleanup()
-            raise
+class MCPServer(BaseMCPServer):
+    """Manages an MCP server connection and turns its tools into Pydantic AI tools.
 
-    async def create_pydantic_ai_tools(self) -> List[PydanticTool]:
-        """Convert MCP tools to pydantic_ai Tools."""
-        tools = (await self.session.list_tools()).tools
-        return [self.create_tool_instance(tool) for tool in tools]            
+    The lifecycle and call pipeline are shared with the factory client through BaseMCPServer.
+    """
 
-    def create_tool_instance(self, tool: MCPTool) -> PydanticTool:
-        """Initialize a Pydantic AI Tool from an MCP Tool."""
+    async def create_pydantic_ai_tools(self) -> List["PydanticTool"]:
+        """Convert MCP tools to pydantic_ai Tools, following list_tools pagination cursors.
+
+        The tools are written to the catalog, if one is configured.
+        """
+        return [self.create_tool_instance(tool) for tool in await self.list_tools()]
+
+    def cached_pydantic_ai_tools(self) -> List["PydanticTool"] | None:
+        """Create pydantic_ai Tools from the catalog, or return None if nothing is cached."""
+        cached = self.load_catalog()
+        if cached is None:
+            return None
+        return [self.create_tool_instance(tool) for tool in cached]
+
+    def create_tool_instance(self, tool: "MCPTool") -> "PydanticTool":
+        """Initialize a Pydantic AI Tool from an MCP Tool.
+
+        Results over max_result_bytes are spilled to the result store and only their first part
+        is returned.
+        """
         async def execute_tool(**kwargs: Any) -> Any:
-            return await self.session.call_tool(tool.name, arguments=kwargs)
-
-        async def prepare_tool(ctx: RunContext, tool_def: ToolDefinition) -> ToolDefinition | None:
-            tool_def.parameters_json_schema = tool.inputSchema
-            return tool_def
-        
-        return PydanticTool(
-            execute_tool,
-            name=tool.name,
-            description=tool.description or "",
-            takes_ctx=False,
-            prepare=prepare_tool
-        )
+            return self.bound_result(tool.name, await self.call_tool(tool.name, kwargs))
 
-    async def cleanup(self) -> None:
-        """Clean up server resources."""
-        async with self._cleanup_lock:
-            try:
-                await self.exit_stack.aclose()
-                self.session = None
-                self.stdio_context = None
-            except Exception as e:
-                logging.error(f"Error during cleanup of server {self.name}: {e}")
+        return schema_tool(execute_tool, tool.name, tool.description, self.prepare_tool(tool))
@@ -0,0 +1,179 @@
+"""
+Process-wide registry of OpenAI-compatible models and their HTTP clients.
+
+Creating an OpenAIModel without a client gives it a private HTTP connection pool, so every
+agent pays for new TCP and TLS handshakes and no keep-alive connection is ever reused. The
+registry keeps one tuned httpx client per (base URL, API key) and one model instance per
+model name on top of it:
+
+    model = MODEL_POOL.model("gpt-4o-mini", base_url=..., api_key=...)
+
+Pool limits come from MODEL_HTTP_MAX_CONNECTIONS, MODEL_HTTP_MAX_KEEPALIVE and
+MODEL_HTTP_KEEPALIVE_EXPIRY; HTTP/2 is used when the h2 package is installed, unless
+MODEL_HTTP2=0.
+
+httpx connections belong to the event loop that opened them, so clients are per event loop:
+a new asyncio.run() gets fresh clients instead of dead ones, and the replaced clients are
+closed.
+"""
+import os
+import asyncio
+import logging
+import importlib.util
+from typing import Any, Dict, Optional, Set, Tuple
+
+import httpx
+from openai import AsyncOpenAI
+from pydantic_ai.models.openai import OpenAIModel
+
+logger = logging.getLogger("model_pool")
+
+
+def http2_available() -> bool:
+    """
+    Check whether httpx can speak HTTP/2 (it needs the optional h2 package).
+    """
+    return importlib.util.find_spec("h2") is not None
+
+
+def openai_model(model_name: str, openai_client: AsyncOpenAI) -> OpenAIModel:
+    """
+    Create an OpenAIModel that sends its requests through the given client.
+    """
+    try:
+        from pydantic_ai.providers.openai import OpenAIProvider
+    except ImportError:
+        # Older pydantic-ai releases take the client directly
+        return OpenAIModel(model_name, openai_client=openai_client)
+    return OpenAIModel(model_name, provider=OpenAIProvider(openai_client=openai_client))
+
+
+def _running_loop() -> Optional[asyncio.AbstractEventLoop]:
+    try:
+        return asyncio.get_running_loop()
+    except RuntimeError:
+        return None
+
+
+class ModelPool:
+    """
+    Shares HTTP clients and model instances across every agent in the process.
+    """
+    def __init__(
+        self,
+        max_connections: Optional[int] = None,
+        max_keepalive: Optional[int] = None,
+        keepalive_expiry: Optional[float] = None,
+        http2: Optional[bool] = None,
+        timeout: float = 600.0,
+        connect_timeout: float = 10.0,
+    ):
+        """
+        Initialize the pool.
+
+        Args:
+            max_connections: Connections per client (defaults to MODEL_HTTP_MAX_CONNECTIONS or 100)
+            max_keepalive: Idle connections kept open (defaults to MODEL_HTTP_MAX_KEEPALIVE or 20)
+            keepalive_expiry: Seconds an idle connection is kept (defaults to
+                MODEL_HTTP_KEEPALIVE_EXPIRY or 60)
+            http2: Use HTTP/2 (defaults to MODEL_HTTP2, or on when h2 is installed)
+            timeout: Read timeout in seconds for model requests
+            connect_timeout: Connect timeout in seconds
+        """
+        self.max_connections = max_connections or int(os.getenv("MODEL_HTTP_MAX_CONNECTIONS", "100"))
+        self.max_keepalive = max_keepalive or int(os.getenv("MODEL_HTTP_MAX_KEEPALIVE", "20"))
+        self.keepalive_expiry = keepalive_expiry or float(os.getenv("MODEL_HTTP_KEEPALIVE_EXPIRY", "60"))
+        if http2 is None:
+            http2 = os.getenv("MODEL_HTTP2", "1") != "0" and http2_available()
+        self.http2 = http2
+        self.timeout = timeout
+        self.connect_timeout = connect_timeout
+        self._clients: Dict[Tuple[Optional[str], Optional[str]], Tuple[Any, AsyncOpenAI]] = {}
+        self._models: Dict[Tuple[str, Optional[str], Optional[str]], Tuple[AsyncOpenAI, OpenAIModel]] = {}
+        self._closing: Set[asyncio.Task] = set()
+
+    def client(self, base_url: Optional[str] = None, api_key: Optional[str] = None) -> AsyncOpenAI:
+        """
+        Get the shared OpenAI client for a base URL and API key.
+
+        Args:
+            base_url: API base URL (None uses the openai library's default / OPENAI_BASE_URL)
+            api_key: API key (None uses OPENAI_API_KEY)
+
+        Returns:
+            An AsyncOpenAI client backed by the pooled HTTP client
+        """
+        key = (base_url, api_key)
+        loop = _running_loop()
+        entry = self._clients.get(key)
+        if entry is not None and entry[0] is loop:
+            return entry[1]
+        if entry is not None:
+            self._retire(*entry)
+
+        http_client = httpx.AsyncClient(
+            http2=self.http2,
+            limits=httpx.Limits(
+                max_connections=self.max_connections,
+                max_keepalive_connections=self.max_keepalive,
+                keepalive_expiry=self.keepalive_expiry,
+            ),
+            timeout=httpx.Timeout(self.timeout, connect=self.connect_timeout),
+        )
+        client = AsyncOpenAI(base_url=base_url, api_key=api_key, http_client=http_client)
+        self._clients[key] = (loop, client)
+        logger.info(f"Created pooled HTTP client for {base_url or 'the default base URL'} "
+                    f"(http2={self.http2}, max_connections={self.max_connections})")
+        return client
+
+    def model(self, model_name: str, base_url: Optional[str] = None,
+              api_key: Optional[str] = None) -> OpenAIModel:
+        """
+        Get the shared model instance for a model name, base URL and API key.
+
+        The instance is shared: wrap it rather than changing its attributes.
+        """
+        client = self.client(base_url, api_key)
+        key = (model_name, base_url, api_key)
+        entry = self._models.get(key)
+        if entry is not None and entry[0] is client:
+            return entry[1]
+        model = openai_model(model_name, client)
+        self._models[key] = (client, model)
+        return model
+
+    def stats(self) -> Dict[str, Any]:
+        """
+        Report the number of pooled clients and cached models.
+        """
+        return {"clients": len(self._clients), "models": len(self._models), "http2": self.http2}
+
+    def _retire(self, client_loop: Optional[asyncio.AbstractEventLoop], client: AsyncOpenAI) -> None:
+        """
+        Close a client that is no longer handed out, on its own loop if that is still running.
+        """
+        loop = _running_loop()
+        if client_loop is not None and client_loop is not loop and client_loop.is_running():
+            asyncio.run_coroutine_threadsafe(client.close(), client_loop)
+        elif loop is not None:
+            task = loop.create_task(client.close())
+            self._closing.add(task)
+            task.add_done_callback(self._closing.discard)
+        else:
+            asyncio.run(client.close())
+
+    async def aclose(self) -> None:
+        """
+        Close every pooled client and forget all cached models.
+
+        Clients of an event loop still running in another thread are closed on that loop.
+        """
+        loop = _running_loop()
+        clients, self._clients, self._models = self._clients, {}, {}
+        for client_loop, client in clients.values():
+            self._retire(client_loop, client)
+        await asyncio.gather(*(task for task in self._closing if task.get_loop() is loop))
+
+
+# Registry get_model and get_openai_model draw from
+MODEL_POOL = ModelPool()
@@ -0,0 +1,283 @@
+"""
+Record and replay of model responses, keyed by a fingerprint of the full request.
+
+Development and regression runs send the same prompts and tools to the model over and over.
+ReplayModel wraps a model and hashes everything that decides the response: the model name,
+the messages (without timestamps and usage), the tool and output definitions, and the
+settings. Its modes are:
+
+- "record": send the request and store the response under its fingerprint
+- "replay": answer from the store and fail on a miss, without touching the network
+- "auto": replay on a hit, otherwise send and record
+- "off": pass requests through unchanged
+
+Streamed requests are replayed as a stream of the stored parts. get_model() and the agent
+factory wrap their models when MODEL_REPLAY_MODE is set, so example.py, simple_agent.py and
+the benchmarks run offline and deterministically against a recorded store:
+
+    MODEL_REPLAY_MODE=record python simple_agent.py --query "What are MCP tools?"
+    MODEL_REPLAY_MODE=replay python simple_agent.py --query "What are MCP tools?"
+"""
+import os
+import json
+import time
+import hashlib
+import logging
+import pathlib
+import tempfile
+import dataclasses
+from contextlib import asynccontextmanager
+from datetime import datetime, timezone
+from typing import Any, AsyncIterator, Dict, List, Optional
+
+from pydantic_ai.messages import (
+    ModelMessage,
+    ModelMessagesTypeAdapter,
+    ModelResponse,
+    ModelResponseStreamEvent,
+    TextPart,
+    ThinkingPart,
+    ToolCallPart,
+)
+from pydantic_ai.models import Model, ModelRequestParameters, StreamedResponse
+from pydantic_ai.models.wrapper import WrapperModel
+from pydantic_ai.settings import ModelSettings
+
+logger = logging.getLogger("model_replay")
+
+DEFAULT_REPLAY_DIR = pathlib.Path.home() / ".cache" / "mcp-agent-factory" / "model_replay"
+MODES = ("off", "record", "replay", "auto")
+
+# Fields that differ between otherwise identical requests
+_VOLATILE_KEYS = frozenset((
+    "timestamp", "usage", "vendor_id", "vendor_details",
+    "provider_request_id", "provider_response_id", "provider_details", "provider_name",
+))
+
+
+class ReplayMissError(LookupError):
+    """Raised in replay mode when no response was recorded for a request."""
+
+
+def replay_mode() -> str:
+    """
+    Get the replay mode from MODEL_REPLAY_MODE ("off" if unset).
+    """
+    return (os.getenv("MODEL_REPLAY_MODE") or "off").lower()
+
+
+def _strip_volatile(messages: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    # Only message and part fields: tool arguments and results may use the same key names
+    def strip(fields: Dict[str, Any]) -> Dict[str, Any]:
+        return {key: value for key, value in fields.items() if key not in _VOLATILE_KEYS}
+
+    return [
+        {**strip(message), "parts": [strip(part) for part in message.get("parts", [])]}
+        for message in messages
+    ]
+
+
+def request_fingerprint(model_name: str, messages: List[ModelMessage],
+                        model_settings: Optional[ModelSettings],
+                        model_request_parameters: ModelRequestParameters) -> str:
+    """
+    Hash everything about a model request that decides its response.
+
+    Args:
+        model_name: Name of the model the request goes to
+        messages: The request messages
+        model_settings: The request settings
+        model_request_parameters: Tool and output definitions
+
+    Returns:
+        A hex SHA-256 digest
+    """
+    request = {
+        "model": model_name,
+        "messages": _strip_volatile(ModelMessagesTypeAdapter.dump_python(messages, mode="json")),
+        "settings": dict(model_settings or {}),
+        "parameters": dataclasses.asdict(model_request_parameters),
+    }
+    data = json.dumps(request, sort_keys=True, separators=(",", ":"), default=str)
+    return hashlib.sha256(data.encode("utf-8")).hexdigest()
+
+
+class ReplayStore:
+    """
+    Stores one recorded response per request fingerprint as a JSON file.
+    """
+    def __init__(self, directory: Optional[str] = None):
+        """
+        Initialize the store.
+
+        Args:
+            directory: Directory for recordings (defaults to MODEL_REPLAY_DIR or
+                ~/.cache/mcp-agent-factory/model_replay)
+        """
+        self.directory = pathlib.Path(directory or os.getenv("MODEL_REPLAY_DIR") or DEFAULT_REPLAY_DIR)
+
+    def path_for(self, fingerprint: str) -> pathlib.Path:
+        """
+        Get the recording file for a fingerprint.
+        """
+        return self.directory / f"{fingerprint}.json"
+
+    def load(self, fingerprint: str) -> Optional[ModelResponse]:
+        """
+        Load the recorded response for a fingerprint, or None if there is none.
+        """
+        path = self.path_for(fingerprint)
+        try:
+            with open(path, "r") as f:
+                entry = json.load(f)
+            return ModelMessagesTypeAdapter.validate_python([entry["response"]])[0]
+        except FileNotFoundError:
+            return None
+        except Exception as e:
+            logger.warning(f"Ignoring unreadable recording {path}: {e}")
+            return None
+
+    def store(self, fingerprint: str, model_name: str, response: ModelResponse) -> None:
+        """
+        Write a response, replacing any previous recording atomically.
+        """
+        entry = {
+            "model": model_name,
+            "recorded_at": time.time(),
+            "response": ModelMessagesTypeAdapter.dump_python([response], mode="json")[0],
+        }
+        try:
+            self.directory.mkdir(parents=True, exist_ok=True)
+            fd, tmp_path = tempfile.mkstemp(dir=self.directory, suffix=".tmp")
+            with os.fdopen(fd, "w") as f:
+                json.dump(entry, f)
+            os.replace(tmp_path, self.path_for(fingerprint))
+        except OSError as e:
+            logger.warning(f"Could not record model response: {e}")
+
+
+@dataclasses.dataclass
+class ReplayStreamedResponse(StreamedResponse):
+    """
+    Streams the parts of a recorded response.
+    """
+    _response: ModelResponse = None
+    _model_name: str = ""
+    _timestamp: datetime = dataclasses.field(default_factory=lambda: datetime.now(timezone.utc))
+
+    async def _get_event_iterator(self) -> AsyncIterator[ModelResponseStreamEvent]:
+        self._usage = self._response.usage
+        for index, part in enumerate(self._response.parts):
+            if isinstance(part, TextPart):
+                event = self._parts_manager.handle_text_delta(vendor_part_id=index, content=part.content)
+            elif isinstance(part, ToolCallPart):
+                event = self._parts_manager.handle_tool_call_part(
+                    vendor_part_id=index, tool_name=part.tool_name, args=part.args,
+                    tool_call_id=part.tool_call_id,
+                )
+            elif isinstance(part, ThinkingPart):
+                event = self._parts_manager.handle_thinking_delta(
+                    vendor_part_id=index, content=part.content, signature=part.signature,
+                )
+            else:
+                continue
+            if event is not None:
+                yield event
+
+    @property
+    def model_name(self) -> str:
+        return self._model_name
+
+    @property
+    def timestamp(self) -> datetime:
+        return self._timestamp
+
+
+class ReplayModel(WrapperModel):
+    """
+    Wraps a model to record its responses or replay them by request fingerprint.
+    """
+    def __init__(self, wrapped: Model, mode: Optional[str] = None, store: Optional[ReplayStore] = None):
+        """
+        Initialize the wrapper.
+
+        Args:
+            wrapped: The model to wrap
+            mode: "off", "record", "replay" or "auto" (defaults to MODEL_REPLAY_MODE or "off")
+            store: Where recordings live (defaults to a ReplayStore in MODEL_REPLAY_DIR)
+        """
+        super().__init__(wrapped)
+        mode = (mode or replay_mode()).lower()
+        if mode not in MODES:
+            raise ValueError(f"Unknown replay mode {mode!r}; expected one of {', '.join(MODES)}")
+        self.mode = mode
+        self.store = store or ReplayStore()
+        self.hits = 0
+        self.misses = 0
+
+    def _lookup(self, fingerprint: str) -> Optional[ModelResponse]:
+        if self.mode not in ("replay", "auto"):
+            return None
+        response = self.store.load(fingerprint)
+        if response is not None:
+            self.hits += 1
+            return response
+        self.misses += 1
+        if self.mode == "replay":
+            raise ReplayMissError(
+                f"No recorded response for request {fingerprint[:12]} to {self.model_name}; "
+                f"record it with MODEL_REPLAY_MODE=record or auto"
+            )
+        return None
+
+    async def request(self, messages: List[ModelMessage], model_settings: Optional[ModelSettings],
+                      model_request_parameters: ModelRequestParameters) -> ModelResponse:
+        if self.mode == "off":
+            return await self.wrapped.request(messages, model_settings, model_request_parameters)
+        fingerprint = request_fingerprint(self.model_name, messages, model_settings, model_request_parameters)
+        response = self._lookup(fingerprint)
+        if response is not None:
+            return response
+        response = await self.wrapped.request(messages, model_settings, model_request_parameters)
+        self.store.store(fingerprint, self.model_name, response)
+        return response
+
+    @asynccontextmanager
+    async def request_stream(self, messages: List[ModelMessage], model_settings: Optional[ModelSettings],
+                             model_request_parameters: ModelRequestParameters) -> AsyncIterator[StreamedResponse]:
+        if self.mode == "off":
+            async with self.wrapped.request_stream(
+                messages, model_settings, model_request_parameters
+            ) as response_stream:
+                yield response_stream
+            return
+        fingerprint = request_fingerprint(self.model_name, messages, model_settings, model_request_parameters)
+        response = self._lookup(fingerprint)
+        if response is not None:
+            yield ReplayStreamedResponse(_response=response, _model_name=response.model_name or self.model_name)
+            return
+        async with self.wrapped.request_stream(
+            messages, model_settings, model_request_parameters
+        ) as response_stream:
+            yield response_stream
+        # The response as far as the run read it; agent runs read model streams to the end
+        response = response_stream.get()
+        if response.parts:
+            self.store.store(fingerprint, self.model_name, response)
+
+
+def replay_model(model: Model, mode: Optional[str] = None) -> Model:
+    """
+    Wrap a model for record/replay if a mode is set, otherwise return it unchanged.
+
+    Args:
+        model: The model to wrap
+        mode: Replay mode (defaults to the MODEL_REPLAY_MODE environment variable)
+
+    Returns:
+        A ReplayModel, or the model itself when the mode is "off"
+    """
+    mode = (mode or replay_mode()).lower()
+    if mode == "off":
+        return model
+    return ReplayModel(model, mode)
@@ -0,0 +1,453 @@
+"""
+Agent server: hosts many agents in one process over a local HTTP API.
+
+Starting an agent per request means importing pydantic-ai, launching every MCP server and
+opening a new OpenAI connection each time. The server does all of that once: it starts one
+MCPClient and builds an agent for each definition, with models (and their HTTP connection
+pool) from the shared MODEL_POOL. Requests then only pay for the run itself.
+
+    python -m agents.server --port 8765
+    python -m agents.server --socket /tmp/agents.sock --agents my_agents.json
+
+Endpoints (JSON in and out):
+
+    GET    /agents              the agent definitions
+    POST   /runs                {"agent", "prompt", "session_id"?, "run_id"?, "stream"?}
+    GET    /runs                runs in progress
+    DELETE /runs/<run_id>       cancel a run
+    GET    /health, /metrics    server state and the metrics registry as JSON
+
+A run answers with {"run_id", "text", "data"}; with "stream": true it answers with one JSON
+event per line as run_agent_stream produces them, ending with an "error" event if the run
+fails after the stream has started. Each run has its own call context and,
+if a session_id is given, its session's conversation history. At most max_runs run at once;
+later runs wait for a slot. A client that disconnects cancels its run.
+"""
+import os
+import json
+import uuid
+import signal
+import asyncio
+import logging
+import argparse
+from collections import OrderedDict
+from typing import Any, Dict, Optional, Tuple
+
+from .history import ConversationHistory
+from .mcp.client import MCPClient
+from .model_pool import MODEL_POOL
+from .mcp.agent_factory import (
+    CONFIG_PATH,
+    GENERAL_ASSISTANT_PROMPT,
+    TOOL_LISTING_PROMPT,
+    build_agent,
+    run_agent_stream,
+)
+
+logger = logging.getLogger("agent_server")
+
+# Agents served when no definitions file is given
+DEFAULT_DEFINITIONS = {
+    "general_assistant": {"system_prompt": GENERAL_ASSISTANT_PROMPT},
+    "tool_listing": {"system_prompt": TOOL_LISTING_PROMPT},
+}
+
+MAX_BODY_BYTES = 4 * 1024 * 1024
+
+_REASONS = {200: "OK", 400: "Bad Request", 404: "Not Found", 405: "Method Not Allowed",
+            409: "Conflict", 413: "Payload Too Large", 499: "Client Closed Request",
+            500: "Internal Server Error"}
+
+
+class HTTPError(Exception):
+    """Raised by a handler to answer with an error status."""
+
+    def __init__(self, status: int, message: str):
+        super().__init__(message)
+        self.status = status
+
+
+def load_definitions(path: Optional[str]) -> Dict[str, Dict[str, Any]]:
+    """
+    Load agent definitions from a JSON file.
+
+    The file maps agent ids to {"system_prompt", "model"?, "tool_top_k"?}, or holds a list of
+    such objects with an "id" field each.
+
+    Args:
+        path: Definitions file; None returns the built-in agents
+
+    Returns:
+        Agent id to definition mapping
+    """
+    if not path:
+        return dict(DEFAULT_DEFINITIONS)
+    with open(path, "r") as f:
+        data = json.load(f)
+    if isinstance(data, dict) and "agents" in data:
+        data = data["agents"]
+    if isinstance(data, list):
+        data = {entry["id"]: entry for entry in data}
+    for agent_id, definition in data.items():
+        if not definition.get("system_prompt"):
+            raise ValueError(f"Agent definition {agent_id!r} has no system_prompt")
+    return data
+
+
+class AgentServer:
+    """
+    Serves runs of several agents that share one MCP client and one model connection pool.
+    """
+    def __init__(
+        self,
+        config_path: str = CONFIG_PATH,
+        definitions: Optional[Dict[str, Dict[str, Any]]] = None,
+        max_runs: int = 8,
+        max_sessions: int = 1000,
+        startup_timeout: Optional[float] = None,
+    ):
+        """
+        Initialize the server.
+
+        Args:
+            config_path: Path to the MCP configuration file
+            definitions: Agent id to definition mapping (defaults to the built-in agents)
+            max_runs: Maximum number of runs executing at once
+            max_sessions: Conversation histories kept in memory before the least recently
+                used are dropped; sessions with a run in progress are kept
+            startup_timeout: Deadline in seconds for each MCP server to start
+        """
+        self.config_path = config_path
+        self.definitions = definitions or dict(DEFAULT_DEFINITIONS)
+        self.max_runs = max_runs
+        self.max_sessions = max_sessions
+        self.startup_timeout = startup_timeout
+        self.client: Optional[MCPClient] = None
+        self.agents: Dict[str, Any] = {}
+        self._slots = asyncio.Semaphore(max_runs)
+        self._runs: Dict[str, Dict[str, Any]] = {}
+        self._sessions: "OrderedDict[Tuple[str, str], Tuple[ConversationHistory, asyncio.Lock]]" = OrderedDict()
+        self._server: Optional[asyncio.AbstractServer] = None
+        self._socket_path: Optional[str] = None
+        self._stopped = asyncio.Event()
+
+    async def start(self) -> None:
+        """
+        Start the MCP servers and build every agent.
+        """
+        self.client = MCPClient(self.config_path)
+        tools = await self.client.start(concurrent=True, startup_timeout=self.startup_timeout)
+        for agent_id, definition in self.definitions.items():
+            self.agents[agent_id] = build_agent(
+                self.client,
+                tools,
+                definition["system_prompt"],
+                model_name=definition.get("model"),
+                tool_top_k=definition.get("tool_top_k"),
+            )
+        logger.info(f"Serving {len(self.agents)} agents with {len(tools)} MCP tools")
+
+    async def listen(self, host: str = "127.0.0.1", port: int = 8765,
+                     socket_path: Optional[str] = None) -> None:
+        """
+        Start accepting requests on a TCP port or, if socket_path is given, a Unix socket.
+        """
+        if socket_path:
+            if os.path.exists(socket_path):
+                os.unlink(socket_path)
+            self._server = await asyncio.start_unix_server(self._handle_http, path=socket_path)
+            os.chmod(socket_path, 0o600)
+            self._socket_path = socket_path
+            logger.info(f"Agent server listening on {socket_path}")
+        else:
+            self._server = await asyncio.start_server(self._handle_http, host, port)
+            bound = self._server.sockets[0].getsockname()
+            logger.info(f"Agent server listening on http://{bound[0]}:{bound[1]}")
+
+    async def serve_forever(self, host: str = "127.0.0.1", port: int = 8765,
+                            socket_path: Optional[str] = None) -> None:
+        """
+        Start and serve until stop() is called or a termination signal arrives.
+        """
+        await self.start()
+        await self.listen(host, port, socket_path)
+        loop = asyncio.get_running_loop()
+        for sig in (signal.SIGINT, signal.SIGTERM):
+            loop.add_signal_handler(sig, self._stopped.set)
+        try:
+            await self._stopped.wait()
+        finally:
+            await self.stop()
+
+    async def stop(self) -> None:
+        """
+        Stop listening, cancel running runs and shut down the MCP servers.
+        """
+        self._stopped.set()
+        if self._server is not None:
+            self._server.close()
+            self._server = None
+        for run in list(self._runs.values()):
+            run["task"].cancel()
+        await asyncio.gather(*(run["task"] for run in list(self._runs.values())),
+                             return_exceptions=True)
+        if self._socket_path and os.path.exists(self._socket_path):
+            os.unlink(self._socket_path)
+        await MODEL_POOL.aclose()
+        if self.client is not None:
+            await self.client.cleanup()
+            self.client = None
+
+    def cancel(self, run_id: str) -> bool:
+        """
+        Cancel a run in progress.
+
+        Returns:
+            True if the run was found
+        """
+        run = self._runs.get(run_id)
+        if run is None:
+            return False
+        run["task"].cancel()
+        return True
+
+    def _session(self, agent_id: str, session_id: str) -> Tuple[ConversationHistory, asyncio.Lock]:
+        key = (agent_id, session_id)
+        if key in self._sessions:
+            self._sessions.move_to_end(key)
+        else:
+            self._sessions[key] = (ConversationHistory(), asyncio.Lock())
+            # Sessions with a run in progress or waiting are still in use and are not evicted
+            idle = [other for other, (_, lock) in self._sessions.items()
+                    if other != key and not lock.locked()]
+            for other in idle[:max(len(self._sessions) - self.max_sessions, 0)]:
+                del self._sessions[other]
+        return self._sessions[key]
+
+    async def _execute(self, agent_id: str, prompt: str, session_id: Optional[str],
+                       events: asyncio.Queue) -> None:
+        """
+        Run an agent, putting its events on the queue. Runs of one session take turns.
+        """
+        agent = self.agents[agent_id]
+        async with self._slots:
+            if session_id:
+                history, lock = self._session(agent_id, session_id)
+                async with lock:
+                    async for event in run_agent_stream(agent, prompt, history=history):
+                        await events.put(event)
+            else:
+                async for event in run_agent_stream(agent, prompt):
+                    await events.put(event)
+
+    async def _start_run(self, body: Dict[str, Any]) -> Tuple[str, asyncio.Task, asyncio.Queue]:
+        agent_id = body.get("agent")
+        prompt = body.get("prompt")
+        if agent_id not in self.agents:
+            raise HTTPError(404, f"Unknown agent {agent_id!r}")
+        if not isinstance(prompt, str) or not prompt:
+            raise HTTPError(400, "Missing prompt")
+        run_id = str(body.get("run_id") or uuid.uuid4().hex)
+        if run_id in self._runs:
+            raise HTTPError(409, f"Run {run_id!r} is already in progress")
+
+        events: asyncio.Queue = asyncio.Queue()
+        task = asyncio.create_task(self._execute(agent_id, prompt, body.get("session_id"), events))
+        self._runs[run_id] = {"task": task, "agent": agent_id, "session_id": body.get("session_id")}
+        task.add_done_callback(lambda _: self._runs.pop(run_id, None))
+        return run_id, task, events
+
+    async def _handle_http(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+        try:
+            try:
+                method, path, body = await self._read_request(reader)
+                if method == "POST" and path == "/runs":
+                    await self._serve_run(body, reader, writer)
+                    return
+                status, payload = 200, self._route(method, path)
+            except HTTPError as e:
+                status, payload = e.status, {"error": str(e)}
+            except Exception as e:
+                logger.error(f"Error handling agent server request: {e}")
+                status, payload = 500, {"error": str(e)}
+            await self._write_json(writer, status, payload)
+        except (ConnectionError, asyncio.IncompleteReadError) as e:
+            logger.warning(f"Agent server request failed: {e}")
+        finally:
+            writer.close()
+
+    def _route(self, method: str, path: str) -> Any:
+        if method == "GET" and path == "/agents":
+            return {
+                agent_id: {key: value for key, value in definition.items() if key != "system_prompt"}
+                for agent_id, definition in self.definitions.items()
+            }
+        if method == "GET" and path == "/runs":
+            return {run_id: {"agent": run["agent"], "session_id": run["session_id"]}
+                    for run_id, run in self._runs.items()}
+        if method == "DELETE" and path.startswith("/runs/"):
+            run_id = path[len("/runs/"):]
+            if not self.cancel(run_id):
+                raise HTTPError(404, f"Unknown run {run_id!r}")
+            return {"run_id": run_id, "cancelled": True}
+        if method == "GET" and path == "/health":
+            return {
+                "agents": list(self.agents),
+                "runs": len(self._runs),
+                "max_runs": self.max_runs,
+                "sessions": len(self._sessions),
+                "servers": self.client.server_health() if self.client else {},
+            }
+        if method == "GET" and path == "/metrics":
+            return self.client.export_metrics() if self.client else {}
+        if path in ("/agents", "/runs", "/health", "/metrics") or path.startswith("/runs/"):
+            raise HTTPError(405, f"{method} is not allowed on {path}")
+        raise HTTPError(404, f"Not found: {path}")
+
+    async def _serve_run(self, body: Any, reader: asyncio.StreamReader,
+                         writer: asyncio.StreamWriter) -> None:
+        if not isinstance(body, dict):
+            raise HTTPError(400, "Expected a JSON object")
+        run_id, task, events = await self._start_run(body)
+        disconnected = asyncio.create_task(self._wait_for_eof(reader))
+        streaming = bool(body.get("stream"))
+        try:
+            if streaming:
+                writer.write(b"HTTP/1.1 200 OK\r\nContent-Type: application/x-ndjson\r\n"
+                             b"Cache-Control: no-cache\r\nConnection: close\r\n\r\n")
+                await self._write_line(writer, {"type": "run", "run_id": run_id})
+
+            final: Dict[str, Any] = {}
+            while True:
+                get = asyncio.create_task(events.get())
+                done, _ = await asyncio.wait({get, task, disconnected}, return_when=asyncio.FIRST_COMPLETED)
+                if get not in done:
+                    get.cancel()
+                if disconnected in done:
+                    task.cancel()
+                    return
+                if get in done:
+                    event = get.result()
+                    if event["type"] in ("final", "error"):
+                        final = event
+                    if streaming:
+                        await self._write_line(writer, event)
+                    continue
+                # The run finished; deliver any events it queued last
+                while not events.empty():
+                    event = events.get_nowait()
+                    if event["type"] in ("final", "error"):
+                        final = event
+                    if streaming:
+                        await self._write_line(writer, event)
+                break
+
+            if task.cancelled():
+                if streaming:
+                    await self._write_line(writer, {"type": "cancelled", "run_id": run_id})
+                else:
+                    await self._write_json(writer, 499, {"run_id": run_id, "error": "Run cancelled"})
+                return
+            if task.exception() is not None:
+                raise task.exception()
+            if not streaming:
+                status = 500 if final.get("type") == "error" else 200
+                await self._write_json(writer, status, {
+                    "run_id": run_id,
+                    "text": final.get("text", ""),
+                    "data": final.get("data", {}),
+                })
+        except (ConnectionError, asyncio.CancelledError):
+            task.cancel()
+            raise
+        except Exception as e:
+            if not streaming:
+                raise
+            # The 200 header has been sent, so the error can only be reported in the stream
+            logger.error(f"Run {run_id} failed: {e}")
+            await self._write_line(writer, {"type": "error", "run_id": run_id, "text": str(e)})
+        finally:
+            disconnected.cancel()
+
+    @staticmethod
+    async def _wait_for_eof(reader: asyncio.StreamReader) -> None:
+        """
+        Return once the client closes its end of the connection.
+
+        The request has been read completely, so only EOF (or a reset) means the client went
+        away; anything it sends after the request is discarded.
+        """
+        try:
+            while await reader.read(64 * 1024):
+                pass
+        except ConnectionError:
+            pass
+
+    async def _read_request(self, reader: asyncio.StreamReader) -> Tuple[str, str, Any]:
+        request_line = (await reader.readline()).decode("latin-1").split()
+        if len(request_line) < 2:
+            raise HTTPError(400, "Malformed request line")
+        headers = {}
+        while line := (await reader.readline()).strip():
+            name, _, value = line.decode("latin-1").partition(":")
+            headers[name.strip().lower()] = value.strip()
+        try:
+            length = int(headers.get("content-length") or 0)
+        except ValueError:
+            raise HTTPError(400, "Invalid Content-Length header")
+        if length < 0:
+            raise HTTPError(400, "Invalid Content-Length header")
+        if length > MAX_BODY_BYTES:
+            raise HTTPError(413, "Request body too large")
+        body = None
+        if length:
+            try:
+                body = json.loads(await reader.readexactly(length))
+            except ValueError:
+                raise HTTPError(400, "Request body is not valid JSON")
+        return request_line[0].upper(), request_line[1].split("?")[0].rstrip("/") or "/", body
+
+    @staticmethod
+    async def _write_json(writer: asyncio.StreamWriter, status: int, payload: Any) -> None:
+        body = json.dumps(payload, default=str).encode("utf-8")
+        writer.write(
+            f"HTTP/1.1 {status} {_REASONS.get(status, '')}\r\nContent-Type: application/json\r\n"
+            f"Content-Length: {len(body)}\r\nConnection: close\r\n\r\n".encode("latin-1") + body
+        )
+        await writer.drain()
+
+    @staticmethod
+    async def _write_line(writer: asyncio.StreamWriter, event: Dict[str, Any]) -> None:
+        writer.write(json.dumps(event, default=str).encode("utf-8") + b"\n")
+        await writer.drain()
+
+
+async def main() -> None:
+    """
+    Main entry point for the agent server.
+    """
+    parser = argparse.ArgumentParser(description="Serve MCP agents over a local HTTP API")
+    parser.add_argument("--config", default=CONFIG_PATH, help="Path to MCP config file")
+    parser.add_argument("--agents", help="JSON file with agent definitions (defaults to the built-in agents)")
+    parser.add_argument("--host", default="127.0.0.1", help="Interface to listen on")
+    parser.add_argument("--port", type=int, default=8765, help="Port to listen on")
+    parser.add_argument("--socket", help="Listen on this Unix socket instead of a TCP port")
+    parser.add_argument("--max-runs", type=int, default=8, help="Maximum concurrent runs")
+    parser.add_argument("--startup-timeout", type=float, help="Per-server startup deadline in seconds")
+    args = parser.parse_args()
+
+    logging.basicConfig(
+        level=logging.INFO,
+        format="%(asctime)s - %(name)s - %(levelname)s - %(message)s"
+    )
+    server = AgentServer(
+        args.config,
+        load_definitions(args.agents),
+        max_runs=args.max_runs,
+        startup_timeout=args.startup_timeout,
+    )
+    await server.serve_forever(args.host, args.port, args.socket)
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,230 @@
+"""
+SQLite-backed store for agent message histories.
+
+Each finished run appends one row holding the run's new messages, serialized with
+pydantic-ai's message adapter and zlib-compressed. Rows are never updated, so several agent
+processes can write to the same database: it runs in WAL mode, writers wait on the lock for
+up to busy_timeout, and readers are never blocked. Resuming a session reads only its most
+recent turns through the (session_id, id) index.
+
+Calls run on a worker thread so a slow disk or a waiting writer does not stall the event loop.
+"""
+import os
+import time
+import zlib
+import asyncio
+import pathlib
+import sqlite3
+import threading
+import dataclasses
+from typing import Any, Dict, List, Optional
+
+from pydantic_ai.messages import ModelMessage, ModelMessagesTypeAdapter, ModelRequest, SystemPromptPart
+
+DEFAULT_SESSION_DB = pathlib.Path.home() / ".cache" / "mcp-agent-factory" / "sessions.db"
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS sessions (
+    session_id TEXT PRIMARY KEY,
+    created_at REAL NOT NULL,
+    updated_at REAL NOT NULL,
+    turns INTEGER NOT NULL DEFAULT 0
+);
+CREATE TABLE IF NOT EXISTS turns (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    session_id TEXT NOT NULL,
+    created_at REAL NOT NULL,
+    payload BLOB NOT NULL
+);
+CREATE INDEX IF NOT EXISTS turns_session_id ON turns (session_id, id);
+CREATE INDEX IF NOT EXISTS turns_session_time ON turns (session_id, created_at);
+CREATE INDEX IF NOT EXISTS sessions_updated ON sessions (updated_at);
+"""
+
+
+def encode_messages(messages: List[ModelMessage], level: int = 6) -> bytes:
+    """
+    Serialize messages to compressed JSON.
+    """
+    return zlib.compress(ModelMessagesTypeAdapter.dump_json(messages), level)
+
+
+def decode_messages(payload: bytes) -> List[ModelMessage]:
+    """
+    Restore messages written by encode_messages().
+    """
+    return ModelMessagesTypeAdapter.validate_json(zlib.decompress(payload))
+
+
+class SessionStore:
+    """
+    Persists the message list of each agent session as append-only rows.
+
+    Usage:
+        store = SessionStore()
+        for turn in await store.load_turns(session_id, last_turns=20):
+            await history.add(turn)
+        ...
+        await store.append(session_id, result.new_messages())
+    """
+    def __init__(self, path: Optional[str] = None, busy_timeout: float = 10.0, compress_level: int = 6):
+        """
+        Initialize the store.
+
+        Args:
+            path: Database file (defaults to AGENT_SESSION_DB env var or
+                ~/.cache/mcp-agent-factory/sessions.db)
+            busy_timeout: Seconds a writer waits for another process's write to finish
+            compress_level: zlib compression level for message payloads
+        """
+        self.path = str(path or os.getenv("AGENT_SESSION_DB") or DEFAULT_SESSION_DB)
+        self.busy_timeout = busy_timeout
+        self.compress_level = compress_level
+        self._conn: Optional[sqlite3.Connection] = None
+        self._lock = threading.Lock()
+
+    def _connect(self) -> sqlite3.Connection:
+        if self._conn is None:
+            if self.path != ":memory:":
+                pathlib.Path(self.path).parent.mkdir(parents=True, exist_ok=True)
+            # Autocommit mode; write transactions are opened explicitly with BEGIN IMMEDIATE
+            conn = sqlite3.connect(self.path, timeout=self.busy_timeout,
+                                   isolation_level=None, check_same_thread=False)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            conn.executescript(_SCHEMA)
+            self._conn = conn
+        return self._conn
+
+    async def _run(self, fn, *args: Any) -> Any:
+        def locked() -> Any:
+            with self._lock:
+                return fn(self._connect(), *args)
+        return await asyncio.to_thread(locked)
+
+    async def append(self, session_id: str, messages: List[ModelMessage]) -> None:
+        """
+        Append one turn (the new messages of a run) to a session.
+
+        Args:
+            session_id: Session to append to; created on first use
+            messages: The run's new messages (result.new_messages())
+        """
+        messages = list(messages)
+        if not messages:
+            return
+        payload = encode_messages(messages, self.compress_level)
+
+        def write(conn: sqlite3.Connection) -> None:
+            now = time.time()
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                conn.execute("INSERT INTO turns (session_id, created_at, payload) VALUES (?, ?, ?)",
+                             (session_id, now, payload))
+                conn.execute(
+                    "INSERT INTO sessions (session_id, created_at, updated_at, turns) VALUES (?, ?, ?, 1) "
+                    "ON CONFLICT(session_id) DO UPDATE SET updated_at = excluded.updated_at, "
+                    "turns = turns + 1",
+                    (session_id, now, now),
+                )
+                conn.execute("COMMIT")
+            except BaseException:
+                conn.execute("ROLLBACK")
+                raise
+
+        await self._run(write)
+
+    async def load_turns(self, session_id: str, last_turns: Optional[int] = None) -> List[List[ModelMessage]]:
+        """
+        Load a session's turns, oldest first.
+
+        When only the most recent turns are loaded, the system prompt of the session's first
+        turn is carried over to the first loaded turn, so the agent keeps its instructions.
+
+        Args:
+            session_id: Session to load
+            last_turns: Only load this many of the most recent turns (None loads all)
+
+        Returns:
+            One message list per turn; empty for an unknown session
+        """
+        def read(conn: sqlite3.Connection) -> List[bytes]:
+            if last_turns is None:
+                rows = conn.execute("SELECT payload FROM turns WHERE session_id = ? ORDER BY id",
+                                    (session_id,)).fetchall()
+                return [row[0] for row in rows]
+            rows = conn.execute(
+                "SELECT id, payload FROM turns WHERE session_id = ? ORDER BY id DESC LIMIT ?",
+                (session_id, max(last_turns, 0)),
+            ).fetchall()
+            rows.reverse()
+            first = conn.execute("SELECT id, payload FROM turns WHERE session_id = ? ORDER BY id LIMIT 1",
+                                 (session_id,)).fetchone()
+            if rows and first and first[0] != rows[0][0]:
+                return [first[1]] + [row[1] for row in rows]
+            return [row[1] for row in rows]
+
+        payloads = await self._run(read)
+        turns = [decode_messages(payload) for payload in payloads]
+        if last_turns is not None and len(turns) > last_turns:
+            turns = _carry_system_prompt(turns[0], turns[1:])
+        return turns
+
+    async def load(self, session_id: str, last_turns: Optional[int] = None) -> List[ModelMessage]:
+        """
+        Load a session as one flat message list, suitable for message_history.
+        """
+        return [message for turn in await self.load_turns(session_id, last_turns) for message in turn]
+
+    async def list_sessions(self, limit: int = 100) -> List[Dict[str, Any]]:
+        """
+        List the most recently updated sessions.
+
+        Returns:
+            Dicts with session_id, created_at, updated_at and turns
+        """
+        def read(conn: sqlite3.Connection) -> List[Dict[str, Any]]:
+            rows = conn.execute(
+                "SELECT session_id, created_at, updated_at, turns FROM sessions "
+                "ORDER BY updated_at DESC LIMIT ?", (limit,)
+            ).fetchall()
+            return [dict(zip(("session_id", "created_at", "updated_at", "turns"), row)) for row in rows]
+
+        return await self._run(read)
+
+    async def delete(self, session_id: str) -> None:
+        """
+        Delete a session and all its turns.
+        """
+        def write(conn: sqlite3.Connection) -> None:
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                conn.execute("DELETE FROM turns WHERE session_id = ?", (session_id,))
+                conn.execute("DELETE FROM sessions WHERE session_id = ?", (session_id,))
+                conn.execute("COMMIT")
+            except BaseException:
+                conn.execute("ROLLBACK")
+                raise
+
+        await self._run(write)
+
+    def close(self) -> None:
+        """
+        Close the database connection.
+        """
+        with self._lock:
+            if self._conn is not None:
+                self._conn.close()
+                self._conn = None
+
+
+def _carry_system_prompt(first: List[ModelMessage], turns: List[List[ModelMessage]]) -> List[List[ModelMessage]]:
+    system = [part for message in first[:1] if isinstance(message, ModelRequest)
+              for part in message.parts if isinstance(part, SystemPromptPart)]
+    if not system or not turns or not turns[0]:
+        return turns
+    head = turns[0][0]
+    if isinstance(head, ModelRequest):
+        head = dataclasses.replace(head, parts=system + list(head.parts))
+        return [[head] + turns[0][1:]] + turns[1:]
+    return [[ModelRequest(parts=system)] + turns[0]] + turns[1:]
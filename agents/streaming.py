@@ -0,0 +1,98 @@
+"""
+Streaming agent runs: yields text deltas and tool events as they happen.
+"""
+from typing import Any, AsyncIterator, Dict
+
+from pydantic_ai import Agent
+from pydantic_ai.messages import (
+    FunctionToolCallEvent,
+    FunctionToolResultEvent,
+    PartDeltaEvent,
+    PartStartEvent,
+    TextPart,
+    TextPartDelta,
+)
+
+
+async def stream_run(agent: Agent, prompt: str, **kwargs: Any) -> AsyncIterator[Dict[str, Any]]:
+    """
+    Run an agent and yield events while the run is in progress.
+
+    Args:
+        agent: The agent to run
+        prompt: The user prompt
+        **kwargs: Extra arguments for agent.iter (e.g. message_history, deps)
+
+    Yields:
+        Event dicts with a "type" key:
+        - "text": {"delta"} a piece of the model's text output
+        - "tool_call": {"tool_name", "args", "tool_call_id"} a tool is about to run
+        - "tool_result": {"tool_name", "content", "tool_call_id"} a tool finished
+        - "final": {"output", "result"} the run finished; result is the AgentRunResult
+    """
+    async with agent.iter(prompt, **kwargs) as run:
+        async for node in run:
+            if Agent.is_model_request_node(node):
+                async with node.stream(run.ctx) as request_stream:
+                    async for event in request_stream:
+                        if isinstance(event, PartStartEvent) and isinstance(event.part, TextPart):
+                            if event.part.content:
+                                yield {"type": "text", "delta": event.part.content}
+                        elif isinstance(event, PartDeltaEvent) and isinstance(event.delta, TextPartDelta):
+                            if event.delta.content_delta:
+                                yield {"type": "text", "delta": event.delta.content_delta}
+            elif Agent.is_call_tools_node(node):
+                async with node.stream(run.ctx) as tools_stream:
+                    async for event in tools_stream:
+                        if isinstance(event, FunctionToolCallEvent):
+                            yield {
+                                "type": "tool_call",
+                                "tool_name": event.part.tool_name,
+                                "args": event.part.args,
+                                "tool_call_id": event.part.tool_call_id,
+                            }
+                        elif isinstance(event, FunctionToolResultEvent):
+                            yield {
+                                "type": "tool_result",
+                                "tool_name": event.result.tool_name,
+                                "content": event.result.content,
+                                "tool_call_id": event.tool_call_id,
+                            }
+
+    yield {"type": "final", "output": run.result.output, "result": run.result}
+
+
+async def print_stream(agent: Agent, prompt: str, prefix: str = "[Assistant] ", **kwargs: Any) -> Any:
+    """
+    Run an agent, printing its text as it streams and announcing tool calls.
+
+    Args:
+        agent: The agent to run
+        prompt: The user prompt
+        prefix: Printed before the assistant's text
+        **kwargs: Extra arguments for agent.iter
+
+    Returns:
+        The AgentRunResult of the finished run
+    """
+    streamed_text = False
+    result = None
+    async for event in stream_run(agent, prompt, **kwargs):
+        if event["type"] == "text":
+            if not streamed_text:
+                print(prefix, end="", flush=True)
+                streamed_text = True
+            print(event["delta"], end="", flush=True)
+        elif event["type"] == "tool_call":
+            if streamed_text:
+                print()
+                streamed_text = False
+            print(f"[Tool] {event['tool_name']}({event['args']})", flush=True)
+        elif event["type"] == "final":
+            result = event["result"]
+            if streamed_text:
+                print()
+            else:
+                # Structured outputs arrive without text deltas
+                print(prefix, event["output"])
+    return result
@@ -0,0 +1,180 @@
+"""
+Import-time budget for the agents package.
+
+The frontend launches a Python process for every agent run, so everything the package imports
+before doing any work is paid on each run. This imports each module in a fresh interpreter
+with -X importtime, takes the median over several runs and checks it against a budget:
+
+    python benchmarks/import_time.py
+    python benchmarks/import_time.py --runs 10 --top 15
+
+A module over its budget, or one that imports a package it must leave to first use (mcp is
+only needed once a server is spawned, pydantic_ai once an agent or its tools are created),
+makes the script exit with status 1. --budget-scale loosens every budget on slow machines.
+"""
+import sys
+import json
+import pathlib
+import argparse
+import statistics
+import subprocess
+from typing import Dict, List, Optional, Set, Tuple
+
+ROOT_DIR = pathlib.Path(__file__).parent.parent.resolve()
+
+# Module: (budget in milliseconds, packages it must not import)
+BUDGETS: Dict[str, Tuple[float, Tuple[str, ...]]] = {
+    "agents": (25, ("pydantic_ai", "openai", "mcp")),
+    "agents.mcp.config": (25, ("pydantic_ai", "openai", "mcp")),
+    "agents.mcp.scheduler": (100, ("pydantic_ai", "openai", "mcp")),
+    "agents.mcp.traffic": (100, ("pydantic_ai", "openai", "mcp")),
+    "agents.mcp.daemon": (150, ("pydantic_ai", "openai", "mcp")),
+    "agents.mcp.health": (100, ("pydantic_ai", "openai", "mcp", "anyio")),
+    "agents.mcp.result_store": (100, ("pydantic_ai", "openai", "mcp")),
+    "agents.mcp.metrics": (100, ("pydantic_ai", "openai", "mcp")),
+    "agents.mcp.schema": (25, ("pydantic_ai", "openai", "mcp")),
+    "agents.mcp_client": (150, ("pydantic_ai", "openai", "mcp")),
+    "agents.mcp.client": (150, ("pydantic_ai", "openai", "mcp")),
+    "agents.lightweight_agent": (150, ("pydantic_ai", "openai", "mcp")),
+    "agents.mcp.agent_factory": (1500, ("mcp",)),
+}
+
+
+def parse_importtime(stderr: str) -> List[Tuple[int, float, str]]:
+    """
+    Parse -X importtime output.
+
+    Returns:
+        (depth, cumulative milliseconds, module) for every import, in output order
+    """
+    imports = []
+    for line in stderr.splitlines():
+        if not line.startswith("import time:") or "|" not in line:
+            continue
+        _, cumulative, name = line.split("|", 2)
+        if not cumulative.strip().isdigit():
+            continue  # The header line
+        stripped = name.lstrip()
+        # One space after the bar, then two more per nesting level
+        depth = (len(name) - len(stripped) - 1) // 2
+        imports.append((depth, int(cumulative) / 1000, stripped))
+    return imports
+
+
+def import_once(module: str, baseline: Set[str]) -> Tuple[float, List[Tuple[float, str]]]:
+    """
+    Import a module in a fresh interpreter.
+
+    Args:
+        module: Module to import
+        baseline: Modules the interpreter imports on startup, which are not counted
+
+    Returns:
+        Tuple of (total milliseconds, [(cumulative milliseconds, module)] for every import)
+    """
+    completed = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        cwd=ROOT_DIR, capture_output=True, text=True, check=True,
+    )
+    imports = [(depth, ms, name) for depth, ms, name in parse_importtime(completed.stderr)
+               if name not in baseline]
+    total = sum(ms for depth, ms, _ in imports if depth == 0)
+    return total, [(ms, name) for _, ms, name in imports]
+
+
+def startup_modules() -> Set[str]:
+    """
+    Get the modules an empty interpreter imports on startup.
+    """
+    completed = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", "pass"],
+        capture_output=True, text=True, check=True,
+    )
+    return {name for _, _, name in parse_importtime(completed.stderr)}
+
+
+def measure(modules: Optional[List[str]] = None, runs: int = 5) -> Dict[str, Dict[str, object]]:
+    """
+    Measure the import time of each module.
+
+    Args:
+        modules: Modules to measure (defaults to every module in BUDGETS)
+        runs: Fresh interpreters per module; the median is reported
+
+    Returns:
+        Per module: median_ms, max_ms, the top-level packages it imported and its
+        slowest imports
+    """
+    baseline = startup_modules()
+    results: Dict[str, Dict[str, object]] = {}
+    for module in modules or list(BUDGETS):
+        totals = []
+        slowest: Dict[str, float] = {}
+        for _ in range(runs):
+            total, imports = import_once(module, baseline)
+            totals.append(total)
+            for ms, name in imports:
+                slowest[name] = max(ms, slowest.get(name, 0.0))
+        results[module] = {
+            "median_ms": statistics.median(totals),
+            "max_ms": max(totals),
+            "packages": sorted({name.split(".")[0] for name in slowest}),
+            "slowest": sorted(slowest.items(), key=lambda item: item[1], reverse=True),
+        }
+    return results
+
+
+def check(results: Dict[str, Dict[str, object]], budget_scale: float = 1.0) -> List[str]:
+    """
+    Compare measurements with BUDGETS.
+
+    Returns:
+        One message per violated budget
+    """
+    failures = []
+    for module, result in results.items():
+        if module not in BUDGETS:
+            continue
+        budget_ms, forbidden = BUDGETS[module]
+        budget_ms *= budget_scale
+        if result["median_ms"] > budget_ms:
+            failures.append(f"{module}: {result['median_ms']:.1f} ms exceeds the {budget_ms:.0f} ms budget")
+        for package in forbidden:
+            if package in result["packages"]:
+                failures.append(f"{module}: imports {package}, which it must leave to first use")
+    return failures
+
+
+def main() -> None:
+    """
+    Main entry point for the import-time benchmark.
+    """
+    parser = argparse.ArgumentParser(description="Import-time budget for the agents package")
+    parser.add_argument("modules", nargs="*", help="Modules to measure (defaults to all budgeted modules)")
+    parser.add_argument("--runs", type=int, default=5, help="Fresh interpreters per module")
+    parser.add_argument("--top", type=int, default=0, help="Show the slowest imports of each module")
+    parser.add_argument("--budget-scale", type=float, default=1.0, help="Multiply every budget by this")
+    parser.add_argument("--json", action="store_true", help="Print the results as JSON")
+    args = parser.parse_args()
+
+    results = measure(args.modules, args.runs)
+    failures = check(results, args.budget_scale)
+
+    if args.json:
+        print(json.dumps({module: {key: value for key, value in result.items() if key != "slowest"}
+                          for module, result in results.items()}, indent=2))
+    else:
+        print(f"{'module':<30} {'median':>10} {'max':>10} {'budget':>10}")
+        for module, result in results.items():
+            budget = f"{BUDGETS[module][0] * args.budget_scale:.0f} ms" if module in BUDGETS else "-"
+            print(f"{module:<30} {result['median_ms']:>7.1f} ms {result['max_ms']:>7.1f} ms {budget:>10}")
+            for name, ms in result["slowest"][:args.top]:
+                print(f"    {ms:>8.1f} ms  {name}")
+
+    for failure in failures:
+        print(f"FAIL {failure}", file=sys.stderr)
+    sys.exit(1 if failures else 0)
+
+
+if __name__ == "__main__":
+    main()
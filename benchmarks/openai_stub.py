@@ -0,0 +1,135 @@
+"""
+Minimal OpenAI-compatible chat completions server for offline model benchmarks.
+
+Answers POST /v1/chat/completions with a fixed reply, plain or streamed as server-sent
+events, over keep-alive HTTP/1.1 connections. It counts the connections and requests it
+has seen, so benchmarks can check that clients reuse connections.
+
+    python benchmarks/openai_stub.py --port 8991
+"""
+import json
+import time
+import asyncio
+import argparse
+from typing import Any, Dict, Optional
+
+
+class OpenAIStub:
+    """
+    An in-process OpenAI-compatible server.
+    """
+    def __init__(self, reply: str = "stub reply", latency_ms: float = 0.0):
+        """
+        Initialize the stub.
+
+        Args:
+            reply: Text every completion returns
+            latency_ms: Delay before each response
+        """
+        self.reply = reply
+        self.latency_ms = latency_ms
+        self.connections = 0
+        self.requests = 0
+        self._server: Optional[asyncio.AbstractServer] = None
+
+    @property
+    def base_url(self) -> str:
+        host, port = self._server.sockets[0].getsockname()[:2]
+        return f"http://{host}:{port}/v1"
+
+    async def start(self, host: str = "127.0.0.1", port: int = 0) -> None:
+        """
+        Start listening (port 0 picks a free port; see base_url).
+        """
+        self._server = await asyncio.start_server(self._handle_connection, host, port)
+
+    async def stop(self) -> None:
+        """
+        Stop listening.
+        """
+        if self._server is not None:
+            self._server.close()
+            self._server = None
+
+    def _completion(self, request: Dict[str, Any]) -> Dict[str, Any]:
+        return {
+            "id": f"chatcmpl-stub-{self.requests}",
+            "object": "chat.completion",
+            "created": int(time.time()),
+            "model": request.get("model", "stub"),
+            "choices": [{
+                "index": 0,
+                "message": {"role": "assistant", "content": self.reply},
+                "finish_reason": "stop",
+            }],
+            "usage": {"prompt_tokens": 10, "completion_tokens": 2, "total_tokens": 12},
+        }
+
+    def _chunks(self, request: Dict[str, Any]):
+        base = {
+            "id": f"chatcmpl-stub-{self.requests}",
+            "object": "chat.completion.chunk",
+            "created": int(time.time()),
+            "model": request.get("model", "stub"),
+        }
+        for word in self.reply.split(" "):
+            yield {**base, "choices": [{"index": 0, "delta": {"content": word + " "}, "finish_reason": None}]}
+        yield {**base, "choices": [{"index": 0, "delta": {}, "finish_reason": "stop"}],
+               "usage": {"prompt_tokens": 10, "completion_tokens": 2, "total_tokens": 12}}
+
+    async def _handle_connection(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+        self.connections += 1
+        try:
+            while request_line := await reader.readline():
+                headers = {}
+                while line := (await reader.readline()).strip():
+                    name, _, value = line.decode("latin-1").partition(":")
+                    headers[name.strip().lower()] = value.strip()
+                length = int(headers.get("content-length") or 0)
+                body = json.loads(await reader.readexactly(length)) if length else {}
+                self.requests += 1
+                if self.latency_ms:
+                    await asyncio.sleep(self.latency_ms / 1000)
+
+                if b"/chat/completions" not in request_line:
+                    payload = b'{"error": {"message": "not found"}}'
+                    writer.write(b"HTTP/1.1 404 Not Found\r\nContent-Type: application/json\r\n"
+                                 b"Content-Length: %d\r\n\r\n" % len(payload) + payload)
+                elif body.get("stream"):
+                    events = b"".join(
+                        b"data: " + json.dumps(chunk).encode("utf-8") + b"\n\n" for chunk in self._chunks(body)
+                    ) + b"data: [DONE]\n\n"
+                    writer.write(b"HTTP/1.1 200 OK\r\nContent-Type: text/event-stream\r\n"
+                                 b"Content-Length: %d\r\n\r\n" % len(events) + events)
+                else:
+                    payload = json.dumps(self._completion(body)).encode("utf-8")
+                    writer.write(b"HTTP/1.1 200 OK\r\nContent-Type: application/json\r\n"
+                                 b"Content-Length: %d\r\n\r\n" % len(payload) + payload)
+                await writer.drain()
+                if headers.get("connection", "").lower() == "close":
+                    break
+        except (ConnectionError, asyncio.IncompleteReadError):
+            pass
+        finally:
+            writer.close()
+
+
+async def main() -> None:
+    """
+    Run the stub until interrupted.
+    """
+    parser = argparse.ArgumentParser(description="OpenAI-compatible stub server")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8991)
+    parser.add_argument("--reply", default="stub reply", help="Text every completion returns")
+    parser.add_argument("--latency-ms", type=float, default=0.0, help="Delay before each response")
+    args = parser.parse_args()
+
+    stub = OpenAIStub(args.reply, args.latency_ms)
+    await stub.start(args.host, args.port)
+    print(f"OpenAI stub listening on {stub.base_url}", flush=True)
+    await asyncio.Event().wait()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,374 @@
+"""
+Offline benchmarks for the MCP clients.
+
+Measures startup, list_tools, tool call round trips, agent runs and cleanup for
+agents/mcp_client.py ("lightweight") and agents/mcp/client.py ("factory") against the
+bundled stub server, with a pydantic-ai FunctionModel in place of OpenAI. Model requests
+through fresh and pooled HTTP clients are timed against a local OpenAI-compatible stub, and
+the import time of the package's entry modules is measured in fresh interpreters:
+
+    python benchmarks/run_benchmarks.py --output bench.json
+    python benchmarks/run_benchmarks.py --latency-ms 5 --compare bench.json
+
+Results are written as JSON so runs on different commits can be compared.
+"""
+import os
+import sys
+import json
+import time
+import asyncio
+import pathlib
+import argparse
+import platform
+import itertools
+import resource
+import tempfile
+import subprocess
+from typing import Any, Callable, Dict, List, Optional
+
+ROOT_DIR = pathlib.Path(__file__).parent.parent.resolve()
+sys.path.append(str(ROOT_DIR))
+
+from pydantic_ai import Agent
+from pydantic_ai.messages import ModelMessage, ModelResponse, TextPart, ToolCallPart, ToolReturnPart
+from pydantic_ai.models.function import AgentInfo, FunctionModel
+
+from agents.mcp_client import MCPClient as LightweightMCPClient
+from agents.mcp.client import MCPClient as FactoryMCPClient
+from agents.mcp.catalog import ToolCatalog, list_all_tools
+from agents.model_pool import ModelPool, openai_model
+
+from benchmarks.openai_stub import OpenAIStub
+from benchmarks.import_time import measure as measure_imports
+
+STUB_SERVER = pathlib.Path(__file__).parent / "stub_server.py"
+CLIENTS = ("lightweight", "factory")
+
+
+def percentiles(samples: List[float]) -> Dict[str, float]:
+    """
+    Summarize latency samples (in seconds) as milliseconds.
+
+    Args:
+        samples: Measured durations in seconds
+
+    Returns:
+        count, mean, min, p50, p95, p99 and max
+    """
+    if not samples:
+        return {"count": 0}
+    ordered = sorted(samples)
+
+    def rank(p: float) -> float:
+        # Nearest-rank percentile
+        index = max(0, min(len(ordered) - 1, int(round(p / 100 * len(ordered) + 0.5)) - 1))
+        return ordered[index] * 1000
+
+    return {
+        "count": len(ordered),
+        "mean_ms": sum(ordered) / len(ordered) * 1000,
+        "min_ms": ordered[0] * 1000,
+        "p50_ms": rank(50),
+        "p95_ms": rank(95),
+        "p99_ms": rank(99),
+        "max_ms": ordered[-1] * 1000,
+    }
+
+
+def write_config(directory: str, args: argparse.Namespace) -> str:
+    """
+    Write an MCP config that runs the stub server.
+    """
+    config = {
+        "mcpServers": {
+            "bench": {
+                "command": sys.executable,
+                "args": [
+                    str(STUB_SERVER),
+                    "--latency-ms", str(args.latency_ms),
+                    "--payload-bytes", str(args.payload_bytes),
+                    "--extra-tools", str(args.extra_tools),
+                ],
+                "env": {"PATH": os.environ.get("PATH", "")},
+            }
+        }
+    }
+    path = os.path.join(directory, "bench_mcp_config.json")
+    with open(path, "w") as f:
+        json.dump(config, f)
+    return path
+
+
+def make_client(kind: str, config_path: str, catalog: Optional[ToolCatalog]) -> Any:
+    """
+    Create one of the two MCP clients for the benchmark config.
+    """
+    if kind == "lightweight":
+        client = LightweightMCPClient(catalog=catalog)
+        client.load_servers(config_path)
+        return client
+    return FactoryMCPClient(config_path, catalog=catalog)
+
+
+def tool_calling_model() -> FunctionModel:
+    """
+    A model that calls echo once and then answers, standing in for an LLM.
+    """
+    def respond(messages: List[ModelMessage], info: AgentInfo) -> ModelResponse:
+        if any(isinstance(part, ToolReturnPart) for part in messages[-1].parts):
+            return ModelResponse(parts=[TextPart("done")])
+        return ModelResponse(parts=[ToolCallPart("echo", {"text": "hello"})])
+
+    return FunctionModel(respond)
+
+
+async def timed(func: Callable[[], Any], iterations: int) -> List[float]:
+    """
+    Await func() sequentially and record each duration.
+    """
+    samples = []
+    for _ in range(iterations):
+        started = time.perf_counter()
+        await func()
+        samples.append(time.perf_counter() - started)
+    return samples
+
+
+async def throughput(func: Callable[[], Any], calls: int, concurrency: int) -> Dict[str, float]:
+    """
+    Run func() calls times with up to concurrency calls in flight.
+    """
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def one() -> None:
+        async with semaphore:
+            await func()
+
+    started = time.perf_counter()
+    await asyncio.gather(*(one() for _ in range(calls)))
+    elapsed = time.perf_counter() - started
+    return {
+        "calls": calls,
+        "concurrency": concurrency,
+        "seconds": elapsed,
+        "calls_per_second": calls / elapsed if elapsed else 0.0,
+    }
+
+
+async def bench_client(kind: str, config_path: str, catalog_dir: str,
+                       args: argparse.Namespace) -> Dict[str, Any]:
+    """
+    Benchmark one client against the stub server.
+
+    Args:
+        kind: "lightweight" or "factory"
+        config_path: Path to the stub server config
+        catalog_dir: Empty directory for the tool catalog
+        args: Command line arguments
+
+    Returns:
+        The client's metrics
+    """
+    results: Dict[str, Any] = {}
+    catalog = ToolCatalog(catalog_dir)
+
+    # Cold start: no catalog, full handshake and tool discovery
+    client = make_client(kind, config_path, catalog)
+    started = time.perf_counter()
+    tools = await client.start()
+    results["startup_cold_ms"] = (time.perf_counter() - started) * 1000
+    results["tools"] = len(tools)
+    try:
+        by_name = {tool.name: tool for tool in tools}
+        echo, payload = by_name["echo"].function, by_name["payload"].function
+        session = client.servers[0].session
+
+        results["list_tools"] = percentiles(
+            await timed(lambda: list_all_tools(session), args.iterations)
+        )
+        results["tool_call"] = percentiles(
+            await timed(lambda: echo(text="hello"), args.iterations)
+        )
+        results["payload_call"] = percentiles(
+            await timed(lambda: payload(), args.iterations)
+        )
+        # Distinct arguments, so concurrent calls are not coalesced into one
+        counter = itertools.count()
+        results["tool_call_throughput"] = await throughput(
+            lambda: echo(text=f"hello {next(counter)}"), args.iterations, args.concurrency
+        )
+        collapsed = client.coalescing_stats()["bench"]["collapsed"]
+        results["identical_call_throughput"] = await throughput(
+            lambda: echo(text="hello"), args.iterations, args.concurrency
+        )
+        results["identical_call_throughput"]["collapsed"] = (
+            client.coalescing_stats()["bench"]["collapsed"] - collapsed
+        )
+
+        agent = Agent(tool_calling_model(), tools=tools)
+        results["agent_run"] = percentiles(
+            await timed(lambda: agent.run("benchmark"), args.agent_runs)
+        )
+    finally:
+        started = time.perf_counter()
+        await client.cleanup()
+        results["cleanup_ms"] = (time.perf_counter() - started) * 1000
+
+    # Warm start: tools come from the catalog written by the cold start
+    client = make_client(kind, config_path, catalog)
+    try:
+        started = time.perf_counter()
+        tools = await client.start()
+        results["startup_warm_ms"] = (time.perf_counter() - started) * 1000
+        echo = next(tool.function for tool in tools if tool.name == "echo")
+        await echo(text="hello")
+        results["startup_warm_first_call_ms"] = (time.perf_counter() - started) * 1000
+    finally:
+        await client.cleanup()
+
+    return results
+
+
+async def bench_model_pool(args: argparse.Namespace) -> Dict[str, Any]:
+    """
+    Compare agent runs that build a new model per run with runs sharing a ModelPool model.
+
+    Returns:
+        Latency and connections opened for each variant
+    """
+    from openai import AsyncOpenAI
+
+    results: Dict[str, Any] = {}
+    stub = OpenAIStub(latency_ms=args.latency_ms)
+    await stub.start()
+    try:
+        async def fresh() -> None:
+            client = AsyncOpenAI(base_url=stub.base_url, api_key="stub")
+            try:
+                await Agent(openai_model("stub", client)).run("benchmark")
+            finally:
+                await client.close()
+
+        pool = ModelPool()
+        agent = Agent(pool.model("stub", base_url=stub.base_url, api_key="stub"))
+
+        for name, run_once in (("fresh", fresh), ("pooled", lambda: agent.run("benchmark"))):
+            connections = stub.connections
+            results[name] = percentiles(await timed(run_once, args.agent_runs))
+            results[name]["connections"] = stub.connections - connections
+        await pool.aclose()
+    finally:
+        await stub.stop()
+    return results
+
+
+def git_commit() -> Optional[str]:
+    """
+    Get the current commit, if the benchmarks run from a git checkout.
+    """
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "HEAD"], cwd=ROOT_DIR, capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def flatten(results: Dict[str, Any], prefix: str = "") -> Dict[str, float]:
+    """
+    Flatten nested numeric results into dotted metric names.
+    """
+    flat = {}
+    for key, value in results.items():
+        name = f"{prefix}{key}"
+        if isinstance(value, dict):
+            flat.update(flatten(value, f"{name}."))
+        elif isinstance(value, (int, float)) and not isinstance(value, bool):
+            flat[name] = value
+    return flat
+
+
+def print_comparison(baseline: Dict[str, Any], current: Dict[str, Any]) -> None:
+    """
+    Print every metric present in both runs with its relative change.
+    """
+    old, new = flatten(baseline["results"]), flatten(current["results"])
+    print(f"{'metric':<60} {'baseline':>12} {'current':>12} {'change':>8}")
+    for name in sorted(old.keys() & new.keys()):
+        change = (new[name] - old[name]) / old[name] * 100 if old[name] else 0.0
+        print(f"{name:<60} {old[name]:>12.3f} {new[name]:>12.3f} {change:>+7.1f}%")
+
+
+async def run(args: argparse.Namespace) -> Dict[str, Any]:
+    """
+    Run the benchmarks for the selected clients.
+    """
+    results: Dict[str, Any] = {}
+    with tempfile.TemporaryDirectory(prefix="mcp-bench-") as directory:
+        config_path = write_config(directory, args)
+        for kind in args.clients:
+            catalog_dir = os.path.join(directory, f"catalog-{kind}")
+            results[kind] = await bench_client(kind, config_path, catalog_dir, args)
+    results["model_pool"] = await bench_model_pool(args)
+    results["import_ms"] = {
+        module: result["median_ms"] for module, result in measure_imports(runs=3).items()
+    }
+
+    # ru_maxrss is in kilobytes on Linux and bytes on macOS
+    rss_scale = 1 if sys.platform == "darwin" else 1024
+    results["peak_rss_bytes"] = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * rss_scale
+    results["peak_server_rss_bytes"] = (
+        resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss * rss_scale
+    )
+
+    return {
+        "meta": {
+            "commit": git_commit(),
+            "timestamp": time.time(),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "params": {
+                "latency_ms": args.latency_ms,
+                "payload_bytes": args.payload_bytes,
+                "extra_tools": args.extra_tools,
+                "iterations": args.iterations,
+                "concurrency": args.concurrency,
+                "agent_runs": args.agent_runs,
+            },
+        },
+        "results": results,
+    }
+
+
+def main() -> None:
+    """
+    Main entry point for the benchmarks.
+    """
+    parser = argparse.ArgumentParser(description="Offline MCP client benchmarks")
+    parser.add_argument("--clients", nargs="+", choices=CLIENTS, default=list(CLIENTS),
+                        help="Clients to benchmark")
+    parser.add_argument("--latency-ms", type=float, default=0.0, help="Stub server latency per call")
+    parser.add_argument("--payload-bytes", type=int, default=1024, help="Stub server payload size")
+    parser.add_argument("--extra-tools", type=int, default=20, help="Extra tools the stub advertises")
+    parser.add_argument("--iterations", type=int, default=200, help="Samples per latency metric")
+    parser.add_argument("--concurrency", type=int, default=16, help="Calls in flight for throughput")
+    parser.add_argument("--agent-runs", type=int, default=50, help="Agent runs to time")
+    parser.add_argument("--output", help="Write the JSON results to this file instead of stdout")
+    parser.add_argument("--compare", help="Baseline JSON file to compare the results against")
+    args = parser.parse_args()
+
+    report = asyncio.run(run(args))
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(report, f, indent=2)
+    else:
+        print(json.dumps(report, indent=2))
+
+    if args.compare:
+        with open(args.compare, "r") as f:
+            print_comparison(json.load(f), report)
+
+
+if __name__ == "__main__":
+    main()
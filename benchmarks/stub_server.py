@@ -0,0 +1,100 @@
+"""
+Stdio MCP server with predictable cost, used by the benchmarks in place of real servers.
+
+    python benchmarks/stub_server.py --latency-ms 5 --payload-bytes 4096 --extra-tools 20
+
+Tools:
+    echo: returns its "text" argument after the configured latency
+    payload: returns a text payload of the configured size (or "size" bytes if given)
+    (both are annotated as read-only, so the clients coalesce identical concurrent calls)
+    tool_<n>: extra no-op tools that only make list_tools responses larger
+"""
+import asyncio
+import argparse
+
+import mcp.types as types
+from mcp.server.lowlevel import Server
+from mcp.server.stdio import stdio_server
+
+
+def build_server(latency_ms: float, payload_bytes: int, extra_tools: int) -> Server:
+    """
+    Build the stub server.
+
+    Args:
+        latency_ms: Delay added to every tool call
+        payload_bytes: Default size of the payload tool's result
+        extra_tools: Number of additional no-op tools to advertise
+
+    Returns:
+        The configured low-level MCP server
+    """
+    server = Server("benchmark-stub", version="1.0.0")
+    tools = [
+        types.Tool(
+            name="echo",
+            description="Return the given text.",
+            inputSchema={
+                "type": "object",
+                "properties": {"text": {"type": "string", "description": "Text to return"}},
+                "required": ["text"],
+            },
+            annotations=types.ToolAnnotations(readOnlyHint=True),
+        ),
+        types.Tool(
+            name="payload",
+            description="Return a text payload of a given size.",
+            inputSchema={
+                "type": "object",
+                "properties": {"size": {"type": "integer", "description": "Payload size in bytes"}},
+            },
+            annotations=types.ToolAnnotations(readOnlyHint=True),
+        ),
+    ] + [
+        types.Tool(
+            name=f"tool_{n}",
+            description=f"No-op tool number {n}, advertised to make the catalog larger.",
+            inputSchema={
+                "type": "object",
+                "properties": {"value": {"type": "string", "description": "Ignored"}},
+            },
+        )
+        for n in range(extra_tools)
+    ]
+
+    @server.list_tools()
+    async def list_tools() -> list[types.Tool]:
+        return tools
+
+    @server.call_tool()
+    async def call_tool(name: str, arguments: dict) -> list[types.TextContent]:
+        if latency_ms:
+            await asyncio.sleep(latency_ms / 1000)
+        if name == "echo":
+            text = str(arguments.get("text", ""))
+        elif name == "payload":
+            text = "x" * int(arguments.get("size", payload_bytes))
+        else:
+            text = ""
+        return [types.TextContent(type="text", text=text)]
+
+    return server
+
+
+async def main() -> None:
+    """
+    Main entry point for the stub server.
+    """
+    parser = argparse.ArgumentParser(description="Benchmark stub MCP server")
+    parser.add_argument("--latency-ms", type=float, default=0.0, help="Delay added to every tool call")
+    parser.add_argument("--payload-bytes", type=int, default=1024, help="Default payload tool result size")
+    parser.add_argument("--extra-tools", type=int, default=0, help="Number of extra no-op tools")
+    args = parser.parse_args()
+
+    server = build_server(args.latency_ms, args.payload_bytes, args.extra_tools)
+    async with stdio_server() as (read_stream, write_stream):
+        await server.run(read_stream, write_stream, server.create_initialization_options())
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
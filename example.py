@@ -2,6 +2,7 @@
 Example script demonstrating how to use the MCP integration.
 """
 import asyncio
+import logging
 import os
 import argparse
 from dotenv import load_dotenv
@@ -13,9 +14,33 @@ load_dotenv()
 from agents.mcp.agent_factory import (
     get_general_assistant_agent, 
     get_tool_listing_agent,
-    run_with_cleanup
+    run_agent_stream,
+    AGENT_CACHE
 )
 
+async def stream_with_cleanup(client, agent, prompt):
+    """
+    Stream an agent's response to the console, then release the agent's MCP client.
+    """
+    try:
+        print("\nAgent response:")
+        print("-" * 80)
+        streamed_text = False
+        async for event in run_agent_stream(agent, prompt):
+            if event["type"] == "text":
+                print(event["delta"], end="", flush=True)
+                streamed_text = True
+            elif event["type"] == "tool_call":
+                print(f"\n[Tool] {event['tool_name']}({event['args']})", flush=True)
+            elif event["type"] == "final" and not streamed_text:
+                print(event["text"], end="")
+            elif event["type"] == "error":
+                print(event["text"], end="")
+        print()
+        print("-" * 80)
+    finally:
+        await client.cleanup()
+
 async def run_tool_listing_agent():
     """
     Run an agent that lists and demonstrates available tools.
@@ -26,20 +51,14 @@ async def run_tool_listing_agent():
         # Create a tool listing agent
         client, agent = await get_tool_listing_agent()
         
-        # Run the agent with a prompt to list tools
+        # Stream the agent's answer to a prompt to list tools
         print("\nAsking agent to list available tools...\n")
-        result = await run_with_cleanup(
-            client, 
-            agent, 
+        await stream_with_cleanup(
+            client,
+            agent,
             "Please list all the tools you have available and explain what each one does."
         )
         
-        # Print the result
-        print("\nAgent response:")
-        print("-" * 80)
-        print(result["text"])
-        print("-" * 80)
-        
     except Exception as e:
         print(f"Error: {e}")
 
@@ -53,20 +72,14 @@ async def run_general_assistant():
         # Create an MCP-enabled agent
         client, agent = await get_general_assistant_agent()
         
-        # Run the agent with a prompt
+        # Stream the agent's answer to a prompt
         print("\nSending prompt to agent...\n")
-        result = await run_with_cleanup(
-            client, 
-            agent, 
+        await stream_with_cleanup(
+            client,
+            agent,
             "What's the current date and time? Can you also tell me about the Model Context Protocol?"
         )
         
-        # Print the result
-        print("\nAgent response:")
-        print("-" * 80)
-        print(result["text"])
-        print("-" * 80)
-        
     except Exception as e:
         print(f"Error: {e}")
 
@@ -78,19 +91,34 @@ async def main():
     parser = argparse.ArgumentParser(description="MCP Integration Example")
     parser.add_argument("--mode", choices=["general", "tools"], default="general",
                         help="Mode to run: 'general' for general assistant, 'tools' to list tools")
+    parser.add_argument("--replay", choices=["off", "record", "replay", "auto"],
+                        help="Record model responses, or replay recorded ones without calling the API")
     args = parser.parse_args()
     
-    # Check if OpenAI API key is set
-    if not os.getenv("OPENAI_API_KEY"):
+    logging.basicConfig(
+        level=logging.INFO,
+        format="%(asctime)s - %(name)s - %(levelname)s - %(message)s"
+    )
+    
+    # Record or replay model responses (read by the agent factory through MODEL_REPLAY_MODE)
+    if args.replay:
+        os.environ["MODEL_REPLAY_MODE"] = args.replay
+    
+    # Check if OpenAI API key is set (replaying recorded responses does not need one)
+    if not os.getenv("OPENAI_API_KEY") and args.replay != "replay":
         print("Error: OPENAI_API_KEY environment variable is not set.")
         print("Please set it with: export OPENAI_API_KEY=your_api_key_here")
         return
 
     # Run the selected mode
-    if args.mode == "tools":
-        await run_tool_listing_agent()
-    else:
-        await run_general_assistant()
+    try:
+        if args.mode == "tools":
+            await run_tool_listing_agent()
+        else:
+            await run_general_assistant()
+    finally:
+        # Stop the MCP servers kept running by the agent cache
+        await AGENT_CACHE.close()
 
 if __name__ == "__main__":
     # Run the main function
@@ -4,7 +4,24 @@ Simple example script using the lightweight agent approach.
 """
 import asyncio
 import argparse
+import json
+import logging
+import os
+import time
 from agents.lightweight_agent import create_agent, run_interactive_session
+from agents.mcp.scheduler import call_context
+
+def get_output(result):
+    """
+    Get the output from an agent run result, handling different result formats.
+    """
+    if hasattr(result, 'final_output'):
+        return result.final_output
+    elif hasattr(result, 'output'):
+        return result.output
+    elif hasattr(result, 'data'):
+        return result.data
+    return result
 
 async def run_single_query(query, config_path=None, model_name=None):
     """
@@ -23,16 +40,7 @@ async def run_single_query(query, config_path=None, model_name=None):
     try:
         print(f"Running query: {query}")
         result = await agent.run(query)
-        
-        # Handle different result formats
-        if hasattr(result, 'final_output'):
-            output = result.final_output
-        elif hasattr(result, 'output'):
-            output = result.output
-        elif hasattr(result, 'data'):
-            output = result.data
-        else:
-            output = result
+        output = get_output(result)
             
         print("\nResult:")
         print("-" * 80)
@@ -43,6 +51,102 @@ async def run_single_query(query, config_path=None, model_name=None):
     finally:
         await client.cleanup()
 
+def load_batch(batch_path):
+    """
+    Load queries from a JSONL file.
+    
+    Each line is either a JSON string or an object with a "query" field and an optional "id".
+    
+    Args:
+        batch_path: Path to the JSONL file
+        
+    Returns:
+        A list of (id, query) tuples
+    """
+    queries = []
+    with open(batch_path, "r") as f:
+        for line_number, line in enumerate(f, start=1):
+            if not line.strip():
+                continue
+            item = json.loads(line)
+            if isinstance(item, str):
+                queries.append((line_number, item))
+            else:
+                queries.append((item.get("id", line_number), item["query"]))
+    return queries
+
+async def run_batch_query(agent, semaphore, query_id, query):
+    """
+    Run one batch query and record its output, latency, token usage or error.
+    """
+    async with semaphore:
+        record = {"id": query_id, "query": query}
+        started = time.perf_counter()
+        try:
+            # Tag tool calls so concurrent queries share MCP servers fairly
+            with call_context(owner=query_id):
+                result = await agent.run(query)
+            record["output"] = get_output(result)
+            usage = result.usage()
+            record["usage"] = {
+                "requests": usage.requests,
+                "request_tokens": usage.request_tokens,
+                "response_tokens": usage.response_tokens,
+                "total_tokens": usage.total_tokens,
+            }
+        except Exception as e:
+            record["error"] = f"{type(e).__name__}: {e}"
+        record["latency"] = time.perf_counter() - started
+        return record
+
+async def run_batch(batch_path, output_path, concurrency=8, config_path=None,
+                    model_name=None, system_prompt=None):
+    """
+    Run every query in a JSONL file concurrently against one agent and MCP client.
+    
+    Results are appended to the output JSONL file as each query finishes.
+    
+    Args:
+        batch_path: Path to the input JSONL file
+        output_path: Path to the output JSONL file
+        concurrency: Maximum number of queries running at once
+        config_path: Optional path to MCP config file
+        model_name: Optional model name override
+        system_prompt: Optional system prompt for the agent
+    """
+    queries = load_batch(batch_path)
+    client, agent = await create_agent(
+        config_path=config_path,
+        model_name=model_name,
+        system_prompt=system_prompt
+    )
+    
+    try:
+        print(f"Running {len(queries)} queries with concurrency {concurrency}")
+        semaphore = asyncio.Semaphore(concurrency)
+        started = time.perf_counter()
+        latencies = []
+        errors = 0
+        
+        with open(output_path, "w") as out:
+            runs = [run_batch_query(agent, semaphore, query_id, query) for query_id, query in queries]
+            for run in asyncio.as_completed(runs):
+                record = await run
+                out.write(json.dumps(record, default=str) + "\n")
+                out.flush()
+                latencies.append(record["latency"])
+                errors += "error" in record
+        
+        elapsed = time.perf_counter() - started
+        latencies.sort()
+        print(f"Finished {len(latencies)} queries ({errors} errors) in {elapsed:.1f}s")
+        if latencies:
+            print(f"Median latency {latencies[len(latencies) // 2]:.2f}s, "
+                  f"max {latencies[-1]:.2f}s")
+        print(f"Results written to {output_path}")
+    finally:
+        await client.cleanup()
+
 async def main():
     """
     Main entry point for the script.
@@ -52,10 +156,33 @@ async def main():
     parser.add_argument("--model", help="Model name to use")
     parser.add_argument("--query", help="Run a single query instead of interactive mode")
     parser.add_argument("--system-prompt", help="System prompt for the agent")
+    parser.add_argument("--batch", help="Run the queries in a JSONL file concurrently")
+    parser.add_argument("--output", help="Output JSONL file for --batch (defaults to <batch>.results.jsonl)")
+    parser.add_argument("--concurrency", type=int, default=8, help="Maximum concurrent queries for --batch")
+    parser.add_argument("--replay", choices=["off", "record", "replay", "auto"],
+                        help="Record model responses, or replay recorded ones without calling the API")
     args = parser.parse_args()
     
+    logging.basicConfig(
+        level=logging.ERROR, format="%(asctime)s - %(levelname)s - %(message)s"
+    )
+    
+    # Record or replay model responses (read by get_model through MODEL_REPLAY_MODE)
+    if args.replay:
+        os.environ["MODEL_REPLAY_MODE"] = args.replay
+    
+    # If a batch file is provided, run it and exit
+    if args.batch:
+        await run_batch(
+            args.batch,
+            args.output or f"{args.batch}.results.jsonl",
+            concurrency=args.concurrency,
+            config_path=args.config,
+            model_name=args.model,
+            system_prompt=args.system_prompt
+        )
     # If a query is provided, run it and exit
-    if args.query:
+    elif args.query:
         await run_single_query(
             args.query, 
             config_path=args.config,
@@ -0,0 +1,68 @@
+"""
+Shared fixtures: MCP configs that run the benchmark stub server, and an isolated environment.
+"""
+import sys
+import json
+import pathlib
+
+import pytest
+
+ROOT_DIR = pathlib.Path(__file__).parent.parent.resolve()
+sys.path.insert(0, str(ROOT_DIR))
+
+STUB_SERVER = ROOT_DIR / "benchmarks" / "stub_server.py"
+
+
+@pytest.fixture(autouse=True)
+def isolated_env(tmp_path, monkeypatch):
+    """
+    Keep catalogs and recordings out of ~/.cache and never attach to a running daemon.
+    """
+    monkeypatch.setenv("MCP_CATALOG_DIR", str(tmp_path / "catalog"))
+    monkeypatch.setenv("MODEL_REPLAY_DIR", str(tmp_path / "replay"))
+    monkeypatch.delenv("MCP_DAEMON_SOCKET", raising=False)
+    monkeypatch.delenv("MODEL_REPLAY_MODE", raising=False)
+
+
+@pytest.fixture
+def write_config(tmp_path):
+    """
+    Write an MCP config with one stub server named "stub" and return its path.
+
+    Keyword arguments are added to the server's entry; latency_ms, payload_bytes and
+    extra_tools configure the stub itself.
+    """
+    def write(latency_ms: float = 0.0, payload_bytes: int = 1024, extra_tools: int = 0, **entry) -> str:
+        config = {
+            "mcpServers": {
+                "stub": {
+                    "command": sys.executable,
+                    "args": [str(STUB_SERVER), "--latency-ms", str(latency_ms),
+                             "--payload-bytes", str(payload_bytes), "--extra-tools", str(extra_tools)],
+                    **entry,
+                }
+            }
+        }
+        path = tmp_path / "mcp_config.json"
+        path.write_text(json.dumps(config))
+        return str(path)
+
+    return write
+
+
+@pytest.fixture(params=["lightweight", "factory"])
+def make_client(request):
+    """
+    Build either MCP client for a config path.
+    """
+    def make(config_path: str, **kwargs):
+        if request.param == "lightweight":
+            from agents.mcp_client import MCPClient
+            client = MCPClient(**kwargs)
+            client.load_servers(config_path)
+            return client
+        from agents.mcp.client import MCPClient
+        return MCPClient(config_path, **kwargs)
+
+    make.kind = request.param
+    return make
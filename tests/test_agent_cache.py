@@ -0,0 +1,129 @@
+"""
+Reuse of agents and MCP clients by the factory's AgentCache.
+"""
+import os
+import asyncio
+import threading
+
+import pytest
+
+from agents.mcp.agent_factory import AgentCache
+
+
+def test_agents_are_reused_within_a_loop(write_config, monkeypatch):
+    monkeypatch.setenv("OPENAI_API_KEY", "test")
+    config_path = write_config()
+
+    async def run():
+        cache = AgentCache(idle_timeout=300)
+        try:
+            first_lease, first_agent = await cache.acquire("Be brief.", config_path=config_path)
+            second_lease, second_agent = await cache.acquire("Be brief.", config_path=config_path)
+            assert second_agent is first_agent
+            assert second_lease.client is first_lease.client
+            _, other_agent = await cache.acquire("Be thorough.", config_path=config_path)
+            assert other_agent is not first_agent
+            assert list(cache.stats().values()) == [{"leases": 3, "agents": 2}]
+        finally:
+            await cache.close()
+
+    asyncio.run(run())
+
+
+def test_clients_of_a_previous_loop_are_not_reused(write_config, monkeypatch):
+    monkeypatch.setenv("OPENAI_API_KEY", "test")
+    config_path = write_config()
+    cache = AgentCache(idle_timeout=300)
+
+    async def first_run():
+        lease, agent = await cache.acquire("Be brief.", config_path=config_path)
+        await lease.cleanup()
+        return lease.client, agent
+
+    async def second_run():
+        lease, agent = await cache.acquire("Be brief.", config_path=config_path)
+        try:
+            result = await lease.client.servers[0].call_tool("echo", {"text": "new loop"})
+            return lease.client, agent, result
+        finally:
+            await cache.close()
+
+    old_client, old_agent = asyncio.run(first_run())
+    client, agent, result = asyncio.run(second_run())
+    assert client is not old_client
+    assert agent is not old_agent
+    assert result.content[0].text == "new loop"
+
+
+def process_exited(pid):
+    """
+    Check whether a process is gone or a zombie waiting to be reaped.
+    """
+    try:
+        with open(f"/proc/{pid}/stat") as f:
+            return f.read().rsplit(")", 1)[1].split()[0] == "Z"
+    except FileNotFoundError:
+        return True
+
+
+@pytest.mark.skipif(not os.path.isdir("/proc"), reason="reads process states from /proc")
+def test_servers_of_a_closed_loop_are_terminated(write_config, monkeypatch):
+    monkeypatch.setenv("OPENAI_API_KEY", "test")
+    config_path = write_config()
+    cache = AgentCache(idle_timeout=300)
+
+    async def first_run():
+        lease, _ = await cache.acquire("Be brief.", config_path=config_path)
+        await lease.cleanup()
+        return list(lease.client.servers[0]._pids)
+
+    # Closed without cancelling its tasks, so the servers never got to stop themselves
+    loop = asyncio.new_event_loop()
+    pids = loop.run_until_complete(first_run())
+    loop.close()
+    assert pids and not any(process_exited(pid) for pid in pids)
+
+    async def second_run():
+        try:
+            await cache.acquire("Be brief.", config_path=config_path)
+            for _ in range(50):
+                if all(process_exited(pid) for pid in pids):
+                    return True
+                await asyncio.sleep(0.1)
+            return False
+        finally:
+            await cache.close()
+
+    assert asyncio.run(second_run())
+
+
+def test_clients_of_a_running_loop_are_cleaned_up_on_it(write_config, monkeypatch):
+    monkeypatch.setenv("OPENAI_API_KEY", "test")
+    config_path = write_config()
+    cache = AgentCache(idle_timeout=300)
+    loop = asyncio.new_event_loop()
+    thread = threading.Thread(target=loop.run_forever, daemon=True)
+    thread.start()
+    try:
+        lease, _ = asyncio.run_coroutine_threadsafe(
+            cache.acquire("Be brief.", config_path=config_path), loop
+        ).result(30)
+        old_server = lease.client.servers[0]
+        assert old_server.is_running()
+
+        async def second_run():
+            try:
+                await cache.acquire("Be brief.", config_path=config_path)
+                for _ in range(50):
+                    if not old_server.is_running():
+                        return True
+                    await asyncio.sleep(0.1)
+                return False
+            finally:
+                await cache.close()
+
+        assert asyncio.run(second_run())
+    finally:
+        loop.call_soon_threadsafe(loop.stop)
+        thread.join(10)
+        loop.close()
@@ -0,0 +1,88 @@
+"""
+Caching the tools each server provides on disk.
+"""
+import json
+import asyncio
+import pathlib
+
+from mcp.types import ListToolsResult, Tool as MCPTool
+
+from agents.mcp.catalog import ToolCatalog, iter_tool_pages, list_all_tools
+
+CONFIG = {"command": "python", "args": ["server.py"], "env": {"TOKEN": "a"}, "max_in_flight": 2}
+
+
+def make_tool(name):
+    return MCPTool(name=name, description=f"The {name} tool", inputSchema={"type": "object"})
+
+
+def test_changing_how_a_server_is_launched_misses_the_catalog(tmp_path):
+    catalog = ToolCatalog(str(tmp_path))
+    catalog.store("files", CONFIG, [make_tool("read_file")], server_version="1.0")
+
+    assert [tool.name for tool in catalog.load("files", CONFIG)] == ["read_file"]
+    # Options that do not change the spawned process keep the entry
+    assert catalog.load("files", {**CONFIG, "max_in_flight": 8}) is not None
+    assert catalog.load("files", {**CONFIG, "command": "python3"}) is None
+    assert catalog.load("files", {**CONFIG, "args": ["server.py", "--verbose"]}) is None
+    assert catalog.load("files", {**CONFIG, "env": {"TOKEN": "b"}}) is None
+
+
+def test_version_checks_fall_back_to_discovery(tmp_path):
+    catalog = ToolCatalog(str(tmp_path))
+    assert catalog.cached_version(CONFIG) is None
+    catalog.store("files", CONFIG, [make_tool("read_file")], server_version="1.0")
+    assert catalog.cached_version(CONFIG) == "1.0"
+    assert catalog.load("files", CONFIG, server_version="1.0") is not None
+    assert catalog.load("files", CONFIG, server_version="2.0") is None
+
+    # An unreadable entry counts as no entry
+    catalog.path_for(CONFIG).write_text("{not json")
+    assert catalog.cached_version(CONFIG) is None
+    assert catalog.load("files", CONFIG) is None
+
+
+def test_tool_pages_follow_cursors():
+    class PagedSession:
+        def __init__(self, pages):
+            self.pages = pages
+            self.cursors = []
+
+        async def list_tools(self, cursor=None):
+            self.cursors.append(cursor)
+            index = int(cursor or 0)
+            next_cursor = str(index + 1) if index + 1 < len(self.pages) else None
+            return ListToolsResult(tools=self.pages[index], nextCursor=next_cursor)
+
+    async def collect(session):
+        return [[tool.name for tool in page] async for page in iter_tool_pages(session)]
+
+    session = PagedSession([[make_tool("a"), make_tool("b")], [make_tool("c")], []])
+    assert asyncio.run(collect(session)) == [["a", "b"], ["c"], []]
+    assert session.cursors == [None, "1", "2"]
+    names = [tool.name for tool in asyncio.run(list_all_tools(PagedSession([[make_tool("a")]])))]
+    assert names == ["a"]
+
+
+def test_clients_advertise_cached_tools_until_the_config_changes(write_config, make_client, tmp_path):
+    catalog = ToolCatalog(str(tmp_path / "catalog"))
+
+    async def start(config_path):
+        client = make_client(config_path, catalog=catalog)
+        try:
+            tools = await client.start()
+            return {tool.name for tool in tools}, client.servers[0].cached_tools is not None
+        finally:
+            await client.cleanup()
+
+    config_path = write_config()
+    names, cached = asyncio.run(start(config_path))
+    assert {"echo", "payload"} <= names and not cached
+    config = json.loads(pathlib.Path(config_path).read_text())["mcpServers"]["stub"]
+    entry = json.loads(catalog.path_for(config).read_text())
+    assert {tool["name"] for tool in entry["tools"]} == names
+
+    assert asyncio.run(start(config_path)) == (names, True)
+    # More tools means other arguments, so the old entry no longer applies
+    names, cached = asyncio.run(start(write_config(extra_tools=2)))
+    assert {"tool_0", "tool_1"} <= names and not cached
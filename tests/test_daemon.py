@@ -0,0 +1,164 @@
+"""
+Attaching to the MCP daemon and calling tools through it.
+"""
+import os
+import stat
+import asyncio
+
+import pytest
+
+from agents.mcp import daemon as daemon_module
+from agents.mcp.daemon import DaemonError, MCPDaemon, connect_to_daemon
+
+
+def test_clients_call_tools_through_the_daemon(write_config, make_client, tmp_path, monkeypatch):
+    config_path = write_config()
+    socket_path = str(tmp_path / "daemon.sock")
+
+    async def run():
+        daemon = MCPDaemon(config_path, socket_path)
+        await daemon.start()
+        monkeypatch.setenv("MCP_DAEMON_SOCKET", socket_path)
+        client = make_client(config_path)
+        try:
+            tools = await client.start()
+            assert client.daemon is not None
+            assert {"echo", "payload"} <= {tool.name for tool in tools}
+            server = client.servers[0]
+            assert not server.is_running()
+            result = await server.call_tool("echo", {"text": "through the daemon"})
+            assert result.content[0].text == "through the daemon"
+        finally:
+            await client.cleanup()
+            await daemon.stop()
+
+    asyncio.run(run())
+
+
+def test_requests_fail_once_the_daemon_closes_the_connection(tmp_path):
+    socket_path = str(tmp_path / "closing.sock")
+
+    async def close_after_first_request(reader, writer):
+        await reader.readline()
+        writer.close()
+
+    async def run():
+        server = await asyncio.start_unix_server(close_after_first_request, path=socket_path)
+        connection = await connect_to_daemon(socket_path)
+        try:
+            with pytest.raises(DaemonError):
+                await asyncio.wait_for(connection.request("list_servers"), 5)
+            with pytest.raises(DaemonError, match="Not connected"):
+                await asyncio.wait_for(connection.request("list_servers"), 5)
+        finally:
+            await connection.close()
+            server.close()
+
+    asyncio.run(run())
+
+
+def test_daemon_calls_go_through_its_servers(write_config, tmp_path, monkeypatch):
+    config_path = write_config(cache={"echo": {"ttl": 60}})
+    first_socket = str(tmp_path / "first.sock")
+    second_socket = str(tmp_path / "second.sock")
+
+    async def run():
+        first = MCPDaemon(config_path, first_socket)
+        await first.start()
+        # A daemon started while another is reachable still owns its servers
+        monkeypatch.setenv("MCP_DAEMON_SOCKET", first_socket)
+        second = MCPDaemon(config_path, second_socket)
+        await second.start()
+        connection = await connect_to_daemon(second_socket)
+        try:
+            assert second.client.daemon is None
+            assert second.servers["stub"].is_running()
+            params = {"server": "stub", "name": "echo", "arguments": {"text": "cached"}}
+            for _ in range(2):
+                result = await connection.request("call_tool", params)
+                assert result["content"][0]["text"] == "cached"
+            assert second.client.cache_stats()["hits"] == 1
+        finally:
+            await connection.close()
+            await second.stop()
+            await first.stop()
+
+    asyncio.run(run())
+
+
+def test_messages_over_the_stream_limit_are_answered_with_errors(write_config, tmp_path, monkeypatch):
+    monkeypatch.setattr(daemon_module, "STREAM_LIMIT", 4096)
+    config_path = write_config()
+    socket_path = str(tmp_path / "daemon.sock")
+
+    async def run():
+        daemon = MCPDaemon(config_path, socket_path)
+        await daemon.start()
+        connection = await connect_to_daemon(socket_path)
+        try:
+            with pytest.raises(DaemonError, match="Request exceeds"):
+                await asyncio.wait_for(connection.request(
+                    "call_tool", {"server": "stub", "name": "echo", "arguments": {"text": "x" * 10000}}
+                ), 5)
+            with pytest.raises(DaemonError, match="Response exceeds"):
+                await asyncio.wait_for(connection.request(
+                    "call_tool", {"server": "stub", "name": "payload", "arguments": {"size": 10000}}
+                ), 5)
+            # Neither side dropped the connection
+            result = await asyncio.wait_for(connection.request(
+                "call_tool", {"server": "stub", "name": "echo", "arguments": {"text": "still here"}}
+            ), 5)
+            assert result["content"][0]["text"] == "still here"
+        finally:
+            await connection.close()
+            await daemon.stop()
+
+    asyncio.run(run())
+
+
+def test_attached_servers_start_locally_when_the_daemon_goes_away(write_config, make_client,
+                                                                  tmp_path, monkeypatch):
+    config_path = write_config(reconnect_initial_delay=0.05)
+    socket_path = str(tmp_path / "daemon.sock")
+
+    async def run():
+        daemon = MCPDaemon(config_path, socket_path)
+        await daemon.start()
+        monkeypatch.setenv("MCP_DAEMON_SOCKET", socket_path)
+        client = make_client(config_path)
+        try:
+            await client.start()
+            server = client.servers[0]
+            assert client.daemon is not None and not server.is_running()
+            await daemon.stop()
+
+            with pytest.raises(ConnectionError):
+                await asyncio.wait_for(server.call_tool("echo", {"text": "lost"}), 5)
+            await asyncio.wait_for(server._reconnect_task, 10)
+            result = await server.call_tool("echo", {"text": "local"})
+            assert result.content[0].text == "local"
+            assert server.is_running()
+        finally:
+            await client.cleanup()
+            await daemon.stop()
+
+    asyncio.run(run())
+
+
+def test_daemon_socket_is_created_owner_only(write_config, tmp_path):
+    socket_path = str(tmp_path / "daemon.sock")
+
+    async def run():
+        daemon = MCPDaemon(write_config(), socket_path)
+        await daemon.start()
+        try:
+            return stat.S_IMODE(os.stat(socket_path).st_mode)
+        finally:
+            await daemon.stop()
+
+    umask = os.umask(0o022)
+    try:
+        assert asyncio.run(run()) == 0o600
+        assert os.umask(0o022) == 0o022
+    finally:
+        os.umask(umask)
@@ -0,0 +1,85 @@
+"""
+Health checks, fail-fast calls and reconnects of crashed servers.
+"""
+import os
+import signal
+import asyncio
+import pathlib
+
+import pytest
+
+pytestmark = pytest.mark.skipif(not os.path.isdir("/proc"), reason="finds the server process in /proc")
+
+
+def stub_server_pids():
+    """
+    Get the pids of the stub servers started by this process.
+    """
+    pids = []
+    for proc in pathlib.Path("/proc").iterdir():
+        try:
+            stat = (proc / "stat").read_text()
+            cmdline = (proc / "cmdline").read_bytes()
+        except (OSError, ValueError):
+            continue
+        ppid = int(stat.rsplit(")", 1)[1].split()[1])
+        if ppid == os.getpid() and b"stub_server.py" in cmdline:
+            pids.append(int(proc.name))
+    return pids
+
+
+def test_crashed_server_fails_calls_and_reconnects(write_config, make_client):
+    config_path = write_config(latency_ms=2000, reconnect_initial_delay=0.05, reconnect_max_delay=0.1)
+
+    async def run():
+        client = make_client(config_path)
+        try:
+            await client.start(health_interval=0.2)
+            server = client.servers[0]
+            assert client.server_health()["stub"]["healthy"]
+
+            slow_call = asyncio.create_task(server.call_tool("echo", {"text": "lost"}))
+            await asyncio.sleep(0.3)
+            for pid in stub_server_pids():
+                os.kill(pid, signal.SIGKILL)
+
+            # The in-flight call fails once the health check notices, not after its latency
+            with pytest.raises(ConnectionError):
+                await asyncio.wait_for(slow_call, 1.5)
+            health = client.server_health()["stub"]
+            assert not health["healthy"]
+            assert health["last_error"]
+
+            for _ in range(100):
+                if server.is_running() and not server.is_reconnecting():
+                    break
+                await asyncio.sleep(0.1)
+            health = client.server_health()["stub"]
+            assert health["healthy"] and health["running"]
+            assert health["reconnect_attempts"] >= 1
+
+            result = await server.call_tool("echo", {"text": "back"})
+            assert result.content[0].text == "back"
+        finally:
+            await client.cleanup()
+
+    asyncio.run(run())
+
+
+def test_calls_fail_fast_while_reconnecting(write_config, make_client):
+    async def run():
+        client = make_client(write_config(reconnect_initial_delay=0.05))
+        try:
+            await client.start()
+            server = client.servers[0]
+            server.mark_down(ConnectionError("simulated"))
+            with pytest.raises(ConnectionError, match="reconnecting"):
+                await server.call_tool("echo", {"text": "rejected"})
+            await asyncio.wait_for(server._reconnect_task, 10)
+            assert client.server_health()["stub"]["healthy"]
+            result = await server.call_tool("echo", {"text": "accepted"})
+            assert result.content[0].text == "accepted"
+        finally:
+            await client.cleanup()
+
+    asyncio.run(run())
@@ -0,0 +1,100 @@
+"""
+Token-budgeted conversation history.
+"""
+import asyncio
+
+from pydantic_ai.messages import (
+    ModelRequest,
+    ModelResponse,
+    SystemPromptPart,
+    TextPart,
+    ToolCallPart,
+    ToolReturnPart,
+    UserPromptPart,
+)
+
+from agents.history import ELIDED_RESULT, ConversationHistory
+
+
+def text_turn(n, words=50):
+    return [
+        ModelRequest(parts=[UserPromptPart(f"Question {n}: " + "word " * words)]),
+        ModelResponse(parts=[TextPart(f"Answer {n}: " + "word " * words)]),
+    ]
+
+
+def tool_turn(n, result_words=400):
+    return [
+        ModelRequest(parts=[UserPromptPart(f"Fetch page {n}")]),
+        ModelResponse(parts=[ToolCallPart("fetch", {"url": f"https://example.com/{n}"}, tool_call_id=f"call-{n}")]),
+        ModelRequest(parts=[ToolReturnPart("fetch", "page " * result_words, tool_call_id=f"call-{n}")]),
+        ModelResponse(parts=[TextPart(f"Page {n} is about words.")]),
+    ]
+
+
+def tool_returns(history):
+    return [part for message in history.messages for part in message.parts
+            if isinstance(part, ToolReturnPart)]
+
+
+def test_history_stays_within_its_budget():
+    async def run():
+        history = ConversationHistory(max_tokens=600, keep_recent_turns=2, max_summary_tokens=150)
+        for n in range(20):
+            await history.add(text_turn(n))
+            assert history.tokens <= history.max_tokens
+        return history
+
+    history = asyncio.run(run())
+    assert history.compactions > 0
+    assert "Question 17" in history.summary and "Question 0:" not in history.summary
+    # The most recent turns are kept verbatim
+    assert [message.parts[0].content for message in history.messages[-4:]] == [
+        part.content for turn in (text_turn(18), text_turn(19)) for message in turn for part in message.parts
+    ]
+
+
+def test_old_tool_results_are_elided_before_turns_are_summarized():
+    async def run():
+        history = ConversationHistory(max_tokens=900, keep_recent_turns=1)
+        await history.add(tool_turn(1))
+        await history.add(tool_turn(2))
+        await history.add(tool_turn(3))
+        return history
+
+    history = asyncio.run(run())
+    returns = tool_returns(history)
+    assert [part.content for part in returns[:-1]] == [ELIDED_RESULT] * (len(returns) - 1)
+    assert returns[-1].content != ELIDED_RESULT
+    # Every tool call still has its result
+    calls = [part for message in history.messages for part in message.parts
+             if isinstance(part, ToolCallPart)]
+    assert [call.tool_call_id for call in calls] == [part.tool_call_id for part in returns]
+    assert history.summary == ""
+
+
+def test_system_prompt_survives_compaction():
+    async def run():
+        history = ConversationHistory(max_tokens=400, keep_recent_turns=1)
+        first = text_turn(0)
+        first[0] = ModelRequest(parts=[SystemPromptPart("You are terse."), *first[0].parts])
+        await history.add(first)
+        for n in range(1, 10):
+            await history.add(text_turn(n))
+        return history
+
+    history = asyncio.run(run())
+    assert history.summary
+    head = history.messages[0]
+    assert isinstance(head.parts[0], SystemPromptPart)
+    assert head.parts[0].content == "You are terse."
+
+
+def test_compactions_count_only_when_something_was_removed():
+    async def run():
+        history = ConversationHistory(max_tokens=10000)
+        await history.add(text_turn(0))
+        await history.compact()
+        return history
+
+    assert asyncio.run(run()).compactions == 0
@@ -0,0 +1,12 @@
+"""
+Heavy dependencies stay out of modules that are imported before any work is done.
+"""
+import pytest
+
+from benchmarks.import_time import BUDGETS, check, measure
+
+
+@pytest.mark.parametrize("module", sorted(BUDGETS))
+def test_module_leaves_heavy_packages_to_first_use(module):
+    # Timing budgets depend on the machine; only the forbidden imports are checked here
+    assert check(measure([module], runs=1), budget_scale=1000) == []
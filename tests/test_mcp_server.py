@@ -0,0 +1,45 @@
+"""
+The server lifecycle shared by both clients: restarts and idle reaping.
+"""
+import asyncio
+
+
+def test_restarted_server_is_reported_healthy(write_config, make_client):
+    async def run():
+        client = make_client(write_config())
+        try:
+            await client.start()
+            server = client.servers[0]
+            server.healthy = False
+            server.last_error = "ConnectionError('simulated')"
+            await server.cleanup()
+            await server.ensure_started()
+            health = client.server_health()["stub"]
+            assert health["healthy"] and health["running"]
+            assert health["last_error"] is None
+        finally:
+            await client.cleanup()
+
+    asyncio.run(run())
+
+
+def test_idle_servers_are_reaped_and_restarted_on_their_next_call(write_config, make_client):
+    async def run():
+        client = make_client(write_config())
+        try:
+            await client.start(idle_timeout=0.2)
+            server = client.servers[0]
+            await server.call_tool("echo", {"text": "first"})
+            for _ in range(50):
+                if not server.is_running():
+                    break
+                await asyncio.sleep(0.1)
+            assert not server.is_running()
+
+            result = await server.call_tool("echo", {"text": "again"})
+            assert result.content[0].text == "again"
+            assert server.is_running()
+        finally:
+            await client.cleanup()
+
+    asyncio.run(run())
@@ -0,0 +1,156 @@
+"""
+Tool call and model request metrics, and their Prometheus and JSON output.
+"""
+import json
+import asyncio
+from types import SimpleNamespace
+
+import pytest
+from pydantic_ai import Agent
+from pydantic_ai.messages import ModelMessage, ModelResponse, TextPart
+from pydantic_ai.models.function import AgentInfo, FunctionModel
+
+from agents.mcp.metrics import MetricsRegistry
+from agents.mcp.metrics_model import MetricsModel
+
+
+def text_result(text, error=False):
+    return SimpleNamespace(content=[SimpleNamespace(text=text)], isError=error)
+
+
+def series(registry, kind, name):
+    return {tuple(sorted(entry["labels"].items())): entry for entry in registry.to_json()[kind].get(name, [])}
+
+
+def test_tool_calls_render_as_prometheus_text():
+    registry = MetricsRegistry(buckets=(0.1, 1.0))
+    registry.record_tool_call("files", "read_file", 0.05, result=text_result("héllo"))
+    registry.record_tool_call("files", "read_file", 0.5, result=text_result("missing", error=True))
+    registry.record_tool_call("files", 'say "hi"', 2.0, error=True)
+
+    lines = registry.to_prometheus().splitlines()
+    assert "# HELP mcp_tool_calls_total MCP tool calls" in lines
+    assert "# TYPE mcp_tool_call_seconds histogram" in lines
+    assert 'mcp_tool_calls_total{server="files",tool="read_file"} 2' in lines
+    assert 'mcp_tool_errors_total{server="files",tool="read_file"} 1' in lines
+    assert 'mcp_tool_result_bytes_total{server="files",tool="read_file"} 13' in lines
+    assert 'mcp_tool_errors_total{server="files",tool="say \\"hi\\""} 1' in lines
+    assert 'mcp_tool_call_seconds_bucket{server="files",tool="read_file",le="0.1"} 1' in lines
+    assert 'mcp_tool_call_seconds_bucket{server="files",tool="read_file",le="1"} 2' in lines
+    assert 'mcp_tool_call_seconds_bucket{server="files",tool="read_file",le="+Inf"} 2' in lines
+    assert 'mcp_tool_call_seconds_sum{server="files",tool="read_file"} 0.55' in lines
+    assert 'mcp_tool_call_seconds_count{server="files",tool="read_file"} 2' in lines
+
+
+def test_json_output_carries_counts_buckets_and_quantiles():
+    registry = MetricsRegistry(buckets=(1.0, 2.0, 4.0))
+    for _ in range(50):
+        registry.observe("model_request_seconds", 0.5, model="m")
+        registry.observe("model_request_seconds", 1.5, model="m")
+    registry.inc("model_tokens_total", 120, model="m", kind="request")
+
+    data = json.loads(json.dumps(registry.to_json()))
+    histogram = series(registry, "histograms", "model_request_seconds")[(("model", "m"),)]
+    assert data["histograms"]["model_request_seconds"][0] == histogram
+    assert (histogram["count"], histogram["sum"]) == (100, 100.0)
+    assert histogram["buckets"] == {"1.0": 50, "2.0": 100, "4.0": 100, "+Inf": 100}
+    # Interpolated within the bucket the rank falls into
+    assert histogram["p50"] == pytest.approx(1.0)
+    assert histogram["p95"] == pytest.approx(1.9)
+    assert histogram["p99"] == pytest.approx(1.98)
+    assert data["counters"]["model_tokens_total"] == [
+        {"labels": {"kind": "request", "model": "m"}, "value": 120.0}]
+
+
+def test_quantiles_of_empty_and_overflowing_histograms():
+    registry = MetricsRegistry(buckets=(1.0, 2.0))
+    registry.observe("agent_run_seconds", 10.0, status="ok")
+    histogram = series(registry, "histograms", "agent_run_seconds")[(("status", "ok"),)]
+    assert histogram["p50"] == 2.0 and histogram["buckets"]["+Inf"] == 1
+    registry.reset()
+    assert registry.to_json() == {"counters": {}, "histograms": {}}
+    assert registry.to_prometheus() == "\n"
+
+
+def test_metrics_are_served_over_http():
+    registry = MetricsRegistry()
+    registry.inc("mcp_server_reconnects_total", server="files")
+
+    async def get(port, path):
+        reader, writer = await asyncio.open_connection("127.0.0.1", port)
+        writer.write(f"GET {path} HTTP/1.1\r\nHost: localhost\r\n\r\n".encode())
+        response = await reader.read()
+        writer.close()
+        head, _, body = response.partition(b"\r\n\r\n")
+        return head.split(b"\r\n")[0].decode(), body.decode()
+
+    async def run():
+        server = await registry.serve(port=0)
+        port = server.sockets[0].getsockname()[1]
+        try:
+            return [await get(port, path) for path in ("/metrics", "/metrics.json?pretty", "/other")]
+        finally:
+            server.close()
+            await server.wait_closed()
+
+    (status, text), (json_status, body), (missing, _) = asyncio.run(run())
+    assert status == json_status == "HTTP/1.1 200 OK"
+    assert 'mcp_server_reconnects_total{server="files"} 1' in text
+    assert json.loads(body)["counters"]["mcp_server_reconnects_total"][0]["value"] == 1
+    assert missing == "HTTP/1.1 404 Not Found"
+
+
+def test_model_requests_record_latency_tokens_and_errors():
+    registry = MetricsRegistry()
+
+    def respond(messages: list[ModelMessage], info: AgentInfo) -> ModelResponse:
+        if "fail" in messages[-1].parts[-1].content:
+            raise RuntimeError("model unavailable")
+        return ModelResponse(parts=[TextPart("four words of answer")])
+
+    model = MetricsModel(FunctionModel(respond), registry)
+    asyncio.run(Agent(model).run("How are you?"))
+    with pytest.raises(RuntimeError):
+        asyncio.run(Agent(model).run("Please fail"))
+
+    labels = (("model", model.model_name),)
+    assert series(registry, "histograms", "model_request_seconds")[labels]["count"] == 1
+    assert series(registry, "counters", "model_request_errors_total")[labels]["value"] == 1
+    tokens = series(registry, "counters", "model_tokens_total")
+    assert tokens[(("kind", "request"),) + labels]["value"] > 0
+    assert tokens[(("kind", "response"),) + labels]["value"] == 4
+
+
+def test_only_errors_of_the_streamed_model_count_as_model_errors():
+    registry = MetricsRegistry()
+
+    async def stream(messages: list[ModelMessage], info: AgentInfo):
+        if "fail" in messages[-1].parts[-1].content:
+            yield "partial "
+            raise ConnectionError("stream interrupted")
+        yield "streamed "
+        yield "answer"
+
+    model = MetricsModel(FunctionModel(stream_function=stream), registry)
+    labels = (("model", model.model_name),)
+
+    def errors():
+        return series(registry, "counters", "model_request_errors_total").get(labels, {}).get("value", 0)
+
+    async def consume(prompt, fail_in_consumer=False):
+        async with Agent(model).run_stream(prompt) as result:
+            async for _ in result.stream_text(delta=True):
+                if fail_in_consumer:
+                    raise ValueError("consumer gave up")
+
+    asyncio.run(consume("Hello"))
+    assert errors() == 0
+    assert series(registry, "histograms", "model_request_seconds")[labels]["count"] == 1
+
+    with pytest.raises(ValueError):
+        asyncio.run(consume("Hello", fail_in_consumer=True))
+    assert errors() == 0
+
+    with pytest.raises(ConnectionError):
+        asyncio.run(consume("Please fail"))
+    assert errors() == 1
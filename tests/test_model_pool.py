@@ -0,0 +1,37 @@
+"""
+Pooled OpenAI clients across event loops.
+"""
+import asyncio
+
+from agents.model_pool import ModelPool
+
+
+def test_clients_of_a_previous_loop_are_closed():
+    pool = ModelPool(http2=False)
+
+    async def get_client():
+        return pool.client(base_url="http://127.0.0.1:9/v1", api_key="test")
+
+    async def get_client_and_settle():
+        client = await get_client()
+        await asyncio.sleep(0)
+        return client
+
+    first = asyncio.run(get_client())
+    assert not first.is_closed()
+    second = asyncio.run(get_client_and_settle())
+    assert second is not first
+    assert first.is_closed()
+    assert not second.is_closed()
+
+
+def test_aclose_closes_clients_of_every_loop():
+    pool = ModelPool(http2=False)
+
+    async def get_client():
+        return pool.client(base_url="http://127.0.0.1:9/v1", api_key="test")
+
+    first = asyncio.run(get_client())
+    asyncio.run(pool.aclose())
+    assert first.is_closed()
+    assert pool.stats()["clients"] == 0
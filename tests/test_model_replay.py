@@ -0,0 +1,79 @@
+"""
+Recording model responses and replaying them by request fingerprint.
+"""
+import asyncio
+from datetime import datetime, timedelta, timezone
+
+import pytest
+from pydantic_ai import Agent
+from pydantic_ai.messages import (
+    ModelMessage,
+    ModelRequest,
+    ModelResponse,
+    TextPart,
+    ToolCallPart,
+    ToolReturnPart,
+    UserPromptPart,
+)
+from pydantic_ai.models import ModelRequestParameters
+from pydantic_ai.models.function import AgentInfo, FunctionModel
+
+from agents.model_replay import ReplayMissError, ReplayModel, ReplayStore, request_fingerprint
+
+PARAMETERS = ModelRequestParameters(function_tools=[], allow_text_output=True, output_tools=[])
+
+
+def conversation(arguments, result, at):
+    return [
+        ModelRequest(parts=[UserPromptPart("What time is it?", timestamp=at)]),
+        ModelResponse(parts=[ToolCallPart("clock", arguments, tool_call_id="call-1")], timestamp=at),
+        ModelRequest(parts=[ToolReturnPart("clock", result, tool_call_id="call-1", timestamp=at)]),
+    ]
+
+
+def test_fingerprints_ignore_timestamps_but_not_tool_data():
+    now = datetime.now(timezone.utc)
+    later = now + timedelta(hours=1)
+    arguments = {"timestamp": "2025-01-01T00:00:00Z"}
+    result = {"usage": 3, "time": "noon"}
+
+    def fingerprint(messages):
+        return request_fingerprint("test", messages, None, PARAMETERS)
+
+    assert fingerprint(conversation(arguments, result, now)) == fingerprint(conversation(arguments, result, later))
+    assert fingerprint(conversation(arguments, result, now)) != fingerprint(
+        conversation({"timestamp": "2025-06-01T00:00:00Z"}, result, now))
+    assert fingerprint(conversation(arguments, result, now)) != fingerprint(
+        conversation(arguments, {"usage": 4, "time": "noon"}, now))
+
+
+def test_recorded_runs_replay_without_calling_the_model(tmp_path):
+    calls = []
+
+    def respond(messages: list[ModelMessage], info: AgentInfo) -> ModelResponse:
+        calls.append(messages)
+        if len(messages) == 1:
+            return ModelResponse(parts=[ToolCallPart("clock", {"timestamp": "now"}, tool_call_id="call-1")])
+        return ModelResponse(parts=[TextPart(f"It is {messages[-1].parts[0].content}.")])
+
+    def clock(timestamp: str) -> str:
+        return "noon"
+
+    async def run(mode):
+        model = ReplayModel(FunctionModel(respond), mode, store=ReplayStore(str(tmp_path)))
+        result = await Agent(model, tools=[clock]).run("What time is it?")
+        return result.output, model
+
+    output, _ = asyncio.run(run("record"))
+    assert output == "It is noon." and len(calls) == 2
+    replayed, replayer = asyncio.run(run("replay"))
+    assert replayed == output
+    assert len(calls) == 2
+    assert (replayer.hits, replayer.misses) == (2, 0)
+
+    async def miss():
+        model = ReplayModel(FunctionModel(respond), "replay", store=ReplayStore(str(tmp_path)))
+        await Agent(model).run("Something else")
+
+    with pytest.raises(ReplayMissError):
+        asyncio.run(miss())
@@ -0,0 +1,138 @@
+"""
+Caching and invalidation of tool results.
+"""
+import time
+import asyncio
+
+from mcp.types import CallToolResult, TextContent
+
+from agents.mcp.result_cache import ToolResultCache, canonical_arguments
+
+
+def result(text):
+    return CallToolResult(content=[TextContent(type="text", text=text)])
+
+
+def test_equal_arguments_share_an_entry():
+    assert canonical_arguments({"b": 1, "a": [2]}) == canonical_arguments({"a": [2], "b": 1})
+    cache = ToolResultCache()
+    cache.put("fs", "read_file", {"path": "a", "encoding": "utf-8"}, result("A"), ttl=60)
+    assert cache.get("fs", "read_file", {"encoding": "utf-8", "path": "a"}).content[0].text == "A"
+    assert cache.get("fs", "read_file", {"path": "b"}) is None
+    assert (cache.hits, cache.misses) == (1, 1)
+
+
+def test_expired_and_evicted_results_are_dropped(monkeypatch):
+    cache = ToolResultCache(max_entries=2)
+    now = time.time()
+    monkeypatch.setattr(time, "time", lambda: now)
+    cache.put("fs", "read_file", {"path": "a"}, result("A"), ttl=10)
+    cache.put("fs", "read_file", {"path": "b"}, result("B"), ttl=10)
+    cache.get("fs", "read_file", {"path": "a"})
+    cache.put("fs", "read_file", {"path": "c"}, result("C"), ttl=10)
+    assert cache.get("fs", "read_file", {"path": "b"}) is None
+    assert cache.evictions == 1
+
+    monkeypatch.setattr(time, "time", lambda: now + 11)
+    assert cache.get("fs", "read_file", {"path": "a"}) is None
+
+
+def test_invalidation_drops_memory_and_disk_entries(tmp_path):
+    cache = ToolResultCache(disk_dir=str(tmp_path))
+    cache.put("fs", "read_file", {"path": "a"}, result("A"), ttl=60)
+    cache.put("fs", "list_directory", {"path": "."}, result("a"), ttl=60)
+    cache.put("other", "read_file", {"path": "a"}, result("other A"), ttl=60)
+
+    cache.invalidate("fs", ["read_file", "list_directory"])
+
+    assert cache.get("fs", "read_file", {"path": "a"}) is None
+    assert cache.get("fs", "list_directory", {"path": "."}) is None
+    assert cache.get("other", "read_file", {"path": "a"}).content[0].text == "other A"
+    assert cache.invalidations == 2
+    # A new process reading the same disk tier does not see the dropped results either
+    fresh = ToolResultCache(disk_dir=str(tmp_path))
+    assert fresh.get("fs", "read_file", {"path": "a"}) is None
+    assert fresh.get("other", "read_file", {"path": "a"}).content[0].text == "other A"
+
+
+def test_clients_invalidate_results_when_a_writing_tool_is_called(write_config, make_client):
+    config_path = write_config(cache={
+        "echo": {"ttl": 60},
+        "payload": {"invalidates": ["echo"]},
+    })
+
+    async def run():
+        cache = ToolResultCache()
+        client = make_client(config_path, result_cache=cache)
+        try:
+            await client.start()
+            server = client.servers[0]
+            for _ in range(2):
+                await server.call_tool("echo", {"text": "cached"})
+            hits_before = cache.hits
+            await server.call_tool("payload", {"size": 10})
+            await server.call_tool("echo", {"text": "cached"})
+            return hits_before, client.cache_stats()
+        finally:
+            await client.cleanup()
+
+    hits_before, stats = asyncio.run(run())
+    assert hits_before == 1
+    assert stats["hits"] == 1 and stats["misses"] == 2
+    assert stats["invalidations"] == 1
+
+
+def test_results_of_calls_started_before_an_invalidation_are_not_stored():
+    cache = ToolResultCache()
+    generation = cache.generation("fs", "read_file")
+    cache.invalidate("fs", ["read_file"])
+    cache.put("fs", "read_file", {"path": "a"}, result("old A"), ttl=60, generation=generation)
+    assert cache.get("fs", "read_file", {"path": "a"}) is None
+    cache.put("fs", "read_file", {"path": "a"}, result("A"), ttl=60,
+              generation=cache.generation("fs", "read_file"))
+    assert cache.get("fs", "read_file", {"path": "a"}).content[0].text == "A"
+
+
+def test_failed_writing_calls_still_invalidate(write_config, make_client):
+    config_path = write_config(reconnect_initial_delay=0.05, cache={
+        "echo": {"ttl": 60},
+        "payload": {"invalidates": ["echo"]},
+    })
+
+    async def run():
+        cache = ToolResultCache()
+        client = make_client(config_path, result_cache=cache)
+        try:
+            await client.start()
+            server = client.servers[0]
+            await server.call_tool("echo", {"text": "cached"})
+            server.mark_down(ConnectionError("simulated"))
+            try:
+                await server.call_tool("payload", {"size": 10})
+            except ConnectionError:
+                pass
+            return cache.get("stub", "echo", {"text": "cached"})
+        finally:
+            await client.cleanup()
+
+    assert asyncio.run(run()) is None
+
+
+def test_in_flight_results_are_not_cached_after_an_invalidation(write_config, make_client):
+    config_path = write_config(latency_ms=300, cache={"echo": {"ttl": 60}})
+
+    async def run():
+        cache = ToolResultCache()
+        client = make_client(config_path, result_cache=cache)
+        try:
+            await client.start()
+            server = client.servers[0]
+            call = asyncio.create_task(server.call_tool("echo", {"text": "stale"}))
+            await asyncio.sleep(0.1)
+            cache.invalidate("stub", ["echo"])
+            await call
+            return cache.get("stub", "echo", {"text": "stale"})
+        finally:
+            await client.cleanup()
+
+    assert asyncio.run(run()) is None
@@ -0,0 +1,79 @@
+"""
+Spilling large tool results to the result store.
+"""
+import asyncio
+
+from mcp.types import CallToolResult, ImageContent, TextContent
+
+from agents.mcp.result_store import READ_RESULT_TOOL_NAME, ResultStore, max_result_bytes
+
+
+def test_spilling_is_opt_in():
+    assert max_result_bytes({}) == 0
+    assert max_result_bytes({"max_result_bytes": 65536}) == 65536
+
+    store = ResultStore()
+    result = CallToolResult(content=[TextContent(type="text", text="x" * 100000)])
+    assert store.bound("fs", "read_file", result, max_result_bytes({})) is result
+
+
+def test_bound_keeps_the_other_fields_of_the_result(tmp_path):
+    store = ResultStore(head_bytes=10, directory=str(tmp_path))
+    image = ImageContent(type="image", data="aGk=", mimeType="image/png")
+    result = CallToolResult(
+        content=[TextContent(type="text", text="é" * 100), image],
+        structuredContent={"lines": 100},
+        _meta={"source": "stub"},
+        isError=False,
+    )
+
+    bounded = store.bound("fs", "read_file", result, 50)
+
+    assert bounded.structuredContent == {"lines": 100}
+    assert bounded.meta == {"source": "stub"}
+    assert bounded.content[1] == image
+    head, note = bounded.content[0].text.split("\n\n", 1)
+    assert head == "é" * 5
+    assert "handle=" in note
+    assert store.stats()["spilled"] == 1
+
+
+def test_read_pages_through_a_spilled_result(tmp_path):
+    store = ResultStore(head_bytes=4, page_bytes=8, directory=str(tmp_path))
+    text = "0123456789abcdefghij"
+    bounded = store.bound("fs", "read_file", CallToolResult(content=[TextContent(type="text", text=text)]), 10)
+    handle = bounded.content[0].text.split('handle="', 1)[1].split('"', 1)[0]
+
+    pages, offset = [], 4
+    while True:
+        page = store.read(handle, offset)
+        body, note = page.rsplit("\n\n", 1)
+        pages.append(body)
+        if note.startswith("[End of result"):
+            break
+        offset = int(note.rsplit("offset=", 1)[1].split(")", 1)[0])
+
+    assert "0123" + "".join(pages) == text
+    store.close()
+    assert store.read(handle).startswith("Unknown or expired")
+
+
+def test_clients_spill_only_servers_that_opt_in(write_config, make_client):
+    async def run(config_path):
+        client = make_client(config_path)
+        try:
+            tools = {tool.name: tool for tool in await client.start()}
+            result = await tools["payload"].function(size=20000)
+            return set(tools), result, client.result_store.stats()
+        finally:
+            await client.cleanup()
+
+    names, result, stats = asyncio.run(run(write_config()))
+    assert READ_RESULT_TOOL_NAME not in names
+    assert len(result.content[0].text) == 20000
+    assert stats["spilled"] == 0
+
+    names, result, stats = asyncio.run(run(write_config(max_result_bytes=8192)))
+    assert READ_RESULT_TOOL_NAME in names
+    assert "[Result truncated" in result.content[0].text
+    assert stats["spilled"] == 1
@@ -0,0 +1,131 @@
+"""
+Queueing of tool calls over a server's concurrency limits.
+"""
+import asyncio
+
+import pytest
+
+from agents.mcp.scheduler import SchedulerQueueFull, ToolScheduler, call_context
+
+
+async def settle():
+    # Let every task that can make progress reach its next wait
+    for _ in range(5):
+        await asyncio.sleep(0)
+
+
+class Calls:
+    """
+    Calls that hold their slot until released, recording the order they started in.
+    """
+    def __init__(self, scheduler: ToolScheduler):
+        self.scheduler = scheduler
+        self.started = []
+        self.gates = {}
+        self.tasks = {}
+
+    def start(self, name, owner=None, priority=0, tool="search"):
+        self.gates[name] = asyncio.Event()
+        self.tasks[name] = asyncio.create_task(self._call(name, owner, priority, tool))
+        return self.tasks[name]
+
+    async def _call(self, name, owner, priority, tool):
+        with call_context(owner, priority):
+            async with self.scheduler.slot(tool):
+                self.started.append(name)
+                await self.gates[name].wait()
+
+    async def finish(self, name):
+        self.gates[name].set()
+        await self.tasks[name]
+        await settle()
+
+
+def test_waiting_calls_run_by_priority_then_fewest_calls_in_flight():
+    async def run():
+        scheduler = ToolScheduler(max_in_flight=2)
+        calls = Calls(scheduler)
+        calls.start("a0", owner="a")
+        calls.start("x0", owner="x")
+        await settle()
+        calls.start("a1", owner="a")
+        calls.start("b1", owner="b")
+        calls.start("c1", owner="c", priority=5)
+        await settle()
+        assert calls.started == ["a0", "x0"]
+        assert scheduler.stats()["queue_depth"] == 3
+
+        # The later, higher-priority call goes first
+        await calls.finish("x0")
+        assert calls.started[-1] == "c1"
+        # a already has a call in flight, so b's call goes before a's earlier one
+        await calls.finish("c1")
+        assert calls.started[-1] == "b1"
+        await calls.finish("b1")
+        assert calls.started[-1] == "a1"
+        await calls.finish("a1")
+        await calls.finish("a0")
+        return calls.started
+
+    assert asyncio.run(run()) == ["a0", "x0", "c1", "b1", "a1"]
+
+
+def test_tool_limits_only_hold_back_calls_to_that_tool():
+    async def run():
+        scheduler = ToolScheduler(max_in_flight=3, tool_limits={"search": 1})
+        calls = Calls(scheduler)
+        calls.start("search-1")
+        calls.start("search-2")
+        calls.start("fetch-1", tool="fetch")
+        await settle()
+        assert calls.started == ["search-1", "fetch-1"]
+        assert scheduler.stats()["tools_in_flight"] == {"search": 1, "fetch": 1}
+        await calls.finish("search-1")
+        assert calls.started[-1] == "search-2"
+        await calls.finish("search-2")
+        await calls.finish("fetch-1")
+
+    asyncio.run(run())
+
+
+def test_calls_beyond_the_queue_limit_are_rejected():
+    async def run():
+        scheduler = ToolScheduler(max_in_flight=1, max_queue=1)
+        calls = Calls(scheduler)
+        calls.start("running")
+        calls.start("queued")
+        await settle()
+        rejected = calls.start("rejected")
+        with pytest.raises(SchedulerQueueFull):
+            await rejected
+        assert scheduler.stats()["rejected"] == 1
+        # The queued call is unaffected and runs once the slot frees up
+        await calls.finish("running")
+        assert calls.started == ["running", "queued"]
+        await calls.finish("queued")
+
+    asyncio.run(run())
+
+
+def test_stats_track_waits_and_completions():
+    async def run():
+        scheduler = ToolScheduler(max_in_flight=1)
+        calls = Calls(scheduler)
+        calls.start("first")
+        calls.start("second")
+        calls.start("third")
+        await settle()
+        during = scheduler.stats()
+        await asyncio.sleep(0.02)
+        for name in ("first", "second", "third"):
+            await calls.finish(name)
+        return during, scheduler.stats()
+
+    during, after = asyncio.run(run())
+    assert during["in_flight"] == 1 and during["queue_depth"] == 2
+    assert during["tools_in_flight"] == {"search": 1}
+    assert after["in_flight"] == 0 and after["queue_depth"] == 0
+    assert after["tools_in_flight"] == {}
+    assert (after["completed"], after["queued"], after["max_queue_depth"]) == (3, 2, 2)
+    assert after["max_wait_seconds"] >= 0.02
+    assert after["avg_wait_seconds"] == pytest.approx(after["total_wait_seconds"] / 2)
@@ -0,0 +1,80 @@
+"""
+Tool schemas advertised to the model.
+"""
+import asyncio
+
+from pydantic_ai import Agent
+from pydantic_ai.messages import ModelMessage, ModelResponse, TextPart
+from pydantic_ai.models.function import AgentInfo, FunctionModel
+
+from agents.mcp.schema import compact_schema, schema_tool
+
+ECHO_SCHEMA = {
+    "type": "object",
+    "properties": {"text": {"type": "string", "description": "Text to return"}},
+    "required": ["text"],
+}
+
+
+def test_schema_tool_advertises_given_schema():
+    async def echo(**kwargs):
+        return kwargs
+
+    tool = schema_tool(echo, "echo", "Return the given text.", ECHO_SCHEMA)
+    assert tool.tool_def.parameters_json_schema == ECHO_SCHEMA
+    assert tool.tool_def.description == "Return the given text."
+
+
+def test_compacted_schema_drops_titles():
+    schema = {"title": "Args", "type": "object",
+              "properties": {"path": {"title": "Path", "type": "string"}}}
+    assert compact_schema(schema) == {"type": "object", "properties": {"path": {"type": "string"}}}
+
+
+def test_clients_send_server_schemas_to_the_model(write_config, make_client):
+    seen = {}
+
+    def respond(messages: list[ModelMessage], info: AgentInfo) -> ModelResponse:
+        seen.update({tool.name: tool.parameters_json_schema for tool in info.function_tools})
+        return ModelResponse(parts=[TextPart("done")])
+
+    async def run():
+        client = make_client(write_config())
+        try:
+            tools = await client.start()
+            echo = next(tool for tool in tools if tool.name == "echo")
+            assert echo.tool_def.parameters_json_schema == ECHO_SCHEMA
+            await Agent(FunctionModel(respond), tools=tools).run("hi")
+        finally:
+            await client.cleanup()
+
+    asyncio.run(run())
+    assert seen["echo"] == ECHO_SCHEMA
+    assert seen["payload"]["properties"]["size"]["type"] == "integer"
+
+
+def test_compacted_schema_keeps_definitions_of_both_sections_apart():
+    address = {"type": "object", "properties": {"street": {"type": "string"}}}
+    legacy_address = {"type": "string"}
+    schema = {
+        "type": "object",
+        "properties": {
+            "home": {"$ref": "#/$defs/Address"},
+            "work": {"$ref": "#/$defs/Address"},
+            "old": {"$ref": "#/definitions/Address"},
+            "previous": {"$ref": "#/definitions/Address"},
+            "a": {"$ref": "#/$defs/a~1b"},
+            "b": {"$ref": "#/$defs/a~1b"},
+        },
+        "$defs": {"Address": address, "a/b": {"type": "integer"}},
+        "definitions": {"Address": legacy_address},
+    }
+    compacted = compact_schema(schema)
+    defs = compacted["$defs"]
+    properties = compacted["properties"]
+    assert defs["Address"] == address
+    assert defs["Address_2"] == legacy_address
+    assert properties["home"] == properties["work"] == {"$ref": "#/$defs/Address"}
+    assert properties["old"] == properties["previous"] == {"$ref": "#/$defs/Address_2"}
+    assert defs["a/b"] == {"type": "integer"}
+    assert properties["a"] == {"$ref": "#/$defs/a~1b"}
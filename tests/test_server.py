@@ -0,0 +1,140 @@
+"""
+Runs over the agent server's HTTP API.
+"""
+import json
+import asyncio
+
+from agents.server import AgentServer
+
+
+async def serve(tmp_path, execute):
+    """
+    Start an agent server whose runs are made by execute(agent_id, prompt, session_id, events).
+    """
+    server = AgentServer(definitions={"test": {"system_prompt": ""}})
+    server.agents = {"test": None}
+    server._execute = execute
+    socket_path = str(tmp_path / "agents.sock")
+    await server.listen(socket_path=socket_path)
+    return server, socket_path
+
+
+def request(body):
+    payload = json.dumps(body).encode("utf-8")
+    return (b"POST /runs HTTP/1.1\r\nContent-Type: application/json\r\n"
+            b"Content-Length: %d\r\n\r\n" % len(payload)) + payload
+
+
+def test_bytes_after_the_request_do_not_cancel_the_run(tmp_path):
+    async def execute(agent_id, prompt, session_id, events):
+        await asyncio.sleep(0.2)
+        await events.put({"type": "final", "text": prompt, "data": {}})
+
+    async def run():
+        server, socket_path = await serve(tmp_path, execute)
+        try:
+            reader, writer = await asyncio.open_unix_connection(socket_path)
+            writer.write(request({"agent": "test", "prompt": "hello"}) + b"\r\n")
+            await writer.drain()
+            response = await asyncio.wait_for(reader.read(), 5)
+            writer.close()
+            return response
+        finally:
+            await server.stop()
+
+    response = asyncio.run(run())
+    head, body = response.split(b"\r\n\r\n", 1)
+    assert head.startswith(b"HTTP/1.1 200")
+    assert json.loads(body)["text"] == "hello"
+
+
+def test_closing_the_connection_cancels_the_run(tmp_path):
+    cancelled = asyncio.Event()
+
+    async def execute(agent_id, prompt, session_id, events):
+        try:
+            await asyncio.sleep(60)
+        except asyncio.CancelledError:
+            cancelled.set()
+            raise
+
+    async def run():
+        server, socket_path = await serve(tmp_path, execute)
+        try:
+            _, writer = await asyncio.open_unix_connection(socket_path)
+            writer.write(request({"agent": "test", "prompt": "hello"}))
+            await writer.drain()
+            await asyncio.sleep(0.1)
+            writer.close()
+            await asyncio.wait_for(cancelled.wait(), 5)
+            await asyncio.sleep(0)
+            return dict(server._runs)
+        finally:
+            await server.stop()
+
+    assert asyncio.run(run()) == {}
+
+
+def test_streamed_run_errors_are_reported_as_events(tmp_path):
+    async def execute(agent_id, prompt, session_id, events):
+        await events.put({"type": "text", "delta": "partial"})
+        await asyncio.sleep(0.05)
+        raise RuntimeError("history store unavailable")
+
+    async def run():
+        server, socket_path = await serve(tmp_path, execute)
+        try:
+            reader, writer = await asyncio.open_unix_connection(socket_path)
+            writer.write(request({"agent": "test", "prompt": "hello", "stream": True}))
+            await writer.drain()
+            response = await asyncio.wait_for(reader.read(), 5)
+            writer.close()
+            return response
+        finally:
+            await server.stop()
+
+    response = asyncio.run(run())
+    assert response.count(b"HTTP/1.1") == 1
+    head, body = response.split(b"\r\n\r\n", 1)
+    assert head.startswith(b"HTTP/1.1 200")
+    events = [json.loads(line) for line in body.splitlines()]
+    assert [event["type"] for event in events] == ["run", "text", "error"]
+    assert events[-1]["text"] == "history store unavailable"
+
+
+def test_sessions_in_use_are_not_evicted():
+    async def run():
+        server = AgentServer(definitions={"test": {"system_prompt": ""}}, max_sessions=1)
+        history, lock = server._session("test", "busy")
+        async with lock:
+            server._session("test", "other")
+            assert server._session("test", "busy")[0] is history
+            server._session("test", "third")
+            assert ("test", "busy") in server._sessions
+        server._session("test", "fourth")
+        return list(server._sessions)
+
+    assert asyncio.run(run()) == [("test", "fourth")]
+
+
+def test_invalid_content_length_is_a_bad_request(tmp_path):
+    async def execute(agent_id, prompt, session_id, events):
+        await events.put({"type": "final", "text": prompt, "data": {}})
+
+    async def send(socket_path, length):
+        reader, writer = await asyncio.open_unix_connection(socket_path)
+        writer.write(b"POST /runs HTTP/1.1\r\nContent-Length: " + length + b"\r\n\r\n{}")
+        await writer.drain()
+        response = await asyncio.wait_for(reader.read(), 5)
+        writer.close()
+        return response
+
+    async def run():
+        server, socket_path = await serve(tmp_path, execute)
+        try:
+            return [await send(socket_path, length) for length in (b"abc", b"-5")]
+        finally:
+            await server.stop()
+
+    for response in asyncio.run(run()):
+        assert response.startswith(b"HTTP/1.1 400")
@@ -0,0 +1,98 @@
+"""
+Persisting agent sessions in SQLite.
+"""
+import zlib
+import asyncio
+import sqlite3
+
+from pydantic_ai.messages import (
+    ModelMessagesTypeAdapter,
+    ModelRequest,
+    ModelResponse,
+    SystemPromptPart,
+    TextPart,
+    UserPromptPart,
+)
+
+from agents.session_store import SessionStore
+
+
+def turn(number, system_prompt=None):
+    parts = [SystemPromptPart(system_prompt)] if system_prompt else []
+    return [
+        ModelRequest(parts=parts + [UserPromptPart(f"Question {number}")]),
+        ModelResponse(parts=[TextPart(f"Answer {number}. " + "Lorem ipsum dolor sit amet. " * 50)]),
+    ]
+
+
+def test_turns_round_trip_through_the_database(tmp_path):
+    path = str(tmp_path / "sessions.db")
+    turns = [turn(1, "Be brief."), turn(2), turn(3)]
+
+    async def run():
+        store = SessionStore(path)
+        try:
+            for messages in turns:
+                await store.append("s1", messages)
+            await store.append("s2", turn(1))
+            await store.append("s1", [])
+        finally:
+            store.close()
+        # A second store, as another process would open it
+        store = SessionStore(path)
+        try:
+            return (await store.load_turns("s1"), await store.load("s1"),
+                    await store.load_turns("unknown"), await store.list_sessions())
+        finally:
+            store.close()
+
+    loaded, flat, unknown, sessions = asyncio.run(run())
+    assert loaded == turns
+    assert flat == [message for messages in turns for message in messages]
+    assert unknown == []
+    assert {session["session_id"]: session["turns"] for session in sessions} == {"s1": 3, "s2": 1}
+
+
+def test_payloads_are_stored_compressed(tmp_path):
+    path = str(tmp_path / "sessions.db")
+    messages = turn(1)
+
+    async def run():
+        store = SessionStore(path)
+        try:
+            await store.append("s1", messages)
+        finally:
+            store.close()
+
+    asyncio.run(run())
+    with sqlite3.connect(path) as conn:
+        (payload,) = conn.execute("SELECT payload FROM turns").fetchone()
+    encoded = ModelMessagesTypeAdapter.dump_json(messages)
+    assert zlib.decompress(payload) == encoded
+    assert len(payload) < len(encoded) / 2
+
+
+def test_loading_recent_turns_keeps_the_system_prompt(tmp_path):
+    async def run():
+        store = SessionStore(str(tmp_path / "sessions.db"))
+        try:
+            for number in range(1, 6):
+                await store.append("s1", turn(number, "Be brief." if number == 1 else None))
+            recent = await store.load_turns("s1", last_turns=2)
+            everything = await store.load_turns("s1", last_turns=10)
+            await store.delete("s1")
+            return recent, everything, await store.load_turns("s1")
+        finally:
+            store.close()
+
+    recent, everything, deleted = asyncio.run(run())
+    assert len(recent) == 2
+    first = recent[0][0]
+    assert isinstance(first.parts[0], SystemPromptPart) and first.parts[0].content == "Be brief."
+    assert first.parts[1].content == "Question 4"
+    assert recent[1][0].parts[0].content == "Question 5"
+    # Loading every turn leaves them as written
+    assert len(everything) == 5
+    assert [part.content for part in everything[0][0].parts] == ["Be brief.", "Question 1"]
+    assert [part.content for part in everything[1][0].parts] == ["Question 2"]
+    assert deleted == []
@@ -0,0 +1,60 @@
+"""
+Running a JSONL file of queries concurrently with simple_agent.py.
+"""
+import json
+import asyncio
+
+from pydantic_ai.messages import ModelMessage, ModelResponse, TextPart, ToolCallPart, ToolReturnPart
+from pydantic_ai.models.function import AgentInfo, FunctionModel
+
+import simple_agent
+from agents import lightweight_agent
+
+
+def test_load_batch_reads_strings_and_objects(tmp_path):
+    batch = tmp_path / "queries.jsonl"
+    batch.write_text('"first"\n\n{"id": "q2", "query": "second"}\n{"query": "third"}\n')
+    assert simple_agent.load_batch(str(batch)) == [(1, "first"), ("q2", "second"), (4, "third")]
+
+
+def test_run_batch_writes_one_record_per_query(write_config, tmp_path, monkeypatch):
+    running = set()
+    peak = []
+
+    async def respond(messages: list[ModelMessage], info: AgentInfo) -> ModelResponse:
+        prompt = messages[0].parts[-1].content
+        if prompt == "fail":
+            raise RuntimeError("model unavailable")
+        returns = [part for part in messages[-1].parts if isinstance(part, ToolReturnPart)]
+        if not returns:
+            # First step: call the echo tool, which runs on the stub MCP server
+            running.add(prompt)
+            peak.append(len(running))
+            await asyncio.sleep(0.05)
+            return ModelResponse(parts=[ToolCallPart("echo", {"text": prompt})])
+        running.discard(prompt)
+        return ModelResponse(parts=[TextPart(f"Echoed: {returns[0].content}")])
+
+    monkeypatch.setattr(lightweight_agent, "get_model", lambda *args: FunctionModel(respond))
+    batch = tmp_path / "queries.jsonl"
+    queries = [{"id": f"q{i}", "query": f"query {i}"} for i in range(5)] + [{"id": "bad", "query": "fail"}]
+    batch.write_text("\n".join(json.dumps(query) for query in queries) + "\n")
+    output = tmp_path / "results.jsonl"
+
+    asyncio.run(simple_agent.run_batch(str(batch), str(output), concurrency=2,
+                                       config_path=write_config()))
+
+    records = {record["id"]: record for record in map(json.loads, output.read_text().splitlines())}
+    assert set(records) == {query["id"] for query in queries}
+    assert max(peak) == 2
+    for i in range(5):
+        record = records[f"q{i}"]
+        assert record["query"] == f"query {i}"
+        assert f"query {i}" in record["output"] and "error" not in record
+        assert record["usage"]["requests"] == 2
+        assert record["usage"]["request_tokens"] > 0
+        assert record["usage"]["total_tokens"] == (
+            record["usage"]["request_tokens"] + record["usage"]["response_tokens"])
+        assert record["latency"] >= 0.05
+    assert records["bad"]["error"] == "RuntimeError: model unavailable"
+    assert "output" not in records["bad"]
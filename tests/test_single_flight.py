@@ -0,0 +1,130 @@
+"""
+Coalescing of identical concurrent tool calls.
+"""
+import asyncio
+
+import pytest
+from mcp.types import Tool, ToolAnnotations
+
+from agents.mcp.result_cache import CachePolicy
+from agents.mcp.single_flight import SingleFlight
+
+
+def tool(name, **hints):
+    return Tool(name=name, inputSchema={"type": "object"},
+                annotations=ToolAnnotations(**hints) if hints else None)
+
+
+def test_only_safe_or_opted_in_tools_are_coalesced_by_default():
+    flight = SingleFlight.from_config("fs", {"coalesce_tools": ["search"]},
+                                      {"read_file": CachePolicy(ttl=60)})
+    flight.register(tool("read_file", readOnlyHint=True))
+    flight.register(tool("set_flag", idempotentHint=True))
+    flight.register(tool("write_file", readOnlyHint=False))
+    flight.register(tool("append"))
+
+    assert flight.coalesces("read_file")
+    assert flight.coalesces("set_flag")
+    assert flight.coalesces("search")
+    assert not flight.coalesces("write_file")
+    assert not flight.coalesces("append")
+
+
+def test_server_settings_override_annotations():
+    everything = SingleFlight.from_config(
+        "fs", {"coalesce": True, "coalesce_exclude": ["move_file"]},
+        {"write_file": CachePolicy(invalidates=["read_file"])},
+    )
+    assert everything.coalesces("append")
+    assert not everything.coalesces("move_file")
+    assert not everything.coalesces("write_file")
+
+    nothing = SingleFlight.from_config("fs", {"coalesce": False, "coalesce_tools": ["search"]})
+    nothing.register(tool("read_file", readOnlyHint=True))
+    assert not nothing.coalesces("read_file")
+    assert not nothing.coalesces("search")
+
+
+def test_concurrent_identical_calls_share_one_request():
+    sent = []
+
+    async def run():
+        flight = SingleFlight("fs", tools=["read_file"])
+
+        async def call(path):
+            sent.append(path)
+            await asyncio.sleep(0.05)
+            return f"contents of {path}"
+
+        results = await asyncio.gather(
+            *(flight.call("read_file", {"path": "a"}, lambda: call("a")) for _ in range(5)),
+            flight.call("read_file", {"path": "b"}, lambda: call("b")),
+        )
+        return results, flight.stats()
+
+    results, stats = asyncio.run(run())
+    assert results == ["contents of a"] * 5 + ["contents of b"]
+    assert sent == ["a", "b"]
+    assert stats["calls"] == 2 and stats["collapsed"] == 4 and stats["in_flight"] == 0
+
+
+def test_calls_to_other_tools_are_not_shared():
+    async def run():
+        flight = SingleFlight("fs")
+        sent = []
+
+        async def call():
+            sent.append(None)
+            await asyncio.sleep(0.01)
+
+        await asyncio.gather(*(flight.call("write_file", {"path": "a"}, call) for _ in range(3)))
+        return len(sent), flight.stats()["collapsed"]
+
+    assert asyncio.run(run()) == (3, 0)
+
+
+def test_errors_are_shared_and_cancelled_callers_do_not_cancel_the_call():
+    async def run():
+        flight = SingleFlight("fs", enabled=True)
+        finished = asyncio.Event()
+
+        async def failing():
+            await asyncio.sleep(0.05)
+            raise ValueError("no such file")
+
+        async def slow():
+            await asyncio.sleep(0.05)
+            finished.set()
+            return "done"
+
+        with pytest.raises(ValueError):
+            await asyncio.gather(*(flight.call("read_file", {}, failing) for _ in range(2)))
+
+        impatient = asyncio.create_task(flight.call("stat", {}, slow))
+        patient = asyncio.create_task(flight.call("stat", {}, slow))
+        await asyncio.sleep(0.01)
+        impatient.cancel()
+        assert await patient == "done"
+        assert finished.is_set()
+
+    asyncio.run(run())
+
+
+def test_clients_coalesce_read_only_tools(write_config, make_client):
+    async def run(config_path):
+        client = make_client(config_path)
+        try:
+            await client.start()
+            server = client.servers[0]
+            await asyncio.gather(*(server.call_tool("echo", {"text": "same"}) for _ in range(4)))
+            await asyncio.gather(*(server.call_tool("tool_0", {"value": "same"}) for _ in range(4)))
+            return client.coalescing_stats()["stub"]
+        finally:
+            await client.cleanup()
+
+    stats = asyncio.run(run(write_config(latency_ms=50, extra_tools=1)))
+    assert stats["collapsed"] == 3
+    assert "echo" in stats["tools"] and "tool_0" not in stats["tools"]
+
+    stats = asyncio.run(run(write_config(latency_ms=50, extra_tools=1, coalesce_tools=["tool_0"])))
+    assert stats["collapsed"] == 6
@@ -0,0 +1,80 @@
+"""
+Exposing only the tools relevant to each run's prompt.
+"""
+import asyncio
+
+from pydantic_ai import Agent, Tool
+from pydantic_ai.messages import ModelMessage, ModelResponse, TextPart, ToolCallPart
+from pydantic_ai.models.function import AgentInfo, FunctionModel
+
+from agents.mcp.tool_selection import FALLBACK_TOOL_NAME, ToolIndex, select_tools
+
+DESCRIPTIONS = {
+    "read_file": "Read the complete contents of a file from the file system.",
+    "write_file": "Create a new file or overwrite an existing file with new content.",
+    "list_directory": "List the files and directories in a given path.",
+    "brave_web_search": "Search the web with the Brave search engine.",
+    "get_weather": "Get the current weather forecast for a city.",
+    "send_email": "Send an email message to a recipient.",
+}
+
+
+def make_tools():
+    def make(name):
+        async def tool(**kwargs) -> str:
+            return f"{name} done"
+        return Tool(tool, name=name, description=DESCRIPTIONS[name], takes_ctx=False)
+
+    return [make(name) for name in DESCRIPTIONS]
+
+
+def run_agent(tools, responses, prompt):
+    """
+    Run an agent whose model replies with the given responses in turn, and return the
+    names of the tools it was offered at each step.
+    """
+    offered = []
+
+    def respond(messages: list[ModelMessage], info: AgentInfo) -> ModelResponse:
+        offered.append({tool.name for tool in info.function_tools})
+        return responses[len(offered) - 1]
+
+    asyncio.run(Agent(FunctionModel(respond), tools=tools).run(prompt))
+    return offered
+
+
+def test_index_ranks_tools_by_relevance():
+    index = ToolIndex({name: f"{name} {name} {text}" for name, text in DESCRIPTIONS.items()})
+    assert index.search("please read the file notes.txt", 2)[0] == "read_file"
+    assert index.search("what's the weather in Paris?", 3) == ["get_weather"]
+    assert index.search("searchWeb for MCP", 1) == ["brave_web_search"]
+    assert index.search("unrelated words", 3) == []
+
+
+def test_small_tool_sets_are_left_alone():
+    tools = make_tools()
+    assert select_tools(tools, None) is tools
+    assert select_tools(tools, len(tools)) is tools
+
+
+def test_prepare_hooks_expose_only_the_selected_tools():
+    tools = select_tools(make_tools(), 2, always_include=["list_directory"])
+    offered = run_agent(tools, [ModelResponse(parts=[TextPart("It is sunny.")])],
+                        "What is the weather forecast for Berlin?")
+    assert offered == [{"get_weather", "list_directory", FALLBACK_TOOL_NAME}]
+
+
+def test_find_tools_exposes_hidden_tools_from_the_next_step():
+    tools = select_tools(make_tools(), 1)
+    responses = [
+        ModelResponse(parts=[ToolCallPart(FALLBACK_TOOL_NAME, {"query": "send an email"})]),
+        ModelResponse(parts=[ToolCallPart("send_email", {})]),
+        ModelResponse(parts=[ToolCallPart(FALLBACK_TOOL_NAME, {"query": ""})]),
+        ModelResponse(parts=[TextPart("Sent.")]),
+    ]
+    offered = run_agent(tools, responses, "Read the file todo.txt")
+    assert offered[0] == {"read_file", FALLBACK_TOOL_NAME}
+    assert offered[1] == {"read_file", "send_email", FALLBACK_TOOL_NAME}
+    # Tools already called stay visible; an empty query exposes everything
+    assert offered[2] == offered[1]
+    assert offered[3] == set(DESCRIPTIONS) | {FALLBACK_TOOL_NAME}
@@ -0,0 +1,72 @@
+"""
+Recording a server's stdio traffic and serving it back without the server.
+"""
+import sys
+import json
+import asyncio
+
+import pytest
+
+from agents.mcp.config import TRAFFIC_SCRIPT
+from agents.mcp.traffic import ReplayServer, load_recording
+
+
+def test_recorded_traffic_replays_as_a_server(write_config, make_client, tmp_path):
+    recording = str(tmp_path / "recordings" / "stub.jsonl")
+    replay_config = tmp_path / "replay_config.json"
+    replay_config.write_text(json.dumps({"mcpServers": {"stub": {
+        "command": sys.executable,
+        "args": [TRAFFIC_SCRIPT, "replay", recording, "--speed", "0"],
+    }}}))
+
+    async def session(config_path, calls):
+        client = make_client(config_path)
+        try:
+            tools = await client.start()
+            server = client.servers[0]
+            results = [await server.call_tool(name, arguments) for name, arguments in calls]
+            return sorted(tool.name for tool in tools), results
+        finally:
+            await client.cleanup()
+
+    recorded_tools, recorded = asyncio.run(session(write_config(record_traffic=recording), [
+        ("echo", {"text": "recorded"}),
+        ("payload", {"size": 2048}),
+    ]))
+    methods = [exchange["method"] for exchange in load_recording(recording)]
+    assert {"initialize", "tools/list"} <= set(methods)
+    assert methods.count("tools/call") == 2
+
+    replayed_tools, replayed = asyncio.run(session(str(replay_config), [
+        ("echo", {"text": "recorded"}),
+        ("payload", {"size": 2048}),
+        # Unrecorded arguments get another recording of the same tool
+        ("echo", {"text": "never recorded"}),
+        ("tool_0", {}),
+    ]))
+    assert replayed_tools == recorded_tools
+    assert replayed[0].content[0].text == "recorded"
+    assert replayed[1].content[0].text == recorded[1].content[0].text
+    assert replayed[2].content[0].text == "recorded"
+    assert replayed[3].isError and "No recording" in replayed[3].content[0].text
+
+
+def test_replay_matches_exact_params_before_falling_back():
+    exchanges = [
+        {"method": "tools/call", "params": {"name": "echo", "arguments": {"text": "a"}},
+         "result": {"content": [{"type": "text", "text": "a"}]}, "seconds": 0.5},
+        {"method": "tools/call", "params": {"name": "echo", "arguments": {"text": "b"}},
+         "result": {"content": [{"type": "text", "text": "b"}]}, "seconds": 0.5},
+    ]
+    server = ReplayServer(exchanges, speed=0.1)
+
+    delay, response = server.respond({"id": 1, "method": "tools/call", "params": {
+        "name": "echo", "arguments": {"text": "b"}, "_meta": {"progressToken": 1}}})
+    assert response == {"jsonrpc": "2.0", "id": 1, "result": exchanges[1]["result"]}
+    assert delay == pytest.approx(0.05)
+    _, response = server.respond({"id": 2, "method": "tools/call",
+                                  "params": {"name": "echo", "arguments": {"text": "c"}}})
+    assert response["result"] == exchanges[0]["result"]
+    _, response = server.respond({"id": 3, "method": "resources/list"})
+    assert response["error"]["code"] == -32601
+    assert (server.served, server.fallbacks, server.misses) == (2, 1, 1)